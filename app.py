@@ -0,0 +1,234 @@
+import logging
+import asyncio
+
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import BotCommand
+from config import Config
+from database.session import engine, check_db_connection, get_db_session, query_profiler, AsyncSessionLocal
+from database.fsm_storage import DbStorage, KeyLockIsolation
+from database.instance_lock import InstanceLock
+from database.migrations import run_migrations
+from database.models import Reminder, User  # Добавлен импорт Reminder
+from handlers import user_handlers, admin_handlers, workout_handlers, reminder_handlers, stats_handlers
+from middlewares.profiling import HandlerNameMiddleware
+from middlewares.identity import IdentityMiddleware
+from middlewares.db_session import DbSessionMiddleware
+from middlewares.fsm_batch import FsmBatchMiddleware, FsmFlushMiddleware
+from middlewares.ban import BanMiddleware
+from datetime import datetime, time
+from functools import partial
+from sqlalchemy import select
+from services.reminder_index import reminder_index, minute_of_week
+from services.reminder_scheduler import ReminderScheduler
+from services.reminder_dispatcher import reminder_dispatcher
+from services.ranking import leaderboard
+from services.global_stats import global_stats
+from services.charts import chart_renderer
+from services.ban_list import ban_list
+from services.webhook import run_webhook
+import os
+
+reminder_scheduler: ReminderScheduler | None = None
+# Бот рассчитан на один экземпляр на БД: состояние напоминаний, банов и кэшей — в памяти процесса
+instance_lock = InstanceLock(f"sport_tracker_bot:{Config.DB_NAME}")
+
+
+async def send_reminders(bot: Bot, minute: datetime):
+    """Отправляет напоминания, назначенные на указанную минуту (UTC)"""
+    logging.info(f"Проверка напоминаний в {minute:%H:%M} UTC ({minute:%A})")
+
+    # Переход на летнее/зимнее время меняет UTC-время напоминаний в этом поясе
+    for zone in reminder_index.changed_zones(minute):
+        logging.info(f"Изменилось смещение пояса {zone}, пересчитываем напоминания")
+        async for session in get_db_session():
+            await reminder_index.recompute(session, User.timezone == zone, moment=minute)
+
+    # Берём кандидатов из индекса, БД нужна только для отправляемой пачки
+    reminder_ids = reminder_index.due(minute_of_week(minute.weekday(), minute.time()))
+    if not reminder_ids:
+        return
+
+    # Ошибки БД пробрасываются в планировщик, чтобы минута была обработана повторно
+    async for session in get_db_session():
+        # Один запрос, только нужные для отправки колонки
+        stmt = (
+            select(User.telegram_id, Reminder.reminder_text)
+            .select_from(Reminder)
+            .join(User)
+            .where(
+                Reminder.reminder_id.in_(reminder_ids),
+                User.is_banned == False,
+                User.notifications_enabled == True  # Добавляем проверку на включенные уведомления
+            )
+        )
+        result = await session.execute(stmt)
+
+        # Отправка идёт через пул воркеров с учётом лимитов Telegram
+        for telegram_id, reminder_text in result:
+            reminder_dispatcher.submit(
+                chat_id=telegram_id,
+                text=f"🔔 Напоминание:\n{reminder_text}",
+                due=minute
+            )
+
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher):
+
+
+    # До миграций: второй экземпляр не должен ни мигрировать БД, ни рассылать напоминания
+    await instance_lock.acquire(engine)
+    # Потеряли блокировку — отменяем основную задачу (polling или вебхук), бот штатно останавливается
+    instance_lock.watch(Config.INSTANCE_LOCK_CHECK_INTERVAL, on_lost=asyncio.current_task().cancel)
+    await run_migrations(engine)
+    if isinstance(dispatcher.storage, DbStorage):
+        dispatcher.storage.start(Config.FSM_PURGE_INTERVAL)
+
+    async for session in get_db_session():
+        await reminder_index.load(session)
+        await leaderboard.load(session)
+        await ban_list.load(session)
+    global_stats.load()
+    global_stats.start(Config.STATS_RECONCILE_INTERVAL)
+    chart_renderer.start(Config.CHART_WORKERS, Config.CHART_QUEUE_SIZE, Config.CHART_TIMEOUT)
+
+    reminder_dispatcher.start(
+        bot,
+        concurrency=Config.REMINDER_WORKERS,
+        global_rate=Config.TELEGRAM_GLOBAL_RATE,
+        chat_rate=Config.TELEGRAM_CHAT_RATE
+    )
+
+    # Настройка планировщика для напоминаний
+    global reminder_scheduler
+    reminder_scheduler = ReminderScheduler(
+        partial(send_reminders, bot),
+        max_catchup_minutes=Config.REMINDER_CATCHUP_MINUTES,
+        # Минута считается обработанной, когда её напоминания отправлены, а не поставлены в очередь
+        unfinished=reminder_dispatcher.oldest_unsent
+    )
+    await reminder_scheduler.start()
+
+    await bot.set_my_commands([
+        BotCommand(command="start", description="Запустить бота"),
+        BotCommand(command="add", description="Добавить тренировку"),
+        BotCommand(command="remind", description="Управление напоминаниями"),
+        BotCommand(command="admin", description="Админ-панель (для админов)")
+    ])
+    logging.info("✅ Бот успешно запущен")
+
+
+async def on_shutdown(dispatcher: Dispatcher):
+    """Действия при выключении бота"""
+    logging.warning("🛑 Выключаемся...")
+    if reminder_scheduler:
+        await reminder_scheduler.stop()
+    # Досылаем очередь и сохраняем, до какой минуты всё отправлено: остальное
+    # планировщик обработает заново после запуска
+    await reminder_dispatcher.drain(Config.REMINDER_DRAIN_TIMEOUT)
+    await reminder_dispatcher.stop()
+    if reminder_scheduler:
+        await reminder_scheduler.commit_progress()
+    await global_stats.stop()
+    await chart_renderer.stop()
+    query_profiler.dump_to_file(Config.SQL_PROFILE_DUMP)
+    await dispatcher.storage.close()
+    await instance_lock.release()
+    await engine.dispose()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Хранилище FSM по Config.FSM_STORAGE"""
+    if Config.FSM_STORAGE == "db":
+        return DbStorage(AsyncSessionLocal, ttl=Config.FSM_STATE_TTL)
+    if Config.FSM_STORAGE == "redis":
+        # redis — необязательная зависимость, нужна только этому варианту
+        from aiogram.fsm.storage.redis import RedisStorage
+        ttl = int(Config.FSM_STATE_TTL)
+        return RedisStorage.from_url(Config.FSM_REDIS_URL, state_ttl=ttl, data_ttl=ttl)
+    if Config.FSM_STORAGE == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Неизвестное хранилище FSM: {Config.FSM_STORAGE}")
+
+
+def create_bot() -> Bot:
+    session = None
+    if Config.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(Config.TELEGRAM_API_URL))
+    return Bot(
+        token=Config.BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode="HTML")
+    )
+
+
+def create_dispatcher() -> Dispatcher:
+    """Диспетчер со всеми мидлварями и обработчиками (один на процесс: роутеры подключаются один раз)"""
+    storage = create_fsm_storage()
+    # Апдейты одного пользователя обрабатываются по очереди: чтение состояния не обгоняет запись
+    dp = Dispatcher(storage=storage, events_isolation=KeyLockIsolation())
+
+    # FSM-мидлварь aiogram регистрируется в Dispatcher первой; переносим её после бана
+    # и пачки FSM, чтобы её чтение состояния тоже попадало в пачку
+    dp.update.outer_middleware.unregister(dp.fsm)
+    # Запросы мидлварей ниже попадают в профиль под меткой update:<тип>, а не background
+    dp.update.outer_middleware(HandlerNameMiddleware())
+    # Апдейты забаненных отбрасываются первыми, до FSM, кэша пользователей и БД
+    dp.update.outer_middleware(BanMiddleware())
+    if isinstance(storage, DbStorage):
+        # Состояние читается из БД один раз за апдейт, изменения записываются одной строкой в конце
+        dp.update.outer_middleware(FsmBatchMiddleware(storage))
+    dp.update.outer_middleware(dp.fsm)
+    if isinstance(storage, DbStorage):
+        # Запись — пока FSM-мидлварь держит блокировку пользователя
+        dp.update.outer_middleware(FsmFlushMiddleware(storage))
+    # Сессия БД на апдейт: соединение берётся при первом запросе, незафиксированное в конце откатывается
+    dp.update.outer_middleware(DbSessionMiddleware())
+    # Пользователь апдейта (current_user) нужен почти всем обработчикам
+    dp.update.outer_middleware(IdentityMiddleware())
+
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
+
+    # Регистрация обработчиков
+    dp.include_router(user_handlers.router)
+    dp.include_router(admin_handlers.router)
+    dp.include_router(workout_handlers.router)
+    dp.include_router(reminder_handlers.router)
+    dp.include_router(stats_handlers.router)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+async def main():
+    """Основная функция запуска бота"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    )
+
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    try:
+        if Config.BOT_MODE == "webhook":
+            await run_webhook(dp, bot, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT)
+        elif Config.BOT_MODE == "polling":
+            # getUpdates не работает, пока у бота зарегистрирован вебхук
+            await bot.delete_webhook()
+            # Telegram присылает только типы апдейтов, на которые есть обработчики
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        else:
+            raise ValueError(f"Неизвестный режим BOT_MODE: {Config.BOT_MODE}")
+    except asyncio.CancelledError:
+        if instance_lock.lost:
+            raise RuntimeError("Блокировку экземпляра занял другой процесс, бот остановлен")
+        raise
+
@@ -9,4 +9,76 @@ class Config:
     DB_PORT = os.getenv("DB_PORT")
     DB_NAME = os.getenv("DB_NAME")
     DB_USER = os.getenv("DB_USER")
-    DB_PASS = os.getenv("DB_PASS")
\ No newline at end of file
+    DB_PASS = os.getenv("DB_PASS")
+
+    # Сколько пропущенных минут планировщик напоминаний досылает после простоя
+    REMINDER_CATCHUP_MINUTES = int(os.getenv("REMINDER_CATCHUP_MINUTES", 60))
+
+    # Рассылка напоминаний: число воркеров и лимиты Telegram (сообщений в секунду)
+    REMINDER_WORKERS = int(os.getenv("REMINDER_WORKERS", 8))
+    TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+    TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+    # Сколько секунд при остановке досылать очередь напоминаний
+    REMINDER_DRAIN_TIMEOUT = float(os.getenv("REMINDER_DRAIN_TIMEOUT", 10))
+
+    # Профилирование SQL: доля запросов в статистике, порог медленного запроса (мс), файл дампа
+    SQL_PROFILE_SAMPLE_RATE = float(os.getenv("SQL_PROFILE_SAMPLE_RATE", 0.1))
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", 200))
+    SQL_PROFILE_DUMP = os.getenv("SQL_PROFILE_DUMP", "sql_profile.json")
+
+    # Пул соединений с БД
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))  # MySQL закрывает простаивающие соединения (wait_timeout)
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_POOL_SLOW_WAIT_MS = float(os.getenv("DB_POOL_SLOW_WAIT_MS", 100))
+    # Размер кэша скомпилированных SQL-выражений SQLAlchemy
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+
+    # Время жизни кэша статистики по периодам, секунд
+    STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", 300))
+    # Как часто общая статистика и рейтинг сверяются с БД, секунд
+    STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", 3600))
+
+    # Экспорт: лимит размера одного документа (у Telegram — 50 МБ), сколько держать в памяти до сброса
+    # на диск и размер пачки строк серверного курсора
+    EXPORT_PART_BYTES = int(os.getenv("EXPORT_PART_BYTES", 45 * 1024 * 1024))
+    EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", 8 * 1024 * 1024))
+    EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", 1000))
+
+    # Графики: число процессов, сколько графиков может ждать в очереди и таймаут построения, секунд
+    CHART_WORKERS = int(os.getenv("CHART_WORKERS", 2))
+    CHART_QUEUE_SIZE = int(os.getenv("CHART_QUEUE_SIZE", 8))
+    CHART_TIMEOUT = float(os.getenv("CHART_TIMEOUT", 15))
+    # Кэш графиков: сколько хранить file_id и байты, секунд, и сколько PNG держать в памяти
+    CHART_CACHE_TTL = float(os.getenv("CHART_CACHE_TTL", 24 * 3600))
+    CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", 200))
+
+    # Кэш пользователей для middleware: время жизни записи, секунд, и число записей
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 50_000))
+
+    # Хранилище FSM: db (MySQL, переживает перезапуск), redis или memory (теряется при перезапуске).
+    # Время жизни брошенного диалога и интервал очистки просроченных, секунд
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "db")
+    FSM_STATE_TTL = float(os.getenv("FSM_STATE_TTL", 24 * 3600))
+    FSM_PURGE_INTERVAL = float(os.getenv("FSM_PURGE_INTERVAL", 3600))
+    FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+
+    # Как часто проверяется блокировка единственного экземпляра, секунд (меньше wait_timeout MySQL)
+    INSTANCE_LOCK_CHECK_INTERVAL = float(os.getenv("INSTANCE_LOCK_CHECK_INTERVAL", 60))
+
+    # Получение апдейтов: polling или webhook (aiohttp-сервер); в обоих режимах — один экземпляр на БД
+    BOT_MODE = os.getenv("BOT_MODE", "polling")
+    WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")  # Публичный адрес, например https://bot.example.com
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Проверяется в заголовке X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+    # Апдейт Telegram — несколько килобайт; больше — отвечаем 413, не читая тело
+    WEBHOOK_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", 256 * 1024))
+    # Сколько одновременных соединений с вебхуком открывает Telegram (1–100)
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+    # Другой сервер Bot API (например, services.fake_telegram для нагрузочных тестов)
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
@@ -4,25 +4,39 @@
 - Базовый класс моделей Base
 - Функцию получения сессии get_db
 - Движок подключения engine
-- Все модели (User, Workout, Exercise, Reminder)
+- Функцию применения миграций run_migrations
+- Профилировщик запросов query_profiler
+- Состояние пула соединений pool_status
+- Все модели (User, Workout, Exercise, Reminder, WorkoutDailyRollup, SchedulerState, FsmState)
 """
 
-from .session import Base, get_db_session, engine, check_db_connection
+from .session import Base, get_db_session, engine, check_db_connection, query_profiler
+from .pool import pool_status
+from .migrations import run_migrations
 from .models import (
     User,
     Workout,
     Exercise,
-    Reminder
+    Reminder,
+    WorkoutDailyRollup,
+    SchedulerState,
+    FsmState
 )
 
 __all__ = [
     'Base',
     'get_db_session',  # Изменили с get_db на get_db_session
     'engine',
+    'run_migrations',
+    'query_profiler',
+    'pool_status',
     'User',
     'Workout',
     'Exercise',
-    'Reminder'
+    'Reminder',
+    'WorkoutDailyRollup',
+    'SchedulerState',
+    'FsmState'
 ]
 
 
@@ -0,0 +1,259 @@
+"""
+Хранилище состояний FSM aiogram в MySQL.
+В отличие от MemoryStorage состояния переживают перезапуск, а брошенные
+диалоги не копятся: у каждой строки есть срок жизни, просроченные не
+читаются и периодически удаляются.
+Данные хранятся компактным JSON, большие — сжатыми zlib.
+Внутри апдейта (FsmBatchMiddleware) состояние каждого ключа читается из
+БД один раз, а все set_state/set_data/update_data сводятся к одной записи
+в конце апдейта (FsmFlushMiddleware). Запись идёт под блокировкой ключа
+(KeyLockIsolation), поэтому следующий апдейт того же пользователя читает
+уже записанное состояние. Блокировка — в памяти процесса: бот рассчитан
+на один экземпляр (см. database.instance_lock).
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import zlib
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .models import FsmState
+
+# Данные короче порога хранятся несжатыми: zlib на них только проигрывает
+_COMPRESS_FROM = 256
+_RAW = b"j"
+_ZLIB = b"z"
+
+
+def dump_data(data: Mapping[str, Any]) -> bytes | None:
+    if not data:
+        return None
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) < _COMPRESS_FROM:
+        return _RAW + raw
+    return _ZLIB + zlib.compress(raw)
+
+
+def load_data(blob: bytes | None) -> dict[str, Any]:
+    if not blob:
+        return {}
+    raw = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+    return json.loads(raw)
+
+
+class FsmStateLost(Exception):
+    """Изменения состояния диалога не удалось записать в БД"""
+
+
+@dataclass
+class _Entry:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    dirty: bool = False
+
+
+# Состояния ключей текущего апдейта (None — вне FsmBatchMiddleware)
+_batch: ContextVar[dict[str, _Entry] | None] = ContextVar("fsm_batch", default=None)
+
+
+@dataclass
+class FsmStorageStats:
+    reads: int = 0
+    writes: int = 0  # Записанные строки (в том числе удаления)
+    coalesced: int = 0  # Изменения, объединённые с другими в одну запись
+    purged: int = 0
+
+    def snapshot(self) -> dict:
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'purged': self.purged
+        }
+
+
+class DbStorage(BaseStorage):
+    def __init__(self, session_factory: async_sessionmaker, ttl: float):
+        self._session_factory = session_factory
+        self._ttl = timedelta(seconds=ttl)
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._task: asyncio.Task | None = None
+        self.stats = FsmStorageStats()
+
+    @asynccontextmanager
+    async def batch(self):
+        """Чтения и записи одного апдейта; то, что не записал flush(), пишется по выходу"""
+        if _batch.get() is not None:
+            yield
+            return
+
+        token = _batch.set({})
+        try:
+            yield
+            await self.flush()
+        finally:
+            _batch.reset(token)
+
+    async def flush(self):
+        """Записывает изменения текущего апдейта одной транзакцией; FsmStateLost — запись не удалась"""
+        entries = _batch.get()
+        dirty = {name: entry for name, entry in (entries or {}).items() if entry.dirty}
+        if not dirty:
+            return
+        try:
+            await self._save(dirty)
+        except Exception as e:
+            # Несохранённые изменения отбрасываются: в БД остаётся прежнее состояние
+            entries.clear()
+            raise FsmStateLost(str(e)) from e
+
+    async def _entry(self, key: StorageKey) -> tuple[str, _Entry]:
+        name = self._key_builder.build(key)
+        entries = _batch.get()
+        if entries is not None and name in entries:
+            return name, entries[name]
+
+        entry = await self._load(name)
+        if entries is not None:
+            entries[name] = entry
+        return name, entry
+
+    async def _changed(self, name: str, entry: _Entry):
+        if _batch.get() is None:
+            await self._save({name: entry})
+        elif entry.dirty:
+            self.stats.coalesced += 1
+        else:
+            entry.dirty = True
+
+    async def _load(self, name: str) -> _Entry:
+        self.stats.reads += 1
+        async with self._session_factory() as session:
+            row = (await session.execute(
+                select(FsmState.state, FsmState.data)
+                .where(FsmState.key == name, FsmState.expires_at > datetime.utcnow())
+            )).first()
+        if row is None:
+            return _Entry()
+        return _Entry(row.state, load_data(row.data))
+
+    async def _save(self, entries: dict[str, _Entry]):
+        expires_at = datetime.utcnow() + self._ttl
+        async with self._session_factory() as session:
+            for name, entry in entries.items():
+                blob = dump_data(entry.data)
+                if entry.state is None and blob is None:
+                    # Диалог завершён (state.clear()) — строка не нужна
+                    await session.execute(delete(FsmState).where(FsmState.key == name))
+                    continue
+                statement = mysql_insert(FsmState).values(
+                    key=name,
+                    state=entry.state,
+                    data=blob,
+                    expires_at=expires_at
+                )
+                await session.execute(statement.on_duplicate_key_update(
+                    state=statement.inserted.state,
+                    data=statement.inserted.data,
+                    expires_at=statement.inserted.expires_at
+                ))
+            await session.commit()
+        self.stats.writes += len(entries)
+        for entry in entries.values():
+            entry.dirty = False
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name, entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        await self._changed(name, entry)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, entry = await self._entry(key)
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        name, entry = await self._entry(key)
+        entry.data = copy.deepcopy(dict(data))
+        await self._changed(name, entry)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, entry = await self._entry(key)
+        return copy.deepcopy(entry.data)
+
+    async def purge_expired(self) -> int:
+        """Удаляет просроченные состояния (брошенные диалоги)"""
+        async with self._session_factory() as session:
+            result = await session.execute(delete(FsmState).where(FsmState.expires_at <= datetime.utcnow()))
+            await session.commit()
+        self.stats.purged += result.rowcount
+        return result.rowcount
+
+    def start(self, purge_interval: float):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(purge_interval))
+
+    async def close(self) -> None:
+        # Вызывается дважды: из on_shutdown и из Dispatcher (fsm.close)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                purged = await self.purge_expired()
+                if purged:
+                    logging.info(f"Удалено просроченных состояний FSM: {purged}")
+            except Exception as e:
+                logging.error(f"Ошибка очистки состояний FSM: {e}", exc_info=True)
+
+
+@dataclass
+class _KeyLock:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    waiters: int = 0
+
+
+class KeyLockIsolation(BaseEventIsolation):
+    """
+    Апдейты одного ключа FSM обрабатываются по очереди, так что чтение
+    состояния не обгоняет запись предыдущего апдейта. В отличие от
+    SimpleEventIsolation блокировки ключей без ожидающих апдейтов удаляются.
+    """
+
+    def __init__(self):
+        self._locks: dict[StorageKey, _KeyLock] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey):
+        key_lock = self._locks.get(key)
+        if key_lock is None:
+            key_lock = self._locks[key] = _KeyLock()
+        key_lock.waiters += 1
+        try:
+            async with key_lock.lock:
+                yield
+        finally:
+            key_lock.waiters -= 1
+            if not key_lock.waiters:
+                del self._locks[key]
+
+    async def close(self) -> None:
+        self._locks.clear()
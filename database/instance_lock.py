@@ -0,0 +1,130 @@
+"""
+Защита от второго экземпляра бота на той же БД.
+Планировщик и индекс напоминаний, список банов, кэши пользователей и
+графиков, рейтинг и общая статистика живут в памяти процесса и
+обновляются только его собственными обработчиками. Два экземпляра
+дважды рассылали бы напоминания и расходились бы в банах и цифрах,
+поэтому бот поддерживает ровно один экземпляр (и в режиме polling, и с
+вебхуком). При запуске он берёт именованную блокировку MySQL (GET_LOCK)
+на отдельном соединении и держит её до остановки: второй экземпляр
+не запустится, пока первый работает. Блокировка снимается и при обрыве
+соединения, так что упавший процесс её не удерживает.
+Соединение с блокировкой периодически проверяется (заодно это не даёт
+MySQL закрыть его по wait_timeout). Если блокировка потеряна и вернуть
+её не удалось — её мог занять другой экземпляр, — бот останавливается.
+"""
+
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+class InstanceLock:
+    def __init__(self, name: str):
+        self.name = name
+        self.lost = False  # Блокировка потеряна, бот остановлен проверкой
+        self._engine: AsyncEngine | None = None
+        self._connection: AsyncConnection | None = None
+        self._watch_task: asyncio.Task | None = None
+
+    async def acquire(self, engine: AsyncEngine):
+        """RuntimeError — блокировку держит другой экземпляр"""
+        if engine.dialect.name != "mysql":
+            logging.warning(f"Блокировка экземпляра не поддерживается для {engine.dialect.name}, пропускаем")
+            return
+
+        self._engine = engine
+        if not await self._lock():
+            raise RuntimeError(f"Бот уже запущен с этой БД (занята блокировка {self.name!r})")
+        logging.info(f"Блокировка экземпляра {self.name!r} получена")
+
+    def watch(self, interval: float, on_lost: Callable[[], None]):
+        """Проверяет блокировку каждые interval секунд; on_lost — вернуть её не удалось"""
+        if self._connection is not None:
+            self._watch_task = asyncio.create_task(self._watch(interval, on_lost))
+
+    async def release(self):
+        """Снимает блокировку; ошибки соединения не мешают остановке бота"""
+        task, self._watch_task = self._watch_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            await connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+            await connection.commit()
+        except Exception as e:
+            logging.warning(f"Не удалось снять блокировку экземпляра {self.name!r}: {e}")
+        await self._close(connection)
+
+    async def _lock(self) -> bool:
+        """Берёт блокировку на новом соединении, не дожидаясь её освобождения"""
+        connection = await self._engine.connect()
+        try:
+            acquired = (await connection.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.name})).scalar()
+            # Блокировка принадлежит сессии MySQL, а не транзакции
+            await connection.commit()
+        except BaseException:
+            await self._close(connection)
+            raise
+        if acquired != 1:
+            await self._close(connection)
+            return False
+        self._connection = connection
+        return True
+
+    async def _held(self) -> bool:
+        if self._connection is None:
+            return False
+        try:
+            held = (await self._connection.execute(
+                text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"),
+                {"name": self.name}
+            )).scalar()
+            await self._connection.commit()
+            return held == 1
+        except Exception as e:
+            logging.warning(f"Соединение с блокировкой экземпляра потеряно: {e}")
+            return False
+
+    async def _watch(self, interval: float, on_lost: Callable[[], None]):
+        while True:
+            await asyncio.sleep(interval)
+            if await self._held():
+                continue
+
+            logging.warning(f"Блокировка экземпляра {self.name!r} потеряна, берём заново")
+            connection, self._connection = self._connection, None
+            await self._close(connection)
+            try:
+                if await self._lock():
+                    logging.info(f"Блокировка экземпляра {self.name!r} получена заново")
+                    continue
+            except Exception as e:
+                logging.error(f"Ошибка повторного получения блокировки экземпляра: {e}")
+                # БД недоступна — пробуем на следующей проверке
+                continue
+
+            logging.critical(f"Блокировку {self.name!r} занял другой экземпляр, останавливаем бота")
+            self.lost = True
+            self._watch_task = None
+            on_lost()
+            return
+
+    @staticmethod
+    async def _close(connection: AsyncConnection | None):
+        if connection is None:
+            return
+        try:
+            await connection.close()
+        except Exception as e:
+            logging.warning(f"Ошибка закрытия соединения блокировки экземпляра: {e}")
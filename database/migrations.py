@@ -0,0 +1,208 @@
+"""
+Миграции схемы БД.
+Каждая миграция — синхронная функция, получающая соединение (выполняется
+через conn.run_sync). Номера применённых миграций хранятся в таблице
+schema_version. Миграции идемпотентны: на новой БД схему целиком создаёт
+первая миграция по Base.metadata, а последующие ничего не меняют.
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table, delete, func, inspect, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .session import Base
+from . import models
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = []
+
+
+def migration(version: int, description: str):
+    """Регистрирует функцию как миграцию с указанным номером"""
+    def decorator(upgrade: Callable[[Connection], None]):
+        MIGRATIONS.append((version, description, upgrade))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return upgrade
+    return decorator
+
+
+def create_index_if_missing(conn: Connection, index: Index):
+    """Создаёт индекс, если в таблице нет индекса с тем же началом"""
+    columns = [column.name for column in index.columns]
+    for existing in inspect(conn).get_indexes(index.table.name):
+        if existing["column_names"][:len(columns)] == columns:
+            return
+    index.create(conn)
+    logging.info(f"Создан индекс {index.name}")
+
+
+def column_names(conn: Connection, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table_name)}
+
+
+def add_column_if_missing(conn: Connection, column: Column) -> bool:
+    """Добавляет колонку модели в существующую таблицу"""
+    table_name = column.table.name
+    if column.name in column_names(conn, table_name):
+        return False
+
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT '{column.server_default.arg}'"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    conn.execute(text(ddl))
+    logging.info(f"Добавлена колонка {table_name}.{column.name}")
+    return True
+
+
+def drop_column_if_exists(conn: Connection, table_name: str, column_name: str):
+    if column_name in column_names(conn, table_name):
+        conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column_name}"))
+        logging.info(f"Удалена колонка {table_name}.{column_name}")
+
+
+@migration(1, "Начальная схема")
+def _initial_schema(conn: Connection):
+    Base.metadata.create_all(conn)
+
+
+@migration(2, "Индексы под частые запросы")
+def _hot_query_indexes(conn: Connection):
+    for table in (models.User.__table__, models.Workout.__table__, models.Exercise.__table__):
+        for index in table.indexes:
+            create_index_if_missing(conn, index)
+
+
+@migration(3, "Дни недели напоминаний в виде битовой маски")
+def _reminder_days_mask(conn: Connection):
+    add_column_if_missing(conn, models.Reminder.__table__.c.days_mask)
+    if "day_of_week" not in column_names(conn, "reminders"):
+        return
+
+    # Названия дней, которые встречались в day_of_week
+    day_names = [
+        ("monday", "понедельник"),
+        ("tuesday", "вторник"),
+        ("wednesday", "среда"),
+        ("thursday", "четверг"),
+        ("friday", "пятница"),
+        ("saturday", "суббота"),
+        ("sunday", "воскресенье")
+    ]
+    day_bits = {name: 1 << weekday for weekday, names in enumerate(day_names) for name in names}
+
+    rows = conn.execute(text(
+        "SELECT reminder_id, user_id, reminder_time, reminder_text, day_of_week "
+        "FROM reminders ORDER BY reminder_id"
+    )).all()
+
+    # Одинаковые напоминания на разные дни сливаются в одну строку
+    merged: dict[tuple, tuple[int, int]] = {}
+    duplicates = []
+    for reminder_id, user_id, reminder_time, reminder_text, day in rows:
+        bit = day_bits.get((day or "").strip().lower(), 0)
+        key = (user_id, reminder_time, reminder_text)
+        if key in merged:
+            first_id, mask = merged[key]
+            merged[key] = (first_id, mask | bit)
+            duplicates.append(reminder_id)
+        else:
+            merged[key] = (reminder_id, bit)
+
+    if merged:
+        conn.execute(
+            text("UPDATE reminders SET days_mask = :mask WHERE reminder_id = :reminder_id"),
+            [{"mask": mask, "reminder_id": reminder_id} for reminder_id, mask in merged.values()]
+        )
+    if duplicates:
+        conn.execute(
+            text("DELETE FROM reminders WHERE reminder_id = :reminder_id"),
+            [{"reminder_id": reminder_id} for reminder_id in duplicates]
+        )
+
+    logging.info(f"Перенесено напоминаний: {len(merged)}, объединено дубликатов: {len(duplicates)}")
+    drop_column_if_exists(conn, "reminders", "day_of_week")
+
+
+@migration(4, "Часовой пояс пользователя и UTC-расписание напоминаний")
+def _user_timezone(conn: Connection):
+    add_column_if_missing(conn, models.User.__table__.c.timezone)
+    # UTC-колонки заполняет индекс напоминаний при загрузке
+    add_column_if_missing(conn, models.Reminder.__table__.c.utc_days_mask)
+    add_column_if_missing(conn, models.Reminder.__table__.c.utc_time)
+
+
+@migration(5, "Дневные суммы тренировок")
+def _workout_daily_rollups(conn: Connection):
+    rollups = models.WorkoutDailyRollup.__table__
+    workouts = models.Workout.__table__
+    rollups.create(conn, checkfirst=True)
+
+    # Пересчёт с нуля: повторный запуск даёт тот же результат
+    day = func.date(workouts.c.date)
+    conn.execute(delete(rollups))
+    conn.execute(insert(rollups).from_select(
+        [
+            "user_id", "day", "type",
+            "workouts_count", "total_duration", "total_calories", "total_distance"
+        ],
+        select(
+            workouts.c.user_id,
+            day,
+            workouts.c.type,
+            func.count(workouts.c.workout_id),
+            func.coalesce(func.sum(workouts.c.duration), 0),
+            func.coalesce(func.sum(workouts.c.calories), 0),
+            func.coalesce(func.sum(workouts.c.distance), 0)
+        ).group_by(workouts.c.user_id, day, workouts.c.type)
+    ))
+
+
+@migration(6, "Хранилище состояний FSM")
+def _fsm_states(conn: Connection):
+    models.FsmState.__table__.create(conn, checkfirst=True)
+
+
+@migration(7, "Дата регистрации пользователя обязательна")
+def _registration_date_not_null(conn: Connection):
+    # Список пользователей листается по (registration_date, user_id): без даты
+    # пользователь не попадает ни на одну страницу и ломает курсор. Неизвестная
+    # дата заменяется самой ранней, такие пользователи оказываются в конце списка
+    users = models.User.__table__
+    earliest = conn.execute(select(func.min(users.c.registration_date))).scalar() or datetime.utcnow()
+    filled = conn.execute(
+        users.update().where(users.c.registration_date.is_(None)).values(registration_date=earliest)
+    ).rowcount
+    if filled:
+        logging.info(f"Заполнена дата регистрации у пользователей: {filled}")
+    if conn.dialect.name == "mysql":
+        conn.execute(text("ALTER TABLE users MODIFY registration_date DATETIME NOT NULL"))
+
+
+def _upgrade(conn: Connection):
+    schema_version.create(conn, checkfirst=True)
+    current = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+    for version, description, upgrade in MIGRATIONS:
+        if version <= current:
+            continue
+        logging.info(f"Миграция {version}: {description}")
+        upgrade(conn)
+        conn.execute(insert(schema_version).values(version=version, applied_at=datetime.utcnow()))
+
+
+async def run_migrations(engine: AsyncEngine):
+    """Применяет к БД все ещё не применённые миграции"""
+    async with engine.begin() as conn:
+        await conn.run_sync(_upgrade)
@@ -1,8 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, BigInteger, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, BigInteger, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from .session import Base
-from sqlalchemy import Time
+from sqlalchemy import Time, Date
 
 
 class User(Base):
@@ -11,14 +11,19 @@ class User(Base):
     user_id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, unique=True, nullable=False)
     name = Column(Text)
-    registration_date = Column(DateTime, default=datetime.utcnow)
+    registration_date = Column(DateTime, nullable=False, default=datetime.utcnow)  # Ключ списка пользователей в админке
     is_admin = Column(Boolean, default=False)
     is_banned = Column(Boolean, default=False)
     notifications_enabled = Column(Boolean, default=True)  # Новое поле
+    timezone = Column(String(64), nullable=False, default="Europe/Moscow", server_default="Europe/Moscow")
 
     workouts = relationship("Workout", back_populates="user")
     reminders = relationship("Reminder", back_populates="user")
 
+    __table_args__ = (
+        Index("ix_users_registration_date", "registration_date"),  # Список пользователей в админке
+    )
+
 
 class Workout(Base):
     __tablename__ = "workouts"
@@ -35,6 +40,10 @@ class Workout(Base):
     user = relationship("User", back_populates="workouts")
     exercises = relationship("Exercise", back_populates="workout")
 
+    __table_args__ = (
+        Index("ix_workouts_user_date", "user_id", "date"),  # Списки, статистика и экспорт пользователя
+    )
+
 
 class Exercise(Base):
     __tablename__ = "exercises"
@@ -48,6 +57,10 @@ class Exercise(Base):
 
     workout = relationship("Workout", back_populates="exercises")
 
+    __table_args__ = (
+        Index("ix_exercises_workout_id", "workout_id"),
+    )
+
 
 class Reminder(Base):
     __tablename__ = "reminders"
@@ -56,7 +69,44 @@ class Reminder(Base):
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     reminder_text = Column(Text)
     reminder_time = Column(Time, nullable=False)
-    day_of_week = Column(Text)
+    days_mask = Column(Integer, nullable=False, default=0, server_default="0")  # Бит 0 — понедельник
+    # То же расписание в UTC по текущему смещению пояса пользователя (пересчитывается при смене пояса и DST)
+    utc_days_mask = Column(Integer)
+    utc_time = Column(Time)
+
+
+    user = relationship("User", back_populates="reminders")
+
+
+class WorkoutDailyRollup(Base):
+    """Суммы тренировок пользователя за день по типу (обновляются при записи тренировок)"""
+    __tablename__ = "workout_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(String(50), primary_key=True)
+    workouts_count = Column(Integer, nullable=False, default=0)
+    total_duration = Column(Float, nullable=False, default=0)
+    total_calories = Column(Float, nullable=False, default=0)
+    total_distance = Column(Float, nullable=False, default=0)
+
+
+class SchedulerState(Base):
+    __tablename__ = "scheduler_state"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(DateTime, nullable=False)  # Время в UTC
+
+
+class FsmState(Base):
+    """Состояние диалога aiogram (FSM), см. database.fsm_storage"""
+    __tablename__ = "fsm_states"
 
+    key = Column(String(191), primary_key=True)  # Ключ StorageKey: бот, чат, пользователь, поток
+    state = Column(String(255))
+    data = Column(LargeBinary)  # Сжатый JSON, NULL — пустые данные
+    expires_at = Column(DateTime, nullable=False)  # UTC; просроченные строки не читаются и удаляются
 
-    user = relationship("User", back_populates="reminders")
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_fsm_states_expires_at", "expires_at"),  # Очистка просроченных
+    )
@@ -0,0 +1,70 @@
+"""
+Пул соединений с замером ожидания.
+Считает, сколько раз и как долго обработчики ждали свободное соединение,
+чтобы видеть нехватку пула (например, во время утренней рассылки напоминаний).
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    waits: int = 0  # Выдачи, которым пришлось ждать дольше порога
+    timeouts: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    slow_wait_ms: float = 100.0
+
+    def record(self, wait_ms: float):
+        self.checkouts += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        if wait_ms >= self.slow_wait_ms:
+            self.waits += 1
+            logging.warning(f"Ожидание соединения из пула: {wait_ms:.1f} мс")
+
+    def snapshot(self) -> dict:
+        return {
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+
+# Общая статистика: переживает пересоздание пула (recreate/dispose)
+pool_stats = PoolStats()
+
+
+class MonitoredPool(AsyncAdaptedQueuePool):
+    """Очередь соединений, замеряющая время получения соединения"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            logging.error(f"Не дождались соединения из пула за {self._timeout} с: {self.status()}")
+            raise
+        pool_stats.record((time.perf_counter() - start) * 1000)
+        return connection
+
+
+def pool_status(pool: MonitoredPool) -> dict:
+    """Текущее состояние пула вместе с накопленной статистикой ожидания"""
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': max(pool.overflow(), 0),
+        'max_overflow': pool._max_overflow,
+        **pool_stats.snapshot()
+    }
@@ -0,0 +1,172 @@
+"""
+Профилировщик SQL-запросов.
+Подписывается на события движка SQLAlchemy и собирает по каждому виду
+запроса число выполнений, гистограмму времени, число строк и обработчики,
+из которых запрос был вызван. Медленные запросы логируются всегда,
+остальные попадают в статистику с заданной вероятностью.
+Число запросов и время в БД каждого апдейта считаются без выборки.
+"""
+
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Имя обработчика aiogram (или фоновой задачи), выполняющего запрос
+current_handler: ContextVar[str] = ContextVar("current_handler", default="background")
+
+# Верхние границы корзин гистограммы, мс
+HISTOGRAM_BOUNDS = (1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+
+def fingerprint(statement: str) -> str:
+    """Нормализует текст запроса: IN (%s, %s, ...) с разным числом параметров — один вид"""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("(...)", statement)
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    histogram: list[int] = field(default_factory=lambda: [0] * len(HISTOGRAM_BOUNDS))
+    handlers: Counter = field(default_factory=Counter)
+
+    def record(self, elapsed_ms: float, rows: int, handler: str):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += max(rows, 0)
+        self.handlers[handler] += 1
+        for position, bound in enumerate(HISTOGRAM_BOUNDS):
+            if elapsed_ms <= bound:
+                self.histogram[position] += 1
+                break
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'histogram': dict(zip(map(str, HISTOGRAM_BOUNDS), self.histogram)),
+            'handlers': dict(self.handlers.most_common())
+        }
+
+
+@dataclass
+class UpdateDbStats:
+    """Запросы к БД одного апдейта"""
+    statements: int = 0
+    db_ms: float = 0.0
+
+
+# Счётчик апдейта, который сейчас обрабатывается (None — фоновая задача)
+current_update: ContextVar[UpdateDbStats | None] = ContextVar("current_update", default=None)
+
+
+@dataclass
+class UpdateDbTotals:
+    updates: int = 0
+    with_db: int = 0  # Апдейты, которым понадобилось соединение
+    statements: int = 0
+    db_ms: float = 0.0
+    max_db_ms: float = 0.0
+    max_statements: int = 0
+
+    def record(self, stats: UpdateDbStats):
+        self.updates += 1
+        if not stats.statements:
+            return
+        self.with_db += 1
+        self.statements += stats.statements
+        self.db_ms += stats.db_ms
+        self.max_db_ms = max(self.max_db_ms, stats.db_ms)
+        self.max_statements = max(self.max_statements, stats.statements)
+
+    def snapshot(self) -> dict:
+        return {
+            'updates': self.updates,
+            'with_db': self.with_db,
+            'avg_statements': self.statements / self.updates if self.updates else 0.0,
+            'avg_db_ms': self.db_ms / self.updates if self.updates else 0.0,
+            'max_statements': self.max_statements,
+            'max_db_ms': self.max_db_ms
+        }
+
+
+update_db_totals = UpdateDbTotals()
+
+
+class QueryProfiler:
+    def __init__(self, sample_rate: float = 0.1, slow_query_ms: float = 200.0):
+        self.sample_rate = sample_rate
+        self.slow_query_ms = slow_query_ms
+        self.statements: dict[str, StatementStats] = {}
+        self.slow_queries = 0
+
+    def install(self, engine: AsyncEngine):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def reset(self):
+        self.statements.clear()
+        self.slow_queries = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Контекст живёт один запрос: при ошибке время начала не копится на соединении из пула
+        context._query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+        handler = current_handler.get()
+
+        update = current_update.get()
+        if update is not None:
+            update.statements += 1
+            update.db_ms += elapsed_ms
+
+        slow = elapsed_ms >= self.slow_query_ms
+        if slow:
+            self.slow_queries += 1
+            logging.warning(f"Медленный запрос ({elapsed_ms:.1f} мс, {handler}): {fingerprint(statement)[:500]}")
+        elif random.random() >= self.sample_rate:
+            return
+
+        key = fingerprint(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = StatementStats()
+        stats.record(elapsed_ms, cursor.rowcount, handler)
+
+    def top(self, limit: int = 10) -> list[tuple[str, StatementStats]]:
+        """Запросы с наибольшим суммарным временем"""
+        return sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)[:limit]
+
+    def dump(self) -> str:
+        return json.dumps({
+            'sample_rate': self.sample_rate,
+            'slow_query_ms': self.slow_query_ms,
+            'slow_queries': self.slow_queries,
+            'statements': {statement: stats.as_dict() for statement, stats in self.top(len(self.statements))}
+        }, indent=2, ensure_ascii=False)
+
+    def dump_to_file(self, path: str) -> str:
+        dump = self.dump()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(dump)
+        logging.info(f"Профиль SQL-запросов сохранён в {path}")
+        return dump
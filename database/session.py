@@ -2,11 +2,8 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import text
 from config import Config
-import logging
-
-# Настройка логгирования
-logging.basicConfig()
-logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
+from .profiler import QueryProfiler
+from .pool import MonitoredPool, pool_stats
 
 # Формирование URL подключения
 SQLALCHEMY_DATABASE_URL = (
@@ -17,11 +14,22 @@ SQLALCHEMY_DATABASE_URL = (
 # Создаем асинхронный движок
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
-    echo=True,
-    pool_size=10,
-    max_overflow=5,
-    pool_pre_ping=True
+    poolclass=MonitoredPool,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_timeout=Config.DB_POOL_TIMEOUT,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    pool_pre_ping=Config.DB_POOL_PRE_PING,
+    query_cache_size=Config.DB_STATEMENT_CACHE_SIZE
+)
+pool_stats.slow_wait_ms = Config.DB_POOL_SLOW_WAIT_MS
+
+# Профилирование запросов вместо echo=True
+query_profiler = QueryProfiler(
+    sample_rate=Config.SQL_PROFILE_SAMPLE_RATE,
+    slow_query_ms=Config.SQL_SLOW_QUERY_MS
 )
+query_profiler.install(engine)
 
 # Асинхронная фабрика сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -1,12 +1,11 @@
 import logging
 from aiogram import Router, F, Bot
 from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InputFile
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.models import User, Workout, Exercise
-from database.session import get_db_session
+from database.models import User, Workout
 from keyboards.admin import (
     admin_panel_kb, ban_confirm_kb, users_list_kb,
     user_actions_kb, stats_options_kb, export_format_kb,
@@ -14,12 +13,21 @@ from keyboards.admin import (
 )
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import io
-import csv
-import json
 from aiogram.types.input_file import BufferedInputFile
+from services.reminder_dispatcher import reminder_dispatcher
+from services.global_stats import global_stats
+from services.ranking import leaderboard
+from services.pagination import fetch_page
+from services.export import EXPORT_FORMATS, stream_export
+from services.charts import chart_renderer, render_daily_counts_chart, ChartRendererBusy
+from services.chart_cache import chart_cache, send_chart, ALL_USERS
+from services.user_cache import CachedUser, user_cache
+from services.ban_list import ban_list
+from functools import partial
+from database.session import query_profiler, engine
+from database.profiler import update_db_totals
+from database.pool import pool_status
+from config import Config
 
 router = Router()
 
@@ -56,47 +64,21 @@ async def get_user_stats(session: AsyncSession, user_id: int):
     }
 
 
-async def get_global_stats(session: AsyncSession):
-    users_count = await session.execute(select(func.count(User.user_id)))
-    users_count = users_count.scalar()
-
-    workouts_count = await session.execute(select(func.count(Workout.workout_id)))
-    workouts_count = workouts_count.scalar()
-
-    total_duration = await session.execute(select(func.sum(Workout.duration)))
-    total_duration = total_duration.scalar() or 0
-
-    total_calories = await session.execute(select(func.sum(Workout.calories)))
-    total_calories = total_calories.scalar() or 0
-
-    return {
-        'users_count': users_count,
-        'workouts_count': workouts_count,
-        'total_duration': total_duration,
-        'total_calories': total_calories
-    }
-
-
 @router.message(Command("admin"))
-async def admin_panel(message: Message):
+async def admin_panel(message: Message, current_user: CachedUser | None):
     """Обработчик команды /admin"""
-    async for session in get_db_session():
-        try:
-            user = await get_user(session, message.from_user.id)
-            if not user or not user.is_admin:
-                return await message.answer("🚫 Доступ запрещён!")
+    if not current_user or not current_user.is_admin:
+        return await message.answer("🚫 Доступ запрещён!")
 
-            await message.answer(
-                "👑 Админ-панель",
-                reply_markup=admin_panel_kb()
-            )
-        except Exception as e:
-            logging.error(f"Admin panel error: {e}")
+    await message.answer(
+        "👑 Админ-панель",
+        reply_markup=admin_panel_kb()
+    )
 
 
 @router.message(F.text == "👑 Админ-панель")
-async def admin_panel_button(message: Message):
-    await admin_panel(message)
+async def admin_panel_button(message: Message, current_user: CachedUser | None):
+    await admin_panel(message, current_user)
 
 
 @router.callback_query(F.data == "admin_back")
@@ -119,139 +101,138 @@ async def show_ban_menu(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(AdminStates.waiting_for_ban_user)
-async def process_ban_user(message: Message, state: FSMContext):
+async def process_ban_user(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     user_input = message.text.strip()
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, message.from_user.id)
-            if not admin or not admin.is_admin:
-                return await message.answer("🚫 Доступ запрещён!")
-
-            user = None
-            if user_input.isdigit():
-                user = await session.execute(
-                    select(User).where(User.telegram_id == int(user_input)))
-                user = user.scalars().first()
-            elif user_input.startswith("@"):
-                username = user_input[1:]
-                user = await session.execute(
-                    select(User).where(User.username == username))
-                user = user.scalars().first()
-
-            if not user:
-                return await message.answer("❌ Пользователь не найден!")
-
-            await message.answer(
-                f"Вы действительно хотите {'разбанить' if user.is_banned else 'забанить'} пользователя {user.name}?",
-                reply_markup=ban_confirm_kb(user.telegram_id, user.is_banned)
-            )
-            await state.clear()
-        except Exception as e:
-            logging.error(f"Ban process error: {e}")
+    if not current_user or not current_user.is_admin:
+        return await message.answer("🚫 Доступ запрещён!")
 
+    try:
+        user = None
+        if user_input.isdigit():
+            user = await session.execute(
+                select(User).where(User.telegram_id == int(user_input)))
+            user = user.scalars().first()
+        elif user_input.startswith("@"):
+            username = user_input[1:]
+            user = await session.execute(
+                select(User).where(User.username == username))
+            user = user.scalars().first()
 
-@router.callback_query(F.data.startswith("ban_confirm_"))
-async def process_ban_callback(callback: CallbackQuery):
-    await callback.answer()
-    user_id = int(callback.data.split("_")[-1])
+        if not user:
+            return await message.answer("❌ Пользователь не найден!")
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+        await message.answer(
+            f"Вы действительно хотите {'разбанить' if user.is_banned else 'забанить'} пользователя {user.name}?",
+            reply_markup=ban_confirm_kb(user.telegram_id, user.is_banned)
+        )
+        await state.clear()
+    except Exception as e:
+        logging.error(f"Ban process error: {e}")
 
-            user = await session.execute(
-                select(User).where(User.telegram_id == user_id))
-            user = user.scalars().first()
 
-            if not user:
-                return await callback.answer("❌ Пользователь не найден!", show_alert=True)
+@router.callback_query(F.data.startswith("ban_confirm_"))
+async def process_ban_callback(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
+    await callback.answer()
+    user_id = int(callback.data.split("_")[-1])
 
-            user.is_banned = not user.is_banned
-            await session.commit()
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
 
-            action = "забанен" if user.is_banned else "разбанен"
-            await callback.message.edit_text(
-                f"✅ Пользователь {user.name} {action}.",
-                reply_markup=admin_back_kb()
-            )
-        except Exception as e:
-            await session.rollback()
-            logging.error(f"Ban process error: {e}")
+    try:
+        user = await session.execute(
+            select(User).where(User.telegram_id == user_id))
+        user = user.scalars().first()
+
+        if not user:
+            return await callback.answer("❌ Пользователь не найден!", show_alert=True)
+
+        user.is_banned = not user.is_banned
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
+        ban_list.set_banned(user.telegram_id, user.is_banned)
+
+        action = "забанен" if user.is_banned else "разбанен"
+        await callback.message.edit_text(
+            f"✅ Пользователь {user.name} {action}.",
+            reply_markup=admin_back_kb()
+        )
+    except Exception as e:
+        await session.rollback()
+        logging.error(f"Ban process error: {e}")
 
 
 @router.callback_query(F.data == "admin_users_list")
-async def show_users_list(callback: CallbackQuery, page: int = 1):
+async def show_users_list(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession, page: int = 1, after: str | None = None, before: str | None = None):
     await callback.answer()
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
-
-            users_per_page = 5
-            offset = (page - 1) * users_per_page
-
-            total_users = await session.execute(select(func.count(User.user_id)))
-            total_users = total_users.scalar()
-            total_pages = (total_users + users_per_page - 1) // users_per_page
-
-            users = await session.execute(
-                select(User)
-                .order_by(User.registration_date.desc())
-                .offset(offset)
-                .limit(users_per_page)
-            )
-            users = users.scalars().all()
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
 
-            await callback.message.edit_text(
-                f"👥 Список пользователей (страница {page}/{total_pages}):",
-                reply_markup=users_list_kb(users, page, total_pages)
-            )
-        except Exception as e:
-            logging.error(f"Users list error: {e}")
+    try:
+        users_per_page = 5
+        total_pages = max(1, (leaderboard.users_count + users_per_page - 1) // users_per_page)
+
+        users_page = await fetch_page(
+            session,
+            select(User),
+            User.registration_date,
+            User.user_id,
+            key=lambda user: (user.registration_date, user.user_id),
+            limit=users_per_page,
+            after=after,
+            before=before
+        )
+        if not users_page.has_prev:
+            page = 1
+
+        await callback.message.edit_text(
+            f"👥 Список пользователей (страница {page}/{total_pages}):",
+            reply_markup=users_list_kb(users_page, page, total_pages)
+        )
+    except Exception as e:
+        logging.error(f"Users list error: {e}")
 
 
-@router.callback_query(F.data.startswith("users_page_"))
-async def handle_users_page(callback: CallbackQuery):
-    page = int(callback.data.split("_")[-1])
-    await show_users_list(callback, page)
+@router.callback_query(F.data.startswith("users_next_") | F.data.startswith("users_prev_"))
+async def handle_users_page(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
+    # users_next_<страница>_<курсор> / users_prev_<страница>_<курсор>
+    _, direction, page, cursor = callback.data.split("_")
+    if direction == "next":
+        await show_users_list(callback, current_user, session, int(page), after=cursor)
+    else:
+        await show_users_list(callback, current_user, session, int(page), before=cursor)
 
 
 @router.callback_query(F.data.startswith("user_select_"))
-async def handle_user_select(callback: CallbackQuery):
+async def handle_user_select(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     await callback.answer()
     user_id = int(callback.data.split("_")[-1])
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
-
-            user = await get_user(session, user_id)
-            if not user:
-                return await callback.answer("❌ Пользователь не найден!", show_alert=True)
-
-            stats = await get_user_stats(session, user.user_id)
-
-            await callback.message.edit_text(
-                f"👤 Информация о пользователе:\n"
-                f"ID: {user.user_id}\n"
-                f"Telegram ID: {user.telegram_id}\n"
-                f"Имя: {user.name}\n"
-                f"Дата регистрации: {user.registration_date.strftime('%d.%m.%Y %H:%M')}\n"
-                f"Статус: {'Администратор' if user.is_admin else 'Пользователь'}\n"
-                f"Бан: {'Да' if user.is_banned else 'Нет'}\n\n"
-                f"📊 Статистика:\n"
-                f"Тренировок: {stats['workouts_count']}\n"
-                f"Общая длительность: {stats['total_duration']} мин\n"
-                f"Сожжено калорий: {stats['total_calories']}",
-                reply_markup=user_actions_kb(user.telegram_id, user.is_banned, user.is_admin)
-            )
-        except Exception as e:
-            logging.error(f"User select error: {e}")
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+
+    try:
+        user = await get_user(session, user_id)
+        if not user:
+            return await callback.answer("❌ Пользователь не найден!", show_alert=True)
+
+        stats = await get_user_stats(session, user.user_id)
+
+        await callback.message.edit_text(
+            f"👤 Информация о пользователе:\n"
+            f"ID: {user.user_id}\n"
+            f"Telegram ID: {user.telegram_id}\n"
+            f"Имя: {user.name}\n"
+            f"Дата регистрации: {user.registration_date.strftime('%d.%m.%Y %H:%M')}\n"
+            f"Статус: {'Администратор' if user.is_admin else 'Пользователь'}\n"
+            f"Бан: {'Да' if user.is_banned else 'Нет'}\n\n"
+            f"📊 Статистика:\n"
+            f"Тренировок: {stats['workouts_count']}\n"
+            f"Общая длительность: {stats['total_duration']} мин\n"
+            f"Сожжено калорий: {stats['total_calories']}",
+            reply_markup=user_actions_kb(user.telegram_id, user.is_banned, user.is_admin)
+        )
+    except Exception as e:
+        logging.error(f"User select error: {e}")
 
 
 @router.callback_query(F.data == "admin_stats")
@@ -264,70 +245,45 @@ async def show_stats_options(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "stats_numbers")
-async def show_global_stats(callback: CallbackQuery):
+async def show_global_stats(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     await callback.answer()
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
-
-            stats = await get_global_stats(session)
-
-            top_duration = await session.execute(
-                select(User.name, func.sum(Workout.duration).label('total'))
-                .join(Workout)
-                .group_by(User.user_id)
-                .order_by(func.sum(Workout.duration).desc())
-                .limit(5)
-            )
-            top_duration = top_duration.all()
-
-            top_calories = await session.execute(
-                select(User.name, func.sum(Workout.calories).label('total'))
-                .join(Workout)
-                .group_by(User.user_id)
-                .order_by(func.sum(Workout.calories).desc())
-                .limit(5)
-            )
-            top_calories = top_calories.all()
-
-            top_workouts = await session.execute(
-                select(User.name, func.count(Workout.workout_id).label('total'))
-                .join(Workout)
-                .group_by(User.user_id)
-                .order_by(func.count(Workout.workout_id).desc())
-                .limit(5)
-            )
-            top_workouts = top_workouts.all()
-
-            message = (
-                "📊 Общая статистика:\n"
-                f"👥 Всего пользователей: {stats['users_count']}\n"
-                f"🏋️ Всего тренировок: {stats['workouts_count']}\n"
-                f"⏱️ Общая длительность: {stats['total_duration']} мин\n"
-                f"🔥 Сожжено калорий: {stats['total_calories']}\n\n"
-                "🏆 Топ-5 пользователей:\n"
-                "По длительности тренировок:\n"
-            )
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+
+    try:
+        stats = global_stats.snapshot()
+        top_duration = await global_stats.top(session, "duration")
+        top_calories = await global_stats.top(session, "calories")
+        top_workouts = await global_stats.top(session, "workouts")
+
+        message = (
+            "📊 Общая статистика:\n"
+            f"👥 Всего пользователей: {stats['users_count']}\n"
+            f"🏋️ Всего тренировок: {stats['workouts_count']}\n"
+            f"⏱️ Общая длительность: {stats['total_duration']} мин\n"
+            f"🔥 Сожжено калорий: {stats['total_calories']}\n"
+            f"🚫 Забанено: {len(ban_list)}, отброшено апдейтов: {ban_list.dropped}\n\n"
+            "🏆 Топ-5 пользователей:\n"
+            "По длительности тренировок:\n"
+        )
 
-            for i, (name, total) in enumerate(top_duration, 1):
-                message += f"{i}. {name}: {total} мин\n"
+        for i, (name, total) in enumerate(top_duration, 1):
+            message += f"{i}. {name}: {total} мин\n"
 
-            message += "\nПо сожжённым калориям:\n"
-            for i, (name, total) in enumerate(top_calories, 1):
-                message += f"{i}. {name}: {total} кал\n"
+        message += "\nПо сожжённым калориям:\n"
+        for i, (name, total) in enumerate(top_calories, 1):
+            message += f"{i}. {name}: {total} кал\n"
 
-            message += "\nПо количеству тренировок:\n"
-            for i, (name, total) in enumerate(top_workouts, 1):
-                message += f"{i}. {name}: {total}\n"
+        message += "\nПо количеству тренировок:\n"
+        for i, (name, total) in enumerate(top_workouts, 1):
+            message += f"{i}. {name}: {total}\n"
 
-            await callback.message.edit_text(
-                message,
-                reply_markup=stats_back_kb()
-            )
-        except Exception as e:
-            logging.error(f"Global stats error: {e}")
+        await callback.message.edit_text(
+            message,
+            reply_markup=stats_back_kb()
+        )
+    except Exception as e:
+        logging.error(f"Global stats error: {e}")
 
 
 @router.callback_query(F.data == "stats_back")
@@ -349,114 +305,73 @@ async def ask_export_format(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.waiting_for_export_format)
 
 
-@router.callback_query(F.data.startswith("export_"))
-async def export_data(callback: CallbackQuery, bot: Bot):
+@router.callback_query(F.data.startswith("admin_export_"))
+async def export_data(callback: CallbackQuery, bot: Bot, current_user: CachedUser | None, session: AsyncSession):
     await callback.answer()
     export_format = callback.data.split("_")[-1]
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
-
-            workouts = await session.execute(
-                select(Workout, User)
-                .join(User)
-                .order_by(Workout.date)
-            )
-            workouts = workouts.all()
-
-            if not workouts:
-                return await callback.answer("❌ Нет данных для экспорта", show_alert=True)
-
-            if export_format == "csv":
-                buf = io.StringIO()
-                writer = csv.writer(buf, delimiter=';')
-                writer.writerow(["ID", "User", "Date", "Type", "Duration", "Distance", "Calories", "Notes"])
-
-                for workout, user in workouts:
-                    writer.writerow([
-                        workout.workout_id,
-                        user.name,
-                        workout.date.strftime('%Y-%m-%d %H:%M'),
-                        workout.type,
-                        workout.duration,
-                        workout.distance,
-                        workout.calories,
-                        workout.notes or ""
-                    ])
-
-                buf.seek(0)
-                csv_data = buf.getvalue().encode('utf-8-sig')
-                file = BufferedInputFile(csv_data, filename="workouts_export.csv")
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
 
+    try:
+        try:
+            export_format = EXPORT_FORMATS[export_format]()
+        except ImportError:
+            return await callback.answer("❌ Формат недоступен: не установлен pyarrow", show_alert=True)
+        parts = await stream_export(session, export_format)
+        try:
+            for part in parts:
+                caption = f"📤 Экспорт данных в {export_format.caption}"
+                if len(parts) > 1:
+                    caption += f" (часть {part.number}/{len(parts)}, строк: {part.rows})"
                 await bot.send_document(
                     chat_id=callback.from_user.id,
-                    document=file,
-                    caption="📤 Экспорт данных в CSV"
+                    document=part.input_file("workouts_export", export_format.extension),
+                    caption=caption
                 )
+        finally:
+            for part in parts:
+                part.file.close()
 
-            elif export_format == "json":
-                data = []
-                for workout, user in workouts:
-                    data.append({
-                        "id": workout.workout_id,
-                        "user": user.name,
-                        "date": workout.date.strftime('%Y-%m-%d %H:%M'),
-                        "type": workout.type,
-                        "duration": workout.duration,
-                        "distance": workout.distance,
-                        "calories": workout.calories,
-                        "notes": workout.notes
-                    })
-
-                json_data = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
-                file = BufferedInputFile(json_data, filename="workouts_export.json")
-
-                await bot.send_document(
-                    chat_id=callback.from_user.id,
-                    document=file,
-                    caption="📤 Экспорт данных в JSON"
-                )
+        if not parts:
+            return await callback.answer("❌ Нет данных для экспорта", show_alert=True)
 
-            await callback.message.edit_text(
-                "Экспорт завершен",
-                reply_markup=stats_back_kb()
-            )
-        except Exception as e:
-            logging.error(f"Export error: {e}")
+        await callback.message.edit_text(
+            "Экспорт завершен",
+            reply_markup=stats_back_kb()
+        )
+    except Exception as e:
+        logging.error(f"Export error: {e}")
 
 
 @router.callback_query(F.data.startswith("admin_promote_"))
-async def promote_user(callback: CallbackQuery):
+async def promote_user(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     await callback.answer()
     user_id = int(callback.data.split("_")[-1])
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
 
-            user = await session.execute(
-                select(User).where(User.telegram_id == user_id))
-            user = user.scalars().first()
+    try:
+        user = await session.execute(
+            select(User).where(User.telegram_id == user_id))
+        user = user.scalars().first()
 
-            if not user:
-                return await callback.answer("❌ Пользователь не найден!", show_alert=True)
+        if not user:
+            return await callback.answer("❌ Пользователь не найден!", show_alert=True)
 
-            user.is_admin = not user.is_admin
-            await session.commit()
+        user.is_admin = not user.is_admin
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
 
-            action = "назначен админом" if user.is_admin else "снят с админки"
-            await callback.message.edit_text(
-                f"✅ Пользователь {user.name} {action}.",
-                reply_markup=admin_back_kb()
-            )
-        except Exception as e:
-            await session.rollback()
-            logging.error(f"Promote error: {e}")
+        action = "назначен админом" if user.is_admin else "снят с админки"
+        await callback.message.edit_text(
+            f"✅ Пользователь {user.name} {action}.",
+            reply_markup=admin_back_kb()
+        )
+    except Exception as e:
+        await session.rollback()
+        logging.error(f"Promote error: {e}")
 
 
 @router.callback_query(F.data.startswith("admin_message_"))
@@ -495,64 +410,63 @@ async def send_message_to_user(message: Message, state: FSMContext, bot: Bot):
 
 
 @router.callback_query(F.data.startswith("admin_user_stats_"))
-async def show_user_stats(callback: CallbackQuery):
+async def show_user_stats(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     await callback.answer()
     user_id = int(callback.data.split("_")[-1])
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
-
-            user = await session.execute(
-                select(User).where(User.telegram_id == user_id))
-            user = user.scalars().first()
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
 
-            if not user:
-                return await callback.answer("❌ Пользователь не найден!", show_alert=True)
+    try:
+        user = await session.execute(
+            select(User).where(User.telegram_id == user_id))
+        user = user.scalars().first()
 
-            stats = await get_user_stats(session, user.user_id)
+        if not user:
+            return await callback.answer("❌ Пользователь не найден!", show_alert=True)
 
-            top_workouts = await session.execute(
-                select(Workout)
-                .where(Workout.user_id == user.user_id)
-                .order_by(Workout.duration.desc())
-                .limit(5)
-            )
-            top_workouts = top_workouts.scalars().all()
-
-            message = (
-                f"📊 Статистика пользователя {user.name}:\n"
-                f"Всего тренировок: {stats['workouts_count']}\n"
-                f"Общая длительность: {stats['total_duration']} мин\n"
-                f"Сожжено калорий: {stats['total_calories']}\n\n"
-                "🏆 Топ-5 самых длительных тренировок:\n"
-            )
+        stats = await get_user_stats(session, user.user_id)
 
-            for i, workout in enumerate(top_workouts, 1):
-                message += (
-                    f"{i}. {workout.type} - {workout.duration} мин "
-                    f"({workout.date.strftime('%d.%m.%Y')})\n"
-                )
+        top_workouts = await session.execute(
+            select(Workout)
+            .where(Workout.user_id == user.user_id)
+            .order_by(Workout.duration.desc())
+            .limit(5)
+        )
+        top_workouts = top_workouts.scalars().all()
+
+        message = (
+            f"📊 Статистика пользователя {user.name}:\n"
+            f"Всего тренировок: {stats['workouts_count']}\n"
+            f"Общая длительность: {stats['total_duration']} мин\n"
+            f"Сожжено калорий: {stats['total_calories']}\n\n"
+            "🏆 Топ-5 самых длительных тренировок:\n"
+        )
 
-            await callback.message.edit_text(
-                message,
-                reply_markup=user_actions_kb(user.telegram_id, user.is_banned, user.is_admin)
+        for i, workout in enumerate(top_workouts, 1):
+            message += (
+                f"{i}. {workout.type} - {workout.duration} мин "
+                f"({workout.date.strftime('%d.%m.%Y')})\n"
             )
-        except Exception as e:
-            logging.error(f"User stats error: {e}")
+
+        await callback.message.edit_text(
+            message,
+            reply_markup=user_actions_kb(user.telegram_id, user.is_banned, user.is_admin)
+        )
+    except Exception as e:
+        logging.error(f"User stats error: {e}")
 
 @router.callback_query(F.data == "stats_graph")
-async def generate_stats_graph(callback: CallbackQuery, bot: Bot):
+async def generate_stats_graph(callback: CallbackQuery, bot: Bot, current_user: CachedUser | None, session: AsyncSession):
     """Генерирует график статистики"""
     await callback.answer()
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+
+    try:
+        key = chart_cache.key(ALL_USERS, "daily_counts")
 
+        async def build():
             workouts_by_date = await session.execute(
                 select(
                     func.date(Workout.date).label('day'),
@@ -562,53 +476,46 @@ async def generate_stats_graph(callback: CallbackQuery, bot: Bot):
                 .order_by(func.date(Workout.date))
             )
             workouts_by_date = workouts_by_date.all()
-
             if not workouts_by_date:
-                return await callback.message.edit_text(
-                    "❌ Нет данных для построения графика",
-                    reply_markup=stats_back_kb()
-                )
-
-            plt.switch_backend('Agg')
-            plt.figure(figsize=(10, 5))
+                return None
 
             dates = [row.day for row in workouts_by_date]
             counts = [row.count for row in workouts_by_date]
+            chart = await chart_renderer.render(render_daily_counts_chart, dates, counts)
+            return chart, "📈 График количества тренировок по дням"
 
-            plt.plot(dates, counts, marker='o', linestyle='-')
-            plt.title('Количество тренировок по дням')
-            plt.xlabel('Дата')
-            plt.ylabel('Количество тренировок')
-            plt.xticks(rotation=45)
-            plt.grid(True)
-            plt.tight_layout()
-
-            temp_file = io.BytesIO()
-            plt.savefig(temp_file, format='png', dpi=80)
-            temp_file.seek(0)
-            plt.close()
-
-            input_file = BufferedInputFile(temp_file.read(), filename="workouts_graph.png")
-
-            # Отправляем график как новое сообщение
-            await bot.send_photo(
-                chat_id=callback.from_user.id,
-                photo=input_file,
-                caption="📈 График количества тренировок по дням"
+        # Отправляем график как новое сообщение
+        try:
+            sent = await send_chart(
+                partial(bot.send_photo, chat_id=callback.from_user.id),
+                key,
+                build,
+                "workouts_graph.png"
             )
-
-            # Возвращаем пользователя в меню статистики
-            await callback.message.edit_text(
-                "График отправлен. Выберите следующее действие:",
+        except ChartRendererBusy:
+            return await callback.message.edit_text(
+                "⏳ Сейчас строится много графиков, попробуйте через минуту",
                 reply_markup=stats_back_kb()
             )
 
-        except Exception as e:
-            await callback.message.edit_text(
-                "❌ Ошибка при генерации графика",
+        if not sent:
+            return await callback.message.edit_text(
+                "❌ Нет данных для построения графика",
                 reply_markup=stats_back_kb()
             )
-            logging.error(f"Graph generation error: {e}", exc_info=True)
+
+        # Возвращаем пользователя в меню статистики
+        await callback.message.edit_text(
+            "График отправлен. Выберите следующее действие:",
+            reply_markup=stats_back_kb()
+        )
+
+    except Exception as e:
+        await callback.message.edit_text(
+            "❌ Ошибка при генерации графика",
+            reply_markup=stats_back_kb()
+        )
+        logging.error(f"Graph generation error: {e}", exc_info=True)
 
 @router.callback_query(F.data == "admin_search_user")
 async def ask_user_search(callback: CallbackQuery, state: FSMContext):
@@ -621,87 +528,157 @@ async def ask_user_search(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.waiting_for_user_search)
 
 @router.message(AdminStates.waiting_for_user_search)
-async def process_user_search(message: Message, state: FSMContext):
+async def process_user_search(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Обрабатывает поиск пользователя"""
     search_term = message.text.strip()
     if search_term.startswith("@"):
         search_term = search_term[1:]
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, message.from_user.id)
-            if not admin or not admin.is_admin:
-                return await message.answer("🚫 Доступ запрещён!")
-
-            users = await session.execute(
-                select(User)
-                .where(User.name.ilike(f"%{search_term}%"))
-                .limit(10)
-            )
-            users = users.scalars().all()
+    if not current_user or not current_user.is_admin:
+        return await message.answer("🚫 Доступ запрещён!")
 
-            if not users:
-                return await message.answer(
-                    f"❌ Пользователи по запросу '{search_term}' не найдены",
-                    reply_markup=admin_back_kb()
-                )
+    try:
+        users = await session.execute(
+            select(User)
+            .where(User.name.ilike(f"%{search_term}%"))
+            .limit(10)
+        )
+        users = users.scalars().all()
 
-            builder = InlineKeyboardBuilder()
-            for user in users:
-                builder.row(
-                    InlineKeyboardButton(
-                        text=f"{user.name} (ID: {user.telegram_id})",
-                        callback_data=f"user_select_{user.telegram_id}"
-                    )
-                )
+        if not users:
+            return await message.answer(
+                f"❌ Пользователи по запросу '{search_term}' не найдены",
+                reply_markup=admin_back_kb()
+            )
 
+        builder = InlineKeyboardBuilder()
+        for user in users:
             builder.row(
                 InlineKeyboardButton(
-                    text="⬅️ В админ-панель",
-                    callback_data="admin_back"
+                    text=f"{user.name} (ID: {user.telegram_id})",
+                    callback_data=f"user_select_{user.telegram_id}"
                 )
             )
 
-            await message.answer(
-                f"🔍 Результаты поиска по запросу '{search_term}':",
-                reply_markup=builder.as_markup()
+        builder.row(
+            InlineKeyboardButton(
+                text="⬅️ В админ-панель",
+                callback_data="admin_back"
             )
-            await state.clear()
-        except Exception as e:
-            await message.answer(
-                "❌ Ошибка при поиске пользователя",
-                reply_markup=admin_back_kb()
-            )
-            logging.error(f"User search error: {e}")
+        )
+
+        await message.answer(
+            f"🔍 Результаты поиска по запросу '{search_term}':",
+            reply_markup=builder.as_markup()
+        )
+        await state.clear()
+    except Exception as e:
+        await message.answer(
+            "❌ Ошибка при поиске пользователя",
+            reply_markup=admin_back_kb()
+        )
+        logging.error(f"User search error: {e}")
 
 
 @router.callback_query(F.data.startswith("admin_ban_"))
-async def ban_user_direct(callback: CallbackQuery):
+async def ban_user_direct(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     """Обрабатывает прямое нажатие кнопки бана из меню пользователя"""
     await callback.answer()
     user_id = int(callback.data.split("_")[-1])
 
-    async for session in get_db_session():
-        try:
-            admin = await get_user(session, callback.from_user.id)
-            if not admin or not admin.is_admin:
-                return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
+    if not current_user or not current_user.is_admin:
+        return await callback.answer("🚫 Доступ запрещён!", show_alert=True)
 
-            user = await session.execute(
-                select(User).where(User.telegram_id == user_id))
-            user = user.scalars().first()
+    try:
+        user = await session.execute(
+            select(User).where(User.telegram_id == user_id))
+        user = user.scalars().first()
 
-            if not user:
-                return await callback.answer("❌ Пользователь не найден!", show_alert=True)
+        if not user:
+            return await callback.answer("❌ Пользователь не найден!", show_alert=True)
 
-            await callback.message.edit_text(
-                f"Вы действительно хотите {'разбанить' if user.is_banned else 'забанить'} пользователя {user.name}?",
-                reply_markup=ban_confirm_kb(user.telegram_id, user.is_banned)
-            )
+        await callback.message.edit_text(
+            f"Вы действительно хотите {'разбанить' if user.is_banned else 'забанить'} пользователя {user.name}?",
+            reply_markup=ban_confirm_kb(user.telegram_id, user.is_banned)
+        )
 
-        except Exception as e:
-            await callback.message.edit_text(
-                "❌ Ошибка при обработке запроса",
-                reply_markup=admin_back_kb()
-            )
-            logging.error(f"Ban request error: {e}")
\ No newline at end of file
+    except Exception as e:
+        await callback.message.edit_text(
+            "❌ Ошибка при обработке запроса",
+            reply_markup=admin_back_kb()
+        )
+        logging.error(f"Ban request error: {e}")
+
+
+@router.message(Command("reminder_stats"))
+async def show_reminder_dispatch_stats(message: Message, current_user: CachedUser | None):
+    """Показывает метрики рассылки напоминаний"""
+    if not current_user or not current_user.is_admin:
+        return await message.answer("🚫 Доступ запрещён!")
+
+    metrics = reminder_dispatcher.metrics.snapshot()
+    await message.answer(
+        "🔔 Рассылка напоминаний:\n"
+        f"Отправлено: {metrics['sent']}\n"
+        f"Ошибок: {metrics['failed']}\n"
+        f"Повторов (RetryAfter): {metrics['retried']}\n"
+        f"В очереди: {reminder_dispatcher.queue_size}\n"
+        f"Скорость: {metrics['throughput']:.1f} сообщ./с\n"
+        f"Задержка: средняя {metrics['avg_lag']:.1f} с, "
+        f"последняя {metrics['last_lag']:.1f} с, максимальная {metrics['max_lag']:.1f} с"
+    )
+
+
+@router.message(Command("db_profile"))
+async def show_db_profile(message: Message, bot: Bot, current_user: CachedUser | None):
+    """Показывает самые затратные SQL-запросы и присылает полный дамп профиля"""
+    if not current_user or not current_user.is_admin:
+        return await message.answer("🚫 Доступ запрещён!")
+
+    top = query_profiler.top(5)
+    if not top:
+        return await message.answer("Статистика SQL-запросов пока пуста")
+
+    text = (
+        f"🗄 Профиль SQL (выборка {query_profiler.sample_rate:.0%}, "
+        f"медленных запросов: {query_profiler.slow_queries}):\n\n"
+    )
+    for statement, stats in top:
+        handler, _ = stats.handlers.most_common(1)[0]
+        text += (
+            f"{stats.count} раз, всего {stats.total_ms:.0f} мс, "
+            f"макс. {stats.max_ms:.0f} мс, строк {stats.rows}\n"
+            f"{handler}\n"
+            f"{statement[:150]}\n\n"
+        )
+    await message.answer(text, parse_mode=None)
+
+    dump = query_profiler.dump_to_file(Config.SQL_PROFILE_DUMP)
+    await bot.send_document(
+        chat_id=message.from_user.id,
+        document=BufferedInputFile(dump.encode('utf-8'), filename="sql_profile.json"),
+        caption="📄 Полный профиль SQL-запросов"
+    )
+
+
+
+@router.message(Command("db_pool"))
+async def show_db_pool(message: Message, current_user: CachedUser | None):
+    """Показывает загрузку пула соединений с БД"""
+    if not current_user or not current_user.is_admin:
+        return await message.answer("🚫 Доступ запрещён!")
+
+    status = pool_status(engine.sync_engine.pool)
+    updates = update_db_totals.snapshot()
+    await message.answer(
+        "🔌 Пул соединений БД:\n"
+        f"Размер: {status['size']} (+{status['max_overflow']} сверх)\n"
+        f"Выдано: {status['checked_out']}, свободно: {status['checked_in']}, "
+        f"сверх лимита: {status['overflow']}\n"
+        f"Получений соединения: {status['checkouts']}\n"
+        f"Ожидание: среднее {status['avg_wait_ms']:.1f} мс, максимальное {status['max_wait_ms']:.1f} мс\n"
+        f"Долгих ожиданий: {status['waits']}, таймаутов: {status['timeouts']}\n\n"
+        f"Апдейтов: {updates['updates']}, из них с запросами к БД: {updates['with_db']}\n"
+        f"Запросов на апдейт: в среднем {updates['avg_statements']:.1f}, максимум {updates['max_statements']}\n"
+        f"Время в БД на апдейт: в среднем {updates['avg_db_ms']:.1f} мс, максимум {updates['max_db_ms']:.1f} мс"
+    )
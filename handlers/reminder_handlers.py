@@ -7,12 +7,15 @@ from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select, delete
-from database.session import get_db_session
 from database.models import Reminder, User
 from states import ReminderStates
 from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 import pytz
 from keyboards.main_menu import get_main_menu
+from services.reminder_index import reminder_index, utc_schedule
+from services.weekdays import parse_days, format_days, day_bit
+from services.user_cache import CachedUser
 from keyboards.reminder import (
     get_weekdays_kb,
     reminders_control_kb,
@@ -22,16 +25,6 @@ from keyboards.reminder import (
 
 router = Router()
 
-WEEKDAYS = {
-    "понедельник": "Monday",
-    "вторник": "Tuesday",
-    "среда": "Wednesday",
-    "четверг": "Thursday",
-    "пятница": "Friday",
-    "суббота": "Saturday",
-    "воскресенье": "Sunday"
-}
-
 
 @router.message(F.text == "🔔 Мои напоминания")
 @router.message(Command("remind"))
@@ -43,53 +36,47 @@ async def handle_reminders_command(message: Message):
     )
 
 @router.callback_query(F.data.startswith("rem_view_"))
-async def view_reminder(callback: CallbackQuery):
+async def view_reminder(callback: CallbackQuery, session: AsyncSession):
     """Просмотр конкретного напоминания"""
     try:
         reminder_id = int(callback.data.split('_')[2])
-        async for session in get_db_session():
-            reminder = await session.execute(
-                select(Reminder).where(Reminder.reminder_id == reminder_id)
-            )
-            reminder = reminder.scalar_one_or_none()
+        reminder = await session.execute(
+            select(Reminder).where(Reminder.reminder_id == reminder_id)
+        )
+        reminder = reminder.scalar_one_or_none()
 
-            if not reminder:
-                await callback.answer("Напоминание не найдено")
-                return
+        if not reminder:
+            await callback.answer("Напоминание не найдено")
+            return
 
-            await callback.message.edit_text(
-                f"📅 День: {reminder.day_of_week}\n"
-                f"⏰ Время: {reminder.reminder_time.strftime('%H:%M')}\n"
-                f"📝 Текст: {reminder.reminder_text}",
-                reply_markup=edit_reminder_kb(reminder_id)
-            )
-            await callback.answer()
+        await callback.message.edit_text(
+            f"📅 День: {format_days(reminder.days_mask)}\n"
+            f"⏰ Время: {reminder.reminder_time.strftime('%H:%M')}\n"
+            f"📝 Текст: {reminder.reminder_text}",
+            reply_markup=edit_reminder_kb(reminder_id)
+        )
+        await callback.answer()
     except Exception as e:
         logging.error(f"Ошибка просмотра напоминания: {e}")
         await callback.answer("❌ Ошибка при просмотре напоминания")
 
 @router.callback_query(F.data == "rem_delete_all")
-async def delete_all_reminders(callback: CallbackQuery):
+async def delete_all_reminders(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     """Удаление всех напоминаний пользователя"""
-    try:
-        async for session in get_db_session():
-            # Получаем пользователя
-            user = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("Пользователь не найден")
-                return
+    if not current_user:
+        await callback.answer("Пользователь не найден")
+        return
 
-            # Удаляем все напоминания
-            await session.execute(
-                delete(Reminder).where(Reminder.user_id == user.user_id)
-            )
-            await session.commit()
+    user = current_user
+    try:
+        # Удаляем все напоминания
+        await session.execute(
+            delete(Reminder).where(Reminder.user_id == user.user_id)
+        )
+        await session.commit()
+        reminder_index.remove_user(user.user_id)
 
-            await callback.message.answer("✅ Все напоминания удалены")
+        await callback.message.answer("✅ Все напоминания удалены")
     except Exception as e:
         await session.rollback()
         logging.error(f"Ошибка удаления всех напоминаний: {e}")
@@ -97,72 +84,71 @@ async def delete_all_reminders(callback: CallbackQuery):
     finally:
         await callback.answer()
 
-async def handle_my_reminders_command(message: Message):
+async def handle_my_reminders_command(message: Message, session: AsyncSession):
     """Обработка кнопки из главного меню"""
-    await show_user_reminders(message)
+    await show_user_reminders(message, session)
 
-async def show_user_reminders(event: Union[Message, CallbackQuery]):
+async def show_user_reminders(event: Union[Message, CallbackQuery], session: AsyncSession):
     """Общая функция для показа напоминаний"""
     try:
-        async for session in get_db_session():
-            # Получаем пользователя
-            user = await session.execute(
-                select(User).where(User.telegram_id == event.from_user.id)
-            )
-            user = user.scalar_one_or_none()
-
-            if not user:
-                response = "Пользователь не найден"
-                if isinstance(event, CallbackQuery):
-                    await event.answer(response)
-                else:
-                    await event.answer(response)
-                return
-
-            # Получаем напоминания
-            reminders = await session.execute(
-                select(Reminder).where(Reminder.user_id == user.user_id)
-            )
-            reminders = reminders.scalars().all()
-
-            if not reminders:
-                response = "У вас нет напоминаний."
-                if isinstance(event, CallbackQuery):
-                    await event.message.answer(response)
-                    await event.answer()  # Подтверждаем обработку callback
-                else:
-                    await event.answer(response)
-                return
-
-            # Формируем список
-            reminders_list = []
-            for rem in reminders:
-                reminders_list.append({
-                    'id': rem.reminder_id,
-                    'day': rem.day_of_week,
-                    'time': rem.reminder_time.strftime("%H:%M"),
-                    'text': rem.reminder_text[:30] + "..." if len(rem.reminder_text) > 30 else rem.reminder_text
-                })
-
-            # Отправляем сообщение
-            response = "Ваши напоминания:"
+        # Получаем пользователя
+        user = await session.execute(
+            select(User).where(User.telegram_id == event.from_user.id)
+        )
+        user = user.scalar_one_or_none()
+
+        if not user:
+            response = "Пользователь не найден"
             if isinstance(event, CallbackQuery):
-                try:
-                    await event.message.edit_text(
-                        response,
-                        reply_markup=reminders_control_kb(reminders_list)
-                    )
-                except Exception as e:
-                    await event.message.answer(
-                        response,
-                        reply_markup=reminders_control_kb(reminders_list)
-                    )
-                await event.answer()  # Всегда отвечаем на callback
+                await event.answer(response)
             else:
-                await event.answer(
+                await event.answer(response)
+            return
+
+        # Получаем напоминания
+        reminders = await session.execute(
+            select(Reminder).where(Reminder.user_id == user.user_id)
+        )
+        reminders = reminders.scalars().all()
+
+        if not reminders:
+            response = "У вас нет напоминаний."
+            if isinstance(event, CallbackQuery):
+                await event.message.answer(response)
+                await event.answer()  # Подтверждаем обработку callback
+            else:
+                await event.answer(response)
+            return
+
+        # Формируем список
+        reminders_list = []
+        for rem in reminders:
+            reminders_list.append({
+                'id': rem.reminder_id,
+                'day': format_days(rem.days_mask),
+                'time': rem.reminder_time.strftime("%H:%M"),
+                'text': rem.reminder_text[:30] + "..." if len(rem.reminder_text) > 30 else rem.reminder_text
+            })
+
+        # Отправляем сообщение
+        response = "Ваши напоминания:"
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.message.edit_text(
                     response,
                     reply_markup=reminders_control_kb(reminders_list)
                 )
+            except Exception as e:
+                await event.message.answer(
+                    response,
+                    reply_markup=reminders_control_kb(reminders_list)
+                )
+            await event.answer()  # Всегда отвечаем на callback
+        else:
+            await event.answer(
+                response,
+                reply_markup=reminders_control_kb(reminders_list)
+            )
     except Exception as e:
         logging.error(f"Ошибка получения напоминаний: {e}")
         response = "❌ Ошибка при получении напоминаний"
@@ -186,16 +172,17 @@ async def create_new_reminder(callback: CallbackQuery, state: FSMContext):
 
 @router.message(ReminderStates.waiting_for_day)
 async def process_day_selection(message: Message, state: FSMContext):
-    """Обработка выбора дня недели"""
-    day = message.text.strip().lower()
-    if day not in WEEKDAYS:
+    """Обработка выбора дней недели"""
+    days_mask = parse_days(message.text)
+    if not days_mask:
         await message.answer(
-            "Пожалуйста, выберите день из предложенных вариантов:",
+            "Пожалуйста, выберите день из предложенных вариантов "
+            "или перечислите дни через запятую (например: пн, ср, пт):",
             reply_markup=get_weekdays_kb()
         )
         return
 
-    await state.update_data(day=WEEKDAYS[day])
+    await state.update_data(days_mask=days_mask)
     await message.answer(
         "Выберите время или введите в формате ЧЧ:ММ:",
         reply_markup=common_times_kb()
@@ -228,7 +215,7 @@ async def process_time_input(message: Message, state: FSMContext):
 
 
 @router.message(ReminderStates.waiting_for_text)
-async def process_reminder_text(message: Message, state: FSMContext):
+async def process_reminder_text(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     data = await state.get_data()
     time_str = data['time']  # "HH:MM:SS"
 
@@ -237,24 +224,27 @@ async def process_reminder_text(message: Message, state: FSMContext):
         h, m, s = map(int, time_str.split(':'))
         reminder_time = time(hour=h, minute=m, second=s)
 
-        async for session in get_db_session():
-            # Явно указываем тип при создании объекта
-            reminder = Reminder(
-                user_id=(await session.execute(
-                    select(User.user_id).where(User.telegram_id == message.from_user.id)
-                )).scalar_one(),
-                reminder_text=message.text,
-                reminder_time=reminder_time,
-                day_of_week=data['day']
-            )
+        user_id, timezone = current_user.user_id, current_user.timezone
+        utc_days_mask, utc_time = utc_schedule(data['days_mask'], reminder_time, timezone)
+
+        # Явно указываем тип при создании объекта
+        reminder = Reminder(
+            user_id=user_id,
+            reminder_text=message.text,
+            reminder_time=reminder_time,
+            days_mask=data['days_mask'],
+            utc_days_mask=utc_days_mask,
+            utc_time=utc_time
+        )
 
-            session.add(reminder)
-            await session.commit()
+        session.add(reminder)
+        await session.commit()
+        reminder_index.add(reminder.reminder_id, user_id, utc_days_mask, utc_time, timezone)
 
-            await message.answer(
-                f"✅ Напоминание создано на {time_str[:8]}",
-                parse_mode=None
-            )
+        await message.answer(
+            f"✅ Напоминание создано на {time_str[:8]}",
+            parse_mode=None
+        )
     except Exception as e:
         logging.error(f"Ошибка сохранения: {str(e)}", exc_info=True)
         await message.answer("❌ Ошибка при создании напоминания")
@@ -263,42 +253,37 @@ async def process_reminder_text(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data == "rem_my_reminders")
-async def handle_my_reminders_callback(callback: CallbackQuery):
+async def handle_my_reminders_callback(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     """Обработка callback кнопки"""
-    try:
-        async for session in get_db_session():
-            user = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user.scalar_one_or_none()
+    if not current_user:
+        await callback.answer("Пользователь не найден")
+        return
 
-            if not user:
-                await callback.answer("Пользователь не найден")
-                return
+    user = current_user
+    try:
+        reminders = await session.execute(
+            select(Reminder).where(Reminder.user_id == user.user_id)
+        )
+        reminders = reminders.scalars().all()
 
-            reminders = await session.execute(
-                select(Reminder).where(Reminder.user_id == user.user_id)
-            )
-            reminders = reminders.scalars().all()
-
-            if not reminders:
-                await callback.message.answer("У вас нет напоминаний.")
-                await callback.answer()
-                return
-
-            reminders_list = []
-            for rem in reminders:
-                reminders_list.append({
-                    'id': rem.reminder_id,
-                    'day': rem.day_of_week,
-                    'time': rem.reminder_time.strftime("%H:%M"),
-                    'text': rem.reminder_text[:30] + "..." if len(rem.reminder_text) > 30 else rem.reminder_text
-                })
-
-            await callback.message.edit_text(
-                "Ваши напоминания:",
-                reply_markup=reminders_control_kb(reminders_list)
-            )
+        if not reminders:
+            await callback.message.answer("У вас нет напоминаний.")
+            await callback.answer()
+            return
+
+        reminders_list = []
+        for rem in reminders:
+            reminders_list.append({
+                'id': rem.reminder_id,
+                'day': format_days(rem.days_mask),
+                'time': rem.reminder_time.strftime("%H:%M"),
+                'text': rem.reminder_text[:30] + "..." if len(rem.reminder_text) > 30 else rem.reminder_text
+            })
+
+        await callback.message.edit_text(
+            "Ваши напоминания:",
+            reply_markup=reminders_control_kb(reminders_list)
+        )
     except Exception as e:
         logging.error(f"Ошибка получения напоминаний: {e}")
         await callback.answer("❌ Ошибка при получении напоминаний")
@@ -315,72 +300,73 @@ async def edit_reminder_text(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.message(ReminderStates.editing_text)
-async def process_edit_text(message: Message, state: FSMContext):
+async def process_edit_text(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка нового текста"""
     data = await state.get_data()
-    async for session in get_db_session():
-        try:
-            await session.execute(
-                update(Reminder)
-                .where(Reminder.reminder_id == data['reminder_id'])
-                .values(reminder_text=message.text)
-            )
-            await session.commit()
-            await message.answer("✅ Текст напоминания обновлён")
-        except Exception as e:
-            await session.rollback()
-            logging.error(f"Ошибка обновления текста: {e}")
-            await message.answer("❌ Не удалось обновить текст")
-        finally:
-            await state.clear()
+    try:
+        await session.execute(
+            update(Reminder)
+            .where(Reminder.reminder_id == data['reminder_id'])
+            .values(reminder_text=message.text)
+        )
+        await session.commit()
+        await message.answer("✅ Текст напоминания обновлён")
+    except Exception as e:
+        await session.rollback()
+        logging.error(f"Ошибка обновления текста: {e}")
+        await message.answer("❌ Не удалось обновить текст")
+    finally:
+        await state.clear()
 
 
 @router.callback_query(F.data.startswith("rem_delete_"))
-async def delete_reminder(callback: CallbackQuery):
+async def delete_reminder(callback: CallbackQuery, session: AsyncSession):
     """Удаление напоминания"""
     reminder_id = int(callback.data.split('_')[2])
-    async for session in get_db_session():
-        try:
-            await session.execute(
-                delete(Reminder).where(Reminder.reminder_id == reminder_id))
-            await session.commit()
-            await callback.message.answer("✅ Напоминание удалено")
-        except Exception as e:
-            await session.rollback()
-            logging.error(f"Ошибка удаления напоминания: {e}")
-            await callback.message.answer("❌ Не удалось удалить напоминание")
-        finally:
-            await callback.answer()
+    try:
+        await session.execute(
+            delete(Reminder).where(Reminder.reminder_id == reminder_id))
+        await session.commit()
+        reminder_index.remove(reminder_id)
+        await callback.message.answer("✅ Напоминание удалено")
+    except Exception as e:
+        await session.rollback()
+        logging.error(f"Ошибка удаления напоминания: {e}")
+        await callback.message.answer("❌ Не удалось удалить напоминание")
+    finally:
+        await callback.answer()
 
 
 @router.message(Command("test_reminder"))
-async def test_reminder(message: Message):
+async def test_reminder(message: Message, current_user: CachedUser | None, session: AsyncSession):
     """Тестовая команда для проверки отправки напоминания"""
+    user = current_user
     try:
-        # Создаем тестовое напоминание на текущее время + 1 минута
-        test_time = (datetime.now() + timedelta(minutes=1)).time()
-
-        async for session in get_db_session():
-            user = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = user.scalar_one()
-
-            reminder = Reminder(
-                user_id=user.user_id,
-                reminder_text="🔴 ЭТО ТЕСТОВОЕ НАПОМИНАНИЕ!",
-                reminder_time=datetime.combine(datetime.today(), test_time),
-                day_of_week=datetime.now().strftime("%A")
-            )
+        # Создаем тестовое напоминание на текущее время + 1 минута (в поясе пользователя)
+        now = datetime.now(pytz.timezone(user.timezone))
+        test_moment = now + timedelta(minutes=1)
+        test_time = test_moment.time().replace(second=0, microsecond=0)
+        days_mask = day_bit(test_moment.weekday())
+        utc_days_mask, utc_time = utc_schedule(days_mask, test_time, user.timezone)
+
+        reminder = Reminder(
+            user_id=user.user_id,
+            reminder_text="🔴 ЭТО ТЕСТОВОЕ НАПОМИНАНИЕ!",
+            reminder_time=test_time,
+            days_mask=days_mask,
+            utc_days_mask=utc_days_mask,
+            utc_time=utc_time
+        )
 
-            session.add(reminder)
-            await session.commit()
+        session.add(reminder)
+        await session.commit()
+        reminder_index.add(reminder.reminder_id, user.user_id, utc_days_mask, utc_time, user.timezone)
 
-            await message.answer(
-                f"⏰ Тестовое напоминание создано!\n"
-                f"Оно придет в {test_time.strftime('%H:%M')}\n"
-                f"Текущее время: {datetime.now().strftime('%H:%M')}"
-            )
+        await message.answer(
+            f"⏰ Тестовое напоминание создано!\n"
+            f"Оно придет в {test_time.strftime('%H:%M')}\n"
+            f"Текущее время: {now.strftime('%H:%M')}"
+        )
     except Exception as e:
         logging.error(f"Ошибка создания тестового напоминания: {e}")
         await message.answer("❌ Не удалось создать тестовое напоминание")
@@ -415,13 +401,12 @@ async def test_time_format(message: Message):
     )
 
 @router.message(Command("check_reminders"))
-async def check_reminders(message: Message):
-    async for session in get_db_session():
-        reminders = await session.execute(select(Reminder))
-        for rem in reminders.scalars():
-            await message.answer(
-                f"ID: {rem.reminder_id}\n"
-                f"Время: {rem.reminder_time}\n"
-                f"Тип: {type(rem.reminder_time)}",
-                parse_mode=None
-            )
\ No newline at end of file
+async def check_reminders(message: Message, session: AsyncSession):
+    reminders = await session.execute(select(Reminder))
+    for rem in reminders.scalars():
+        await message.answer(
+            f"ID: {rem.reminder_id}\n"
+            f"Время: {rem.reminder_time}\n"
+            f"Тип: {type(rem.reminder_time)}",
+            parse_mode=None
+        )
\ No newline at end of file
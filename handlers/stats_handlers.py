@@ -2,22 +2,22 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
-from datetime import datetime, timedelta
-from sqlalchemy import select, func
-from database.session import get_db_session
-from database.models import Workout, User  # Added User import
+from sqlalchemy import select
+from database.models import Workout
 from keyboards.stats import get_stats_period_kb
+from services.rollups import period_totals
+from services.export import EXPORT_FORMATS, stream_export
+from services.charts import chart_renderer, render_progress_chart, ChartRendererBusy
+from services.chart_cache import chart_cache, send_chart
+from services.user_cache import CachedUser
+import asyncio
 import logging
 from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from aiogram.types import BufferedInputFile
 import csv
 import json
 import io
-from ml.predictor import predict_future_workouts
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from datetime import timedelta
-import numpy as np
 
 router = Router()
 
@@ -34,7 +34,7 @@ async def stats_menu(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("stats_"))
-async def process_stats_period(callback: CallbackQuery, state: FSMContext):
+async def process_stats_period(callback: CallbackQuery, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Обработка выбора периода статистики"""
     period = callback.data.split('_')[1]
     period_names = {
@@ -44,76 +44,48 @@ async def process_stats_period(callback: CallbackQuery, state: FSMContext):
         "all": "всё время"
     }
 
-    async for session in get_db_session():
+    if not current_user:
+        await callback.message.answer("Пользователь не найден")
+        return
+
+    user = current_user
+    try:
+        # Суммы за период из дневных сумм (с кэшем)
+        stats = await period_totals(session, user.user_id, period)
+
+        if not stats.workouts_count:
+            response = f"📊 У вас нет тренировок за {period_names[period]}."
+        else:
+            response = (
+                f"📊 <b>Ваша статистика за {period_names[period]}:</b>\n\n"
+                f"🏋️‍♂️ <b>Количество тренировок:</b> {stats.workouts_count}\n"
+                f"⏱ <b>Общее время:</b> {stats.total_duration:.1f} мин.\n"
+                f"🔥 <b>Сожжено калорий:</b> {stats.total_calories:.0f} ккал\n"
+                f"📏 <b>Общая дистанция:</b> {stats.total_distance:.1f} км"
+            )
+
+        data = await state.get_data()
+        message_id = data.get('stats_message_id', callback.message.message_id)
+
         try:
-            user_id = callback.from_user.id
-            user = await session.execute(
-                select(User).where(User.telegram_id == user_id))
-            user = user.scalar_one_or_none()
-
-            if not user:
-                await callback.message.answer("Пользователь не найден")
-                return
-
-            # Определяем временной диапазон
-            end_date = datetime.now()
-            if period == "day":
-                start_date = end_date - timedelta(days=1)
-            elif period == "week":
-                start_date = end_date - timedelta(weeks=1)
-            elif period == "month":
-                start_date = end_date - timedelta(days=30)
-            else:
-                start_date = datetime.min  # Для "все время"
-
-            # Получаем статистику
-            stats = await session.execute(
-                select(
-                    func.count(Workout.workout_id).label("workouts_count"),
-                    func.coalesce(func.sum(Workout.duration), 0).label("total_duration"),
-                    func.coalesce(func.sum(Workout.calories), 0).label("total_calories"),
-                    func.coalesce(func.sum(Workout.distance), 0).label("total_distance")
-                ).where(
-                    Workout.user_id == user.user_id,
-                    Workout.date >= start_date,
-                    Workout.date <= end_date
-                )
+            await callback.message.bot.edit_message_text(
+                chat_id=callback.message.chat.id,
+                message_id=message_id,
+                text=response,
+                reply_markup=get_stats_period_kb()
+            )
+        except:
+            # Если не удалось редактировать, отправляем новое сообщение
+            sent_message = await callback.message.answer(
+                response,
+                reply_markup=get_stats_period_kb()
             )
-            stats = stats.first()
-
-            if not stats.workouts_count:
-                response = f"📊 У вас нет тренировок за {period_names[period]}."
-            else:
-                response = (
-                    f"📊 <b>Ваша статистика за {period_names[period]}:</b>\n\n"
-                    f"🏋️‍♂️ <b>Количество тренировок:</b> {stats.workouts_count}\n"
-                    f"⏱ <b>Общее время:</b> {stats.total_duration:.1f} мин.\n"
-                    f"🔥 <b>Сожжено калорий:</b> {stats.total_calories:.0f} ккал\n"
-                    f"📏 <b>Общая дистанция:</b> {stats.total_distance:.1f} км"
-                )
-
-            data = await state.get_data()
-            message_id = data.get('stats_message_id', callback.message.message_id)
-
-            try:
-                await callback.message.bot.edit_message_text(
-                    chat_id=callback.message.chat.id,
-                    message_id=message_id,
-                    text=response,
-                    reply_markup=get_stats_period_kb()
-                )
-            except:
-                # Если не удалось редактировать, отправляем новое сообщение
-                sent_message = await callback.message.answer(
-                    response,
-                    reply_markup=get_stats_period_kb()
-                )
-                await state.update_data(stats_message_id=sent_message.message_id)
-
-            await callback.answer()
-        except Exception as e:
-            logging.error(f"Ошибка получения статистики: {e}")
-            await callback.message.answer("❌ Ошибка при получении статистики")
+            await state.update_data(stats_message_id=sent_message.message_id)
+
+        await callback.answer()
+    except Exception as e:
+        logging.error(f"Ошибка получения статистики: {e}")
+        await callback.message.answer("❌ Ошибка при получении статистики")
 
 
 async def generate_workout_csv(workouts: list) -> io.BytesIO:
@@ -193,7 +165,7 @@ async def generate_workout_json(workouts: list) -> str:
     return json.dumps(result, indent=2, ensure_ascii=False)
 
 
-async def generate_progress_chart(workouts: list) -> tuple[io.BytesIO, str]:
+async def generate_progress_chart(workouts: list) -> tuple[bytes, str]:
     """Генерация графика прогресса с ИИ-прогнозом"""
     if not workouts:
         return None, "Нет тренировок для анализа."
@@ -202,111 +174,112 @@ async def generate_progress_chart(workouts: list) -> tuple[io.BytesIO, str]:
     calories = [w.calories for w in workouts]
     durations = [w.duration for w in workouts]
 
-    # Переводим даты в числовую шкалу
-    base_date = min(dates)
-    x = np.array([(d - base_date).days for d in dates]).reshape(-1, 1)
-
-    # Обучаем модели
-    duration_model = LinearRegression().fit(x, durations)
-    calorie_model = LinearRegression().fit(x, calories)
+    # NumPy загружается при первом прогнозе, а не при старте бота
+    from ml.predictor import predict_future_workouts
 
     # Прогноз на 5 дней вперёд
-    steps = 5
-    last_day = x[-1][0]
-    future_x = np.array([last_day + i for i in range(1, steps + 1)]).reshape(-1, 1)
-    future_dates = [base_date + timedelta(days=int(i[0])) for i in future_x]
-    predicted_durations = duration_model.predict(future_x)
-    predicted_calories = calorie_model.predict(future_x)
-    predicted_durations = np.maximum(predicted_durations, 0)
-    predicted_calories = np.maximum(predicted_calories, 0)
-
-    # --- Рисуем график ---
-    plt.figure(figsize=(10, 6))
-
-    # Калории
-    plt.subplot(2, 1, 1)
-    plt.plot(dates, calories, 'r-', label='Факт')
-    plt.plot(future_dates, predicted_calories, 'g--', label='Прогноз')
-    plt.ylabel('Калории')
-    plt.title('📈 Прогресс тренировок')
-    plt.legend()
-    plt.grid(True)
-
-    # Длительность
-    plt.subplot(2, 1, 2)
-
-
-
-    
-    plt.plot(dates, durations, 'b-', label='Факт')
-    plt.plot(future_dates, predicted_durations, 'g--', label='Прогноз')
-    plt.ylabel('Длительность (мин)')
-    plt.xlabel('Дата')
-    plt.legend()
-    plt.grid(True)
-
-    plt.tight_layout()
-
-    # Сохраняем график
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    plt.close()
+    future_dates, predicted_durations, predicted_calories = predict_future_workouts(
+        dates, durations, calories, steps=5
+    )
+    predicted_durations = predicted_durations.clip(min=0)
+    predicted_calories = predicted_calories.clip(min=0)
+
+    # График строится в пуле процессов, цикл событий не блокируется
+    chart = await chart_renderer.render(
+        render_progress_chart,
+        dates,
+        calories,
+        durations,
+        future_dates,
+        predicted_calories.tolist(),
+        predicted_durations.tolist()
+    )
 
     # Сообщение от ИИ
     message = "🤖 Прогноз на ближайшие 5 тренировок:\n"
     for date, dur, cal in zip(future_dates, predicted_durations, predicted_calories):
         message += f"📅 {date.strftime('%d.%m')} — {round(dur, 1)} мин, {round(cal, 1)} ккал\n"
 
-    return buf, message
+    return chart, message
+
+
+async def send_streamed_export(callback: CallbackQuery, session, user: CachedUser, format_type: str):
+    """Экспорт в NDJSON.gz или Parquet: потоком из БД, с упражнениями внутри тренировки"""
+    try:
+        export_format = EXPORT_FORMATS[format_type]()
+    except ImportError:
+        await callback.answer("❌ Формат недоступен: не установлен pyarrow", show_alert=True)
+        return
+
+    parts = await stream_export(session, export_format, Workout.user_id == user.user_id)
+    try:
+        if not parts:
+            await callback.answer("Нет данных для экспорта")
+            return
+
+        for part in parts:
+            caption = f"Ваши тренировки в формате {export_format.caption}"
+            if len(parts) > 1:
+                caption += f" (часть {part.number}/{len(parts)})"
+            await callback.message.answer_document(
+                part.input_file(f"workouts_{user.user_id}", export_format.extension),
+                caption=caption
+            )
+        await callback.answer()
+    finally:
+        for part in parts:
+            part.file.close()
 
 
 @router.callback_query(F.data.startswith("export_"))
-async def export_workouts(callback: CallbackQuery):
-    """Экспорт тренировок в CSV или JSON"""
+async def export_workouts(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
+    """Экспорт тренировок в CSV, JSON, NDJSON.gz или Parquet"""
     format_type = callback.data.split('_')[1]
-
-    async for session in get_db_session():
-        try:
-            user = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id))
-            user = user.scalar_one()
-
-            result = await session.execute(
-                select(Workout)
-                .where(Workout.user_id == user.user_id)
-                .order_by(Workout.date)
-                .options(joinedload(Workout.exercises))
+    if not current_user:
+        await callback.answer("Сначала запустите /start")
+        return
+
+    user = current_user
+    try:
+        if format_type in ("ndjson", "parquet"):
+            await send_streamed_export(callback, session, user, format_type)
+            return
+
+        result = await session.execute(
+            select(Workout)
+            .where(Workout.user_id == user.user_id)
+            .order_by(Workout.date)
+            .options(joinedload(Workout.exercises))
+        )
+        workouts = result.unique().scalars().all()
+
+        if not workouts:
+            await callback.answer("Нет данных для экспорта")
+            return
+
+        if format_type == "csv":
+            csv_file = await generate_workout_csv(workouts)
+            await callback.message.answer_document(
+                BufferedInputFile(
+                    csv_file.getvalue().encode('utf-8-sig'),  # Используем utf-8-sig для Excel
+                    filename=f"workouts_{user.user_id}.csv"
+                ),
+                caption="Ваши тренировки в формате CSV"
+            )
+        elif format_type == "json":
+            json_data = await generate_workout_json(workouts)
+            await callback.message.answer_document(
+                BufferedInputFile(
+                    json_data.encode('utf-8'),
+                    filename=f"workouts_{user.user_id}.json"
+                ),
+                caption="Ваши тренировки в формате JSON"
             )
-            workouts = result.unique().scalars().all()
 
-            if not workouts:
-                await callback.answer("Нет данных для экспорта")
-                return
-
-            if format_type == "csv":
-                csv_file = await generate_workout_csv(workouts)
-                await callback.message.answer_document(
-                    BufferedInputFile(
-                        csv_file.getvalue().encode('utf-8-sig'),  # Используем utf-8-sig для Excel
-                        filename=f"workouts_{user.user_id}.csv"
-                    ),
-                    caption="Ваши тренировки в формате CSV"
-                )
-            elif format_type == "json":
-                json_data = await generate_workout_json(workouts)
-                await callback.message.answer_document(
-                    BufferedInputFile(
-                        json_data.encode('utf-8'),
-                        filename=f"workouts_{user.user_id}.json"
-                    ),
-                    caption="Ваши тренировки в формате JSON"
-                )
-
-            await callback.answer()
-        except Exception as e:
-            logging.error(f"Ошибка экспорта: {e}")
-            await callback.answer("❌ Ошибка при экспорте данных")
+        await callback.answer()
+    except Exception as e:
+        logging.error(f"Ошибка экспорта: {e}")
+        await callback.answer("❌ Ошибка при экспорте данных")
 
 
 async def generate_workout_csv(workouts: list) -> io.StringIO:
@@ -344,35 +317,41 @@ async def generate_workout_csv(workouts: list) -> io.StringIO:
     return output
 
 @router.callback_query(F.data == "show_progress")
-async def show_progress(callback: CallbackQuery):
+async def show_progress(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     """Показать график прогресса + ИИ-прогноз"""
-    async for session in get_db_session():
-        try:
-            user = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id))
-            user = user.scalar_one()
+    if not current_user:
+        await callback.answer("Сначала запустите /start")
+        return
 
+    user = current_user
+    try:
+        # Версию данных фиксируем до чтения тренировок
+        key = chart_cache.key(user.user_id, "progress")
+
+        async def build():
             result = await session.execute(
                 select(Workout)
                 .where(Workout.user_id == user.user_id)
                 .order_by(Workout.date)
             )
             workouts = result.scalars().all()
-
             if not workouts:
-                await callback.answer("Нет данных для построения графика")
-                return
+                return None
+            return await generate_progress_chart(workouts)
 
-            chart, ai_message = await generate_progress_chart(workouts)
-
-            await callback.message.answer_photo(
-                BufferedInputFile(
-                    chart.getvalue(),
-                    filename="progress_chart.png"
-                ),
-                caption=ai_message
-            )
-            await callback.answer()
-        except Exception as e:
-            logging.error(f"Ошибка построения графика: {e}")
-            await callback.answer("❌ Ошибка при построении графика")
\ No newline at end of file
+        try:
+            sent = await send_chart(callback.message.answer_photo, key, build, "progress_chart.png")
+        except ChartRendererBusy:
+            await callback.answer("⏳ Сейчас строится много графиков, попробуйте через минуту", show_alert=True)
+            return
+        except asyncio.TimeoutError:
+            await callback.answer("⌛ График строится слишком долго, попробуйте позже", show_alert=True)
+            return
+
+        if not sent:
+            await callback.answer("Нет данных для построения графика")
+            return
+        await callback.answer()
+    except Exception as e:
+        logging.error(f"Ошибка построения графика: {e}")
+        await callback.answer("❌ Ошибка при построении графика")
\ No newline at end of file
@@ -4,11 +4,17 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, \
     KeyboardButton
 from aiogram.filters import Command
-from sqlalchemy import select, func, delete
+from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.session import get_db_session
-from database.models import User, Workout, Exercise, Reminder
-from keyboards.main_menu import get_main_menu, get_help_text, get_settings_menu
+from database.models import User, Workout, Exercise, Reminder, WorkoutDailyRollup
+from keyboards.main_menu import get_main_menu, get_help_text, get_settings_menu, get_timezones_kb
+from services.reminder_index import reminder_index
+from services.rollups import invalidate_user_stats
+from services.ranking import leaderboard
+from services.global_stats import global_stats
+from services.chart_cache import chart_cache
+from services.user_cache import CachedUser, user_cache
+import pytz
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from states import UserStates
@@ -22,123 +28,76 @@ async def get_user(session: AsyncSession, telegram_id: int) -> User | None:
     return result.scalars().first()
 
 
-async def get_user_stats(session: AsyncSession, user_id: int):
+def get_user_stats(user_id: int):
     """Получает статистику пользователя и его позицию в рейтинге"""
-    # Статистика текущего пользователя
-    workouts_count = await session.execute(
-        select(func.count(Workout.workout_id)).where(Workout.user_id == user_id))
-    workouts_count = workouts_count.scalar()
-
-    total_duration = await session.execute(
-        select(func.sum(Workout.duration)).where(Workout.user_id == user_id))
-    total_duration = total_duration.scalar() or 0
-
-    total_calories = await session.execute(
-        select(func.sum(Workout.calories)).where(Workout.user_id == user_id))
-    total_calories = total_calories.scalar() or 0
-
-    # Позиция в рейтинге
-    duration_rank = await session.execute(
-        select(func.count(User.user_id))
-        .select_from(User)
-        .join(Workout)
-        .group_by(User.user_id)
-        .having(func.sum(Workout.duration) > total_duration)
-    )
-    duration_rank = duration_rank.scalar() or 0
-
-    calories_rank = await session.execute(
-        select(func.count(User.user_id))
-        .select_from(User)
-        .join(Workout)
-        .group_by(User.user_id)
-        .having(func.sum(Workout.calories) > total_calories)
-    )
-    calories_rank = calories_rank.scalar() or 0
-
-    workouts_rank = await session.execute(
-        select(func.count(User.user_id))
-        .select_from(User)
-        .join(Workout)
-        .group_by(User.user_id)
-        .having(func.count(Workout.workout_id) > (workouts_count or 0)
-                ))
-    workouts_rank = workouts_rank.scalar() or 0
-
-    total_users = await session.execute(select(func.count(User.user_id)))
-    total_users = total_users.scalar()
-
+    totals = leaderboard.totals(user_id)
     return {
-        'workouts_count': workouts_count or 0,
-        'total_duration': total_duration,
-        'total_calories': total_calories,
-        'duration_rank': duration_rank + 1,
-        'calories_rank': calories_rank + 1,
-        'workouts_rank': workouts_rank + 1,
-        'total_users': total_users
+        'workouts_count': totals.workouts,
+        'total_duration': totals.duration,
+        'total_calories': totals.calories,
+        'duration_rank': leaderboard.rank(user_id, "duration"),
+        'calories_rank': leaderboard.rank(user_id, "calories"),
+        'workouts_rank': leaderboard.rank(user_id, "workouts"),
+        'total_users': leaderboard.users_count
     }
 
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, current_user: CachedUser | None, session: AsyncSession):
     """Обработчик команды /start"""
-    async for session in get_db_session():
-        try:
-            user = await get_user(session, message.from_user.id)
-
-            if not user:
-                new_user = User(
-                    telegram_id=message.from_user.id,
-                    name=message.from_user.full_name
-                )
-                session.add(new_user)
-                await session.commit()
-                await message.answer(
-                    "👋 Привет! Я бот для учёта тренировок.",
-                    reply_markup=get_main_menu()
-                )
-            else:
-                await message.answer(
-                    "🔄 С возвращением!",
-                    reply_markup=get_main_menu(user.is_admin)
-                )
-        except Exception as e:
-            await session.rollback()
-            await message.answer("❌ Произошла ошибка, попробуйте позже")
-            logging.error(f"Error in cmd_start: {e}")
+    if current_user:
+        return await message.answer(
+            "🔄 С возвращением!",
+            reply_markup=get_main_menu(current_user.is_admin)
+        )
+
+    try:
+        new_user = User(
+            telegram_id=message.from_user.id,
+            name=message.from_user.full_name
+        )
+        session.add(new_user)
+        await session.commit()
+        leaderboard.add_user()
+        await message.answer(
+            "👋 Привет! Я бот для учёта тренировок.",
+            reply_markup=get_main_menu()
+        )
+    except Exception as e:
+        await session.rollback()
+        await message.answer("❌ Произошла ошибка, попробуйте позже")
+        logging.error(f"Error in cmd_start: {e}")
 
 
 @router.message(Command("profile"))
 @router.message(F.text == "👤 Мой профиль")
-async def cmd_profile(message: Message):
+async def cmd_profile(message: Message, current_user: CachedUser | None):
     """Обработчик команды /profile и кнопки профиля"""
-    async for session in get_db_session():
-        try:
-            user = await get_user(session, message.from_user.id)
-
-            if user:
-                stats = await get_user_stats(session, user.user_id)
-
-                await message.answer(
-                    f"👤 Ваш профиль:\n"
-                    f"ID: {user.user_id}\n"
-                    f"Имя: {user.name}\n"
-                    f"Дата регистрации: {user.registration_date.strftime('%d.%m.%Y')}\n"
-                    f"Статус: {'Администратор' if user.is_admin else 'Пользователь'}\n\n"
-                    f"📊 Ваша статистика:\n"
-                    f"Тренировок: {stats['workouts_count']}\n"
-                    f"Общая длительность: {stats['total_duration']} мин\n"
-                    f"Сожжено калорий: {stats['total_calories']}\n\n"
-                    f"🏆 Ваше место в рейтинге:\n"
-                    f"По длительности: {stats['duration_rank']}/{stats['total_users']}\n"
-                    f"По калориям: {stats['calories_rank']}/{stats['total_users']}\n"
-                    f"По количеству: {stats['workouts_rank']}/{stats['total_users']}"
-                )
-            else:
-                await message.answer("Сначала запустите /start")
-        except Exception as e:
-            await message.answer("❌ Произошла ошибка при получении профиля")
-            logging.error(f"Error in cmd_profile: {e}")
+    if not current_user:
+        return await message.answer("Сначала запустите /start")
+
+    user = current_user
+    try:
+        stats = get_user_stats(user.user_id)
+
+        await message.answer(
+            f"👤 Ваш профиль:\n"
+            f"ID: {user.user_id}\n"
+            f"Имя: {user.name}\n"
+            f"Дата регистрации: {user.registration_date.strftime('%d.%m.%Y')}\n"
+            f"Статус: {'Администратор' if user.is_admin else 'Пользователь'}\n\n"
+            f"📊 Ваша статистика:\n"
+            f"Тренировок: {stats['workouts_count']}\n"
+            f"Общая длительность: {stats['total_duration']} мин\n"
+            f"Сожжено калорий: {stats['total_calories']}\n\n"
+            f"🏆 Ваше место в рейтинге:\n"
+            f"По длительности: {stats['duration_rank']}/{stats['total_users']}\n"
+            f"По калориям: {stats['calories_rank']}/{stats['total_users']}\n"
+            f"По количеству: {stats['workouts_rank']}/{stats['total_users']}"
+        )
+    except Exception as e:
+        await message.answer("❌ Произошла ошибка при получении профиля")
+        logging.error(f"Error in cmd_profile: {e}")
 
 @router.message(F.text == "ℹ️ Помощь")
 async def cmd_help(message: Message):
@@ -184,32 +143,39 @@ async def delete_account_confirmation(message: Message):
 
 
 @router.callback_query(F.data == "confirm_delete")
-async def delete_account(callback: CallbackQuery):
+async def delete_account(callback: CallbackQuery, current_user: CachedUser | None, session: AsyncSession):
     """Обработчик удаления аккаунта"""
-    async for session in get_db_session():
-        try:
-            user = await get_user(session, callback.from_user.id)
-            if not user:
-                return await callback.answer("❌ Аккаунт не найден", show_alert=True)
-
-            # Удаляем все связанные данные пользователя
-            await session.execute(delete(Exercise).where(Exercise.workout_id.in_(
-                select(Workout.workout_id).where(Workout.user_id == user.user_id)
-            )))
-            await session.execute(delete(Workout).where(Workout.user_id == user.user_id))
-            await session.execute(delete(Reminder).where(Reminder.user_id == user.user_id))
-            await session.execute(delete(User).where(User.user_id == user.user_id))
-
-            await session.commit()
-
-            await callback.message.edit_text(
-                "✅ Ваш аккаунт и все данные успешно удалены.\n"
-                "Для нового использования бота нажмите /start"
-            )
-        except Exception as e:
-            await session.rollback()
-            await callback.answer("❌ Ошибка при удалении аккаунта", show_alert=True)
-            logging.error(f"Error deleting account: {e}")
+    if not current_user:
+        return await callback.answer("❌ Аккаунт не найден", show_alert=True)
+
+    user = current_user
+    try:
+
+        # Удаляем все связанные данные пользователя
+        await session.execute(delete(Exercise).where(Exercise.workout_id.in_(
+            select(Workout.workout_id).where(Workout.user_id == user.user_id)
+        )))
+        await session.execute(delete(Workout).where(Workout.user_id == user.user_id))
+        await session.execute(delete(WorkoutDailyRollup).where(WorkoutDailyRollup.user_id == user.user_id))
+        await session.execute(delete(Reminder).where(Reminder.user_id == user.user_id))
+        await session.execute(delete(User).where(User.user_id == user.user_id))
+
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
+        reminder_index.remove_user(user.user_id)
+        invalidate_user_stats(user.user_id)
+        global_stats.forget_user(user.user_id)
+        leaderboard.remove_user(user.user_id)
+        chart_cache.forget_user(user.user_id)
+
+        await callback.message.edit_text(
+            "✅ Ваш аккаунт и все данные успешно удалены.\n"
+            "Для нового использования бота нажмите /start"
+        )
+    except Exception as e:
+        await session.rollback()
+        await callback.answer("❌ Ошибка при удалении аккаунта", show_alert=True)
+        logging.error(f"Error deleting account: {e}")
 
 
 @router.callback_query(F.data == "cancel_delete")
@@ -219,46 +185,45 @@ async def cancel_delete(callback: CallbackQuery):
 
 
 @router.message(F.text == "⚙️ Настройки")
-async def show_settings(message: Message):
+async def show_settings(message: Message, current_user: CachedUser | None):
     """Показывает меню настроек"""
-    async for session in get_db_session():
-        user = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id))
-        user = user.scalar_one()
+    if not current_user:
+        return await message.answer("Сначала запустите /start")
 
-        await message.answer(
-            "⚙️ <b>Настройки</b>\n\n"
-            f"🔔 Уведомления: {'Включены ✅' if user.notifications_enabled else 'Выключены ❌'}\n\n"
-            "Выберите нужный пункт:",
-            reply_markup=get_settings_menu(user.notifications_enabled),
-            parse_mode="HTML"
-        )
+    await message.answer(
+        "⚙️ <b>Настройки</b>\n\n"
+        f"🔔 Уведомления: {'Включены ✅' if current_user.notifications_enabled else 'Выключены ❌'}\n"
+        f"🌍 Часовой пояс: {current_user.timezone}\n\n"
+        "Выберите нужный пункт:",
+        reply_markup=get_settings_menu(current_user.notifications_enabled),
+        parse_mode="HTML"
+    )
 
 
 @router.message(F.text == "🔔 Управление уведомлениями")
-async def toggle_notifications(message: Message):
+async def toggle_notifications(message: Message, session: AsyncSession):
     """Переключает статус уведомлений"""
-    async for session in get_db_session():
-        try:
-            user = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id))
-            user = user.scalar_one()
+    try:
+        user = await session.execute(
+            select(User).where(User.telegram_id == message.from_user.id))
+        user = user.scalar_one()
 
-            user.notifications_enabled = not user.notifications_enabled
-            await session.commit()
+        user.notifications_enabled = not user.notifications_enabled
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
 
-            status = "включены ✅" if user.notifications_enabled else "выключены ❌"
-            await message.answer(
-                f"🔔 Уведомления теперь {status}\n\n"
-                f"Это влияет на:\n"
-                f"- Получение напоминаний о тренировках\n"
-                f"- Другие уведомления от бота",
-                reply_markup=get_settings_menu(user.notifications_enabled)
-            )
-        except Exception as e:
-            await session.rollback()
-            await message.answer("❌ Произошла ошибка при изменении настроек")
-            logging.error(f"Error toggling notifications: {e}")
+        status = "включены ✅" if user.notifications_enabled else "выключены ❌"
+        await message.answer(
+            f"🔔 Уведомления теперь {status}\n\n"
+            f"Это влияет на:\n"
+            f"- Получение напоминаний о тренировках\n"
+            f"- Другие уведомления от бота",
+            reply_markup=get_settings_menu(user.notifications_enabled)
+        )
+    except Exception as e:
+        await session.rollback()
+        await message.answer("❌ Произошла ошибка при изменении настроек")
+        logging.error(f"Error toggling notifications: {e}")
 
 @router.message(F.text == "👤 Изменить имя")
 async def change_name(message: Message, state: FSMContext):
@@ -282,39 +247,79 @@ async def cancel_action(message: Message, state: FSMContext):
     )
 
 @router.message( F.text == "🔙 Главное меню")
-async def return_to_menu_from_pagination(message: Message, state: FSMContext):
+async def return_to_menu_from_pagination(message: Message, state: FSMContext, current_user: CachedUser | None):
     """Возврат в главное меню из режима просмотра"""
-    async for session in get_db_session():
-        user = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id))
-        user = user.scalar_one()
-        await state.clear()
-        await message.answer(
-            "Главное меню:",
-            reply_markup=get_main_menu(user.is_admin)
-        )
+    await state.clear()
+    await message.answer(
+        "Главное меню:",
+        reply_markup=get_main_menu(bool(current_user and current_user.is_admin))
+    )
 
 @router.message(UserStates.waiting_for_new_name)
-async def process_new_name(message: Message, state: FSMContext):
+async def process_new_name(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка нового имени"""
     new_name = message.text.strip()
     if len(new_name) < 2:
         return await message.answer("❌ Имя слишком короткое, попробуйте еще раз")
 
-    async for session in get_db_session():
-        try:
-            user = await get_user(session, message.from_user.id)
-            if user:
-                user.name = new_name
-                await session.commit()
-                await message.answer(
-                    f"✅ Имя успешно изменено на: {new_name}",
-                    reply_markup=get_main_menu(user.is_admin)
-                )
-            else:
-                await message.answer("❌ Пользователь не найден")
-        except Exception as e:
-            await session.rollback()
-            await message.answer("❌ Ошибка при изменении имени")
-            logging.error(f"Error changing name: {e}")
-    await state.clear()
\ No newline at end of file
+    try:
+        user = await get_user(session, message.from_user.id)
+        if user:
+            user.name = new_name
+            await session.commit()
+            user_cache.invalidate(user.telegram_id)
+            global_stats.forget_name(user.user_id)
+            await message.answer(
+                f"✅ Имя успешно изменено на: {new_name}",
+                reply_markup=get_main_menu(user.is_admin)
+            )
+        else:
+            await message.answer("❌ Пользователь не найден")
+    except Exception as e:
+        await session.rollback()
+        await message.answer("❌ Ошибка при изменении имени")
+        logging.error(f"Error changing name: {e}")
+    await state.clear()
+
+
+@router.message(F.text == "🌍 Часовой пояс")
+async def change_timezone(message: Message, state: FSMContext):
+    """Запрос нового часового пояса"""
+    await message.answer(
+        "🌍 Выберите часовой пояс или введите его название (например, Asia/Omsk):",
+        reply_markup=get_timezones_kb()
+    )
+    await state.set_state(UserStates.waiting_for_timezone)
+
+
+@router.message(UserStates.waiting_for_timezone)
+async def process_timezone(message: Message, state: FSMContext, session: AsyncSession):
+    """Сохраняет часовой пояс и пересчитывает время напоминаний"""
+    timezone = message.text.strip()
+    if timezone not in pytz.all_timezones_set:
+        return await message.answer(
+            "❌ Неизвестный часовой пояс, выберите из списка или введите в формате Континент/Город",
+            reply_markup=get_timezones_kb()
+        )
+
+    try:
+        user = await get_user(session, message.from_user.id)
+        if not user:
+            await message.answer("❌ Пользователь не найден")
+            await state.clear()
+            return
+
+        user.timezone = timezone
+        await session.commit()
+        user_cache.invalidate(user.telegram_id)
+        await reminder_index.recompute(session, Reminder.user_id == user.user_id)
+
+        await message.answer(
+            f"✅ Часовой пояс изменён на {timezone}",
+            reply_markup=get_settings_menu(user.notifications_enabled)
+        )
+    except Exception as e:
+        await session.rollback()
+        await message.answer("❌ Ошибка при изменении часового пояса")
+        logging.error(f"Error changing timezone: {e}")
+    await state.clear()
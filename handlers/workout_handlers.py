@@ -3,20 +3,26 @@ from aiogram import Router, F
 from aiogram.types import Message, ReplyKeyboardRemove, KeyboardButton
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
-from datetime import datetime
+from datetime import datetime, timedelta
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from sqlalchemy import select, func, desc, delete
-from database.session import get_db_session
-from database.models import Workout, Exercise, User
+from sqlalchemy import select, func, delete
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Workout, Exercise
 from states import WorkoutStates, EditExerciseStates, EditWorkoutStates, DeleteWorkoutStates
 from keyboards.main_menu import get_main_menu, get_workout_pagination_kb
 from keyboards.workout_types import get_workout_types
 from typing import Dict
+from services.ranking import leaderboard
+from services.pagination import Page, fetch_page, encode_cursor
+from services.rollups import record_workout, forget_workout, move_workout, workout_values, invalidate_user_stats
+from services.user_cache import CachedUser
 from aiogram.fsm.state import State, StatesGroup
 
 
 class PaginationStates(StatesGroup):
     viewing_workouts = State()
+    waiting_for_jump_date = State()
 
 
 router = Router()
@@ -33,6 +39,10 @@ WORKOUT_TYPES = {
 
 DISTANCE_WORKOUTS = {"running", "cycling", "swimming"}
 
+# Сколько более новых тренировок считается при переходе к дате (20 страниц);
+# дальше номер страницы не показывается, чтобы count не читал всю историю
+JUMP_COUNT_LIMIT = 100
+
 WORKOUT_TYPE_TRANSLATIONS = {
     "strength": "🏋️‍♂️ Силовая",
     "running": "🏃 Бег",
@@ -66,72 +76,99 @@ async def start_add_workout(message: Message, state: FSMContext):
 
 
 @router.message(F.text == "📋 Мои тренировки")
-async def show_workouts(message: Message, state: FSMContext):
+async def show_workouts(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Показывает первые 5 тренировок пользователя"""
-    async for session in get_db_session():
-        user = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id))
-        user = user.scalar_one()
-
-        # Проверка на бан
-        if user.is_banned:
-            await message.answer("🚫 Ваш аккаунт заблокирован. Вы не можете добавлять или редактировать тренировки.")
-            return
+    if not current_user:
+        return await message.answer("Сначала запустите /start")
 
-        workouts = await session.execute(
-            select(Workout)
-            .where(Workout.user_id == user.user_id)
-            .order_by(desc(Workout.date))
-            .limit(5)
-        )
-        workouts = workouts.scalars().all()
+    # Проверка на бан
+    if current_user.is_banned:
+        await message.answer("🚫 Ваш аккаунт заблокирован. Вы не можете добавлять или редактировать тренировки.")
+        return
 
-        if not workouts:
-            await message.answer("У вас пока нет тренировок.", reply_markup=get_main_menu(user.is_admin))
-            return
+    user = current_user
+    page = await load_workouts_page(session, user.user_id)
+    workouts = page.items
 
-        total = await session.execute(
-            select(func.count()).select_from(Workout).where(Workout.user_id == user.user_id))
-        total = total.scalar()
+    if not workouts:
+        await message.answer("У вас пока нет тренировок.", reply_markup=get_main_menu(user.is_admin))
+        return
 
-        await state.update_data(
-            current_page=1,
-            total_pages=max(1, (total + 4) // 5),
-            user_id=user.user_id,
-            message_id=message.message_id  # Сохраняем ID сообщения для редактирования
-        )
-        await state.set_state(PaginationStates.viewing_workouts)
+    # Число тренировок ведёт рейтинг, отдельный count() не нужен
+    total = max(leaderboard.totals(user.user_id).workouts, len(workouts))
 
-        response = await format_workouts_response(workouts, 1, total, session)
+    await state.update_data(
+        current_page=1,
+        user_id=user.user_id,
+        is_admin=user.is_admin,
+        message_id=message.message_id  # Сохраняем ID сообщения для редактирования
+    )
+    await remember_page(state, page)
+    await state.set_state(PaginationStates.viewing_workouts)
 
-        # Если это первое сообщение, отправляем новое, иначе редактируем существующее
-        if 'message_id' not in (await state.get_data()):
+    response = format_workouts_response(workouts, 1, total)
+
+    # Если это первое сообщение, отправляем новое, иначе редактируем существующее
+    if 'message_id' not in (await state.get_data()):
+        sent_message = await message.answer(
+            response,
+            reply_markup=get_workout_pagination_kb(has_prev=False, has_next=page.has_next)
+        )
+        await state.update_data(message_id=sent_message.message_id)
+    else:
+        data = await state.get_data()
+        try:
+            await message.bot.edit_message_text(
+                chat_id=message.chat.id,
+                message_id=data['message_id'],
+                text=response,
+                reply_markup=get_workout_pagination_kb(has_prev=False, has_next=page.has_next)
+            )
+        except:
+            # Если не удалось редактировать (например, сообщение слишком старое), отправляем новое
             sent_message = await message.answer(
                 response,
-                reply_markup=get_workout_pagination_kb(has_prev=False, has_next=total > 5)
+                reply_markup=get_workout_pagination_kb(has_prev=False, has_next=page.has_next)
             )
             await state.update_data(message_id=sent_message.message_id)
-        else:
-            data = await state.get_data()
-            try:
-                await message.bot.edit_message_text(
-                    chat_id=message.chat.id,
-                    message_id=data['message_id'],
-                    text=response,
-                    reply_markup=get_workout_pagination_kb(has_prev=False, has_next=total > 5)
-                )
-            except:
-                # Если не удалось редактировать (например, сообщение слишком старое), отправляем новое
-                sent_message = await message.answer(
-                    response,
-                    reply_markup=get_workout_pagination_kb(has_prev=False, has_next=total > 5)
-                )
-                await state.update_data(message_id=sent_message.message_id)
 
 
-async def format_workouts_response(workouts: list, current_page: int, total: int, session) -> str:
-    """Форматирует список тренировок в текст сообщения"""
-    response = f"🏋️‍♂️ <b>Ваши тренировки</b> (страница {current_page}):\n\n"
+async def load_workouts_page(session, user_id: int, after: str | None = None, before: str | None = None) -> Page:
+    """
+    Страница тренировок (новые сверху) вместе с упражнениями — два запроса на страницу.
+    after/before — курсоры соседней страницы (см. services.pagination)
+    """
+    return await fetch_page(
+        session,
+        select(Workout)
+        .where(Workout.user_id == user_id)
+        .options(selectinload(Workout.exercises)),
+        Workout.date,
+        Workout.workout_id,
+        key=lambda workout: (workout.date, workout.workout_id),
+        limit=5,
+        after=after,
+        before=before
+    )
+
+
+async def remember_page(state: FSMContext, page: Page):
+    """Сохраняет в FSM курсоры и тренировки показанной страницы"""
+    await state.update_data(
+        page_first=page.first,
+        page_last=page.last,
+        has_prev=page.has_prev,
+        has_next=page.has_next,
+        page_workouts=[w.workout_id for w in page.items]
+    )
+
+
+def format_workouts_response(workouts: list, current_page: int | None, total: int) -> str:
+    """Форматирует список тренировок в текст сообщения (current_page=None — номер неизвестен)"""
+    if current_page is None:
+        response = "🏋️‍♂️ <b>Ваши тренировки</b>:\n\n"
+    else:
+        response = f"🏋️‍♂️ <b>Ваши тренировки</b> (страница {current_page}):\n\n"
     for i, workout in enumerate(workouts, 1):
         workout_type = WORKOUT_TYPE_TRANSLATIONS.get(workout.type, workout.type.capitalize())
 
@@ -144,14 +181,10 @@ async def format_workouts_response(workouts: list, current_page: int, total: int
         if workout.distance:
             response += f"📏 Дистанция: <b>{workout.distance} км</b>\n"
 
-        if workout.type == "strength":
-            exercises = await session.execute(
-                select(Exercise).where(Exercise.workout_id == workout.workout_id))
-            exercises = exercises.scalars().all()
-            if exercises:
-                response += "💪 Упражнения:\n"
-                for ex in exercises:
-                    response += f"  - {ex.name} ({ex.sets}x{ex.reps} по {ex.weight}кг)\n"
+        if workout.type == "strength" and workout.exercises:
+            response += "💪 Упражнения:\n"
+            for ex in workout.exercises:
+                response += f"  - {ex.name} ({ex.sets}x{ex.reps} по {ex.weight}кг)\n"
 
         response += f"🔥 Калории: <b>{workout.calories} ккал</b>\n\n"
 
@@ -160,59 +193,98 @@ async def format_workouts_response(workouts: list, current_page: int, total: int
 
 
 @router.message(PaginationStates.viewing_workouts, F.text.in_(["⬅️ Назад", "➡️ Вперед"]))
-async def paginate_workouts(message: Message, state: FSMContext):
+async def paginate_workouts(message: Message, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
     current_page = data['current_page']
-    total_pages = data['total_pages']
     user_id = data['user_id']
-    message_id = data.get('message_id', message.message_id)
 
-    if message.text == "⬅️ Назад" and current_page > 1:
-        current_page -= 1
-    elif message.text == "➡️ Вперед" and current_page < total_pages:
-        current_page += 1
+    # После перехода к далёкой дате номер страницы неизвестен (None), пока не вернёмся к первой
+    if message.text == "⬅️ Назад" and data.get('has_prev'):
+        cursors = {'before': data['page_first']}
+        current_page = current_page and current_page - 1
+    elif message.text == "➡️ Вперед" and data.get('has_next'):
+        cursors = {'after': data['page_last']}
+        current_page = current_page and current_page + 1
     else:
         await message.answer("Это крайняя страница.")
         return
 
-    async for session in get_db_session():
-        workouts = await session.execute(
-            select(Workout)
-            .where(Workout.user_id == user_id)
-            .order_by(desc(Workout.date))
-            .offset((current_page - 1) * 5)
-            .limit(5)
-        )
-        workouts = workouts.scalars().all()
+    page = await load_workouts_page(session, user_id, **cursors)
+    if not page.has_prev:
+        current_page = 1
+    await show_workouts_page(message, state, page, current_page)
 
-        total = await session.execute(
-            select(func.count()).select_from(Workout).where(Workout.user_id == user_id))
-        total = total.scalar()
 
-        await state.update_data(current_page=current_page)
+@router.message(PaginationStates.viewing_workouts, F.text == "📅 К дате")
+async def ask_jump_date(message: Message, state: FSMContext):
+    """Переход к тренировкам за выбранную дату"""
+    await message.answer("Введите дату в формате ДД.ММ.ГГГГ:")
+    await state.set_state(PaginationStates.waiting_for_jump_date)
 
-        response = await format_workouts_response(workouts, current_page, total, session)
 
-        try:
-            await message.bot.edit_message_text(
-                chat_id=message.chat.id,
-                message_id=message_id,
-                text=response,
-                reply_markup=get_workout_pagination_kb(
-                    has_prev=current_page > 1,
-                    has_next=current_page < total_pages
-                )
-            )
-        except Exception as e:
-            logging.error(f"Error editing message: {e}")
-            sent_message = await message.answer(
-                response,
-                reply_markup=get_workout_pagination_kb(
-                    has_prev=current_page > 1,
-                    has_next=current_page < total_pages
-                )
-            )
-            await state.update_data(message_id=sent_message.message_id)
+@router.message(PaginationStates.waiting_for_jump_date)
+async def jump_to_date(message: Message, state: FSMContext, session: AsyncSession):
+    """Показывает страницу, начинающуюся с тренировок выбранного дня"""
+    try:
+        day = datetime.strptime(message.text.strip(), "%d.%m.%Y")
+    except ValueError:
+        await message.answer("Неверный формат даты. Используйте ДД.ММ.ГГГГ")
+        return
+
+    data = await state.get_data()
+    user_id = data['user_id']
+    # Страница начинается с последней тренировки не позже конца выбранного дня
+    day_end = day + timedelta(days=1)
+
+    page = await load_workouts_page(session, user_id, after=encode_cursor(day_end, 0))
+    if not page.items:
+        await state.set_state(PaginationStates.viewing_workouts)
+        await message.answer("Нет тренировок до этой даты.")
+        return
+
+    # Номер страницы нужен только для подписи: count по индексу (user_id, date),
+    # не больше JUMP_COUNT_LIMIT + 1 строк
+    newer = await session.execute(
+        select(func.count()).select_from(
+            select(Workout.workout_id)
+            .where(Workout.user_id == user_id, Workout.date >= day_end)
+            .limit(JUMP_COUNT_LIMIT + 1)
+            .subquery()
+        ))
+    newer = newer.scalar()
+    page.has_prev = newer > 0
+
+    await state.set_state(PaginationStates.viewing_workouts)
+    await show_workouts_page(message, state, page, newer // 5 + 1 if newer <= JUMP_COUNT_LIMIT else None)
+
+
+async def show_workouts_page(message: Message, state: FSMContext, page: Page, current_page: int | None):
+    """Показывает страницу тренировок и запоминает её в FSM"""
+    data = await state.get_data()
+    user_id = data['user_id']
+    message_id = data.get('message_id', message.message_id)
+    total = leaderboard.totals(user_id).workouts
+
+    await state.update_data(current_page=current_page)
+    await remember_page(state, page)
+
+    response = format_workouts_response(page.items, current_page, total)
+    keyboard = get_workout_pagination_kb(has_prev=page.has_prev, has_next=page.has_next)
+
+    try:
+        await message.bot.edit_message_text(
+            chat_id=message.chat.id,
+            message_id=message_id,
+            text=response,
+            reply_markup=keyboard
+        )
+    except Exception as e:
+        logging.error(f"Error editing message: {e}")
+        sent_message = await message.answer(
+            response,
+            reply_markup=keyboard
+        )
+        await state.update_data(message_id=sent_message.message_id)
 
 
 @router.message(PaginationStates.viewing_workouts, F.text == "➕ Добавить тренировку")
@@ -225,15 +297,12 @@ async def add_workout_from_pagination(message: Message, state: FSMContext):
 @router.message(PaginationStates.viewing_workouts, F.text == "🔙 Главное меню")
 async def return_to_menu_from_pagination(message: Message, state: FSMContext):
     """Возврат в главное меню из режима просмотра"""
-    async for session in get_db_session():
-        user = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id))
-        user = user.scalar_one()
-        await state.clear()
-        await message.answer(
-            "Главное меню:",
-            reply_markup=get_main_menu(user.is_admin)
-        )
+    data = await state.get_data()
+    await state.clear()
+    await message.answer(
+        "Главное меню:",
+        reply_markup=get_main_menu(data.get('is_admin', False))
+    )
 
 
 @router.message(WorkoutStates.waiting_for_type, F.text.in_(WORKOUT_TYPES.keys()))
@@ -397,103 +466,94 @@ async def process_calories(message: Message, state: FSMContext):
 
 
 @router.message(WorkoutStates.waiting_for_notes)
-async def process_notes(message: Message, state: FSMContext):
+async def process_notes(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Финальное сохранение тренировки"""
     data = await state.get_data()
-    async for session in get_db_session():
-        try:
-            user = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id))
-            user = user.scalar_one()
-
-            workout = Workout(
-                user_id=user.user_id,
-                date=datetime.now(),
-                type=data['workout_type'],
-                duration=data['duration'],
-                distance=data.get('distance', 0),
-                calories=data['calories'],
-                notes=None if message.text.lower() == 'нет' else message.text
-            )
+    if not current_user:
+        await state.clear()
+        return await message.answer("Сначала запустите /start")
 
-            session.add(workout)
-            await session.flush()
-
-            if data['workout_type'] == "strength":
-                for exercise_data in data.get('exercises', []):
-                    exercise = Exercise(
-                        workout_id=workout.workout_id,
-                        name=exercise_data['name'],
-                        sets=exercise_data['sets'],
-                        reps=exercise_data['reps'],
-                        weight=exercise_data['weight']
-                    )
-                    session.add(exercise)
-
-            await session.commit()
-
-            response = (
-                f"✅ Тренировка сохранена!\n"
-                f"Тип: {data['workout_type']}\n"
-                f"Длительность: {data['duration']} мин.\n"
-                f"Калории: {data['calories']} ккал\n"
-            )
+    user = current_user
+    try:
+        workout = Workout(
+            user_id=user.user_id,
+            date=datetime.now(),
+            type=data['workout_type'],
+            duration=data['duration'],
+            distance=data.get('distance', 0),
+            calories=data['calories'],
+            notes=None if message.text.lower() == 'нет' else message.text
+        )
 
-            if data['workout_type'] == "strength":
-                response += "\nУпражнения:\n"
-                for i, ex in enumerate(data.get('exercises', []), 1):
-                    response += (
-                        f"{i}. {ex['name']} - "
-                        f"{ex['sets']}x{ex['reps']} по {ex['weight']}кг\n"
-                    )
+        session.add(workout)
+        await session.flush()
+
+        if data['workout_type'] == "strength":
+            for exercise_data in data.get('exercises', []):
+                exercise = Exercise(
+                    workout_id=workout.workout_id,
+                    name=exercise_data['name'],
+                    sets=exercise_data['sets'],
+                    reps=exercise_data['reps'],
+                    weight=exercise_data['weight']
+                )
+                session.add(exercise)
 
-            await message.answer(
-                response,
-                reply_markup=get_main_menu(user.is_admin)
-            )
-        except Exception as e:
-            await session.rollback()
-            await message.answer(
-                "❌ Ошибка сохранения. Попробуйте позже.",
-                reply_markup=get_main_menu(message.from_user.id)
-            )
-            logging.error(f"Workout save error: {e}")
-        finally:
-            await state.clear()
+        await record_workout(session, workout)
+        await session.commit()
+        invalidate_user_stats(user.user_id)
+
+        response = (
+            f"✅ Тренировка сохранена!\n"
+            f"Тип: {data['workout_type']}\n"
+            f"Длительность: {data['duration']} мин.\n"
+            f"Калории: {data['calories']} ккал\n"
+        )
+
+        if data['workout_type'] == "strength":
+            response += "\nУпражнения:\n"
+            for i, ex in enumerate(data.get('exercises', []), 1):
+                response += (
+                    f"{i}. {ex['name']} - "
+                    f"{ex['sets']}x{ex['reps']} по {ex['weight']}кг\n"
+                )
+
+        await message.answer(
+            response,
+            reply_markup=get_main_menu(user.is_admin)
+        )
+    except Exception as e:
+        await session.rollback()
+        await message.answer(
+            "❌ Ошибка сохранения. Попробуйте позже.",
+            reply_markup=get_main_menu(message.from_user.id)
+        )
+        logging.error(f"Workout save error: {e}")
+    finally:
+        await state.clear()
 
 
 @router.message(PaginationStates.viewing_workouts, F.text == "✏️ Редактировать")
 async def select_workout_to_edit(message: Message, state: FSMContext):
     """Выбор тренировки для редактирования"""
     data = await state.get_data()
-    current_page = data['current_page']
-    user_id = data['user_id']
+    workout_ids = data.get('page_workouts', [])
 
-    async for session in get_db_session():
-        workouts = await session.execute(
-            select(Workout)
-            .where(Workout.user_id == user_id)
-            .order_by(desc(Workout.date))
-            .offset((current_page - 1) * 5)
-            .limit(5)
-        )
-        workouts = workouts.scalars().all()
+    builder = ReplyKeyboardBuilder()
+    for i in range(1, len(workout_ids) + 1):
+        builder.add(KeyboardButton(text=f"✏️ {i}"))
+    builder.row(KeyboardButton(text="❌ Отмена"))
 
-        builder = ReplyKeyboardBuilder()
-        for i, workout in enumerate(workouts, 1):
-            builder.add(KeyboardButton(text=f"✏️ {i}"))
-        builder.row(KeyboardButton(text="❌ Отмена"))
-
-        await message.answer(
-            "Выберите номер тренировки для редактирования:",
-            reply_markup=builder.as_markup(resize_keyboard=True)
-        )
-        await state.set_state(EditWorkoutStates.waiting_for_workout_to_edit)
-        await state.update_data(workouts=[w.workout_id for w in workouts])
+    await message.answer(
+        "Выберите номер тренировки для редактирования:",
+        reply_markup=builder.as_markup(resize_keyboard=True)
+    )
+    await state.set_state(EditWorkoutStates.waiting_for_workout_to_edit)
+    await state.update_data(workouts=workout_ids)
 
 
 @router.message(EditWorkoutStates.waiting_for_workout_to_edit, F.text.regexp(r'^✏️\s*\d+$'))
-async def select_field_to_edit(message: Message, state: FSMContext):
+async def select_field_to_edit(message: Message, state: FSMContext, session: AsyncSession):
     """Выбор поля для редактирования"""
     try:
         data = await state.get_data()
@@ -505,29 +565,28 @@ async def select_field_to_edit(message: Message, state: FSMContext):
 
         workout_id = data['workouts'][workout_index]
 
-        async for session in get_db_session():
-            workout = await session.get(Workout, workout_id)
-            if not workout:
-                await message.answer("Тренировка не найдена.")
-                return
+        workout = await session.get(Workout, workout_id)
+        if not workout:
+            await message.answer("Тренировка не найдена.")
+            return
 
-            builder = ReplyKeyboardBuilder()
-            fields = ["Тип тренировки", "Дата и время", "Длительность", "Калории", "Заметки"]
+        builder = ReplyKeyboardBuilder()
+        fields = ["Тип тренировки", "Дата и время", "Длительность", "Калории", "Заметки"]
 
-            if workout.type == "strength":
-                fields.append("Упражнения")
-            elif workout.type in DISTANCE_WORKOUTS:
-                fields.append("Дистанция")
+        if workout.type == "strength":
+            fields.append("Упражнения")
+        elif workout.type in DISTANCE_WORKOUTS:
+            fields.append("Дистанция")
 
-            for field in fields:
-                builder.add(KeyboardButton(text=field))
-            builder.row(KeyboardButton(text="❌ Отмена"))
+        for field in fields:
+            builder.add(KeyboardButton(text=field))
+        builder.row(KeyboardButton(text="❌ Отмена"))
 
-            await state.update_data(workout_id=workout_id)
-            await message.answer(
-                "Выберите что хотите изменить:",
-                reply_markup=builder.as_markup(resize_keyboard=True))
-            await state.set_state(EditWorkoutStates.waiting_for_edit_choice)
+        await state.update_data(workout_id=workout_id)
+        await message.answer(
+            "Выберите что хотите изменить:",
+            reply_markup=builder.as_markup(resize_keyboard=True))
+        await state.set_state(EditWorkoutStates.waiting_for_edit_choice)
 
     except Exception as e:
         logging.error(f"Ошибка выбора тренировки: {e}")
@@ -535,85 +594,83 @@ async def select_field_to_edit(message: Message, state: FSMContext):
 
 
 @router.message(EditWorkoutStates.waiting_for_edit_choice)
-async def process_edit_choice(message: Message, state: FSMContext):
+async def process_edit_choice(message: Message, state: FSMContext, session: AsyncSession):
     """Обработка выбора поля для редактирования"""
     data = await state.get_data()
     workout_id = data['workout_id']
 
-    async for session in get_db_session():
-        workout = await session.get(Workout, workout_id)
+    workout = await session.get(Workout, workout_id)
 
-        if message.text == "Упражнения" and workout.type == "strength":
-            await handle_edit_exercises(message, state, workout_id)
-            return
+    if message.text == "Упражнения" and workout.type == "strength":
+        await handle_edit_exercises(message, state, workout_id, session)
+        return
 
-        field_mapping = {
-            "Тип тренировки": "type",
-            "Дата и время": "date",
-            "Длительность": "duration",
-            "Дистанция": "distance",
-            "Калории": "calories",
-            "Заметки": "notes"
-        }
-
-        if message.text not in field_mapping:
-            await message.answer("Пожалуйста, выберите поле из списка.")
-            return
+    field_mapping = {
+        "Тип тренировки": "type",
+        "Дата и время": "date",
+        "Длительность": "duration",
+        "Дистанция": "distance",
+        "Калории": "calories",
+        "Заметки": "notes"
+    }
 
-        field = field_mapping[message.text]
-        await state.update_data(edit_field=field)
+    if message.text not in field_mapping:
+        await message.answer("Пожалуйста, выберите поле из списка.")
+        return
 
-        prompts = {
-            "type": "Выберите новый тип тренировки:",
-            "date": "Введите новую дату и время (ДД.ММ.ГГГГ ЧЧ:ММ):",
-            "duration": "Введите новую длительность (минуты):",
-            "distance": "Введите новую дистанцию (км):",
-            "calories": "Введите новое количество калорий:",
-            "notes": "Введите новые заметки:"
-        }
+    field = field_mapping[message.text]
+    await state.update_data(edit_field=field)
 
-        if field == "type":
-            await message.answer(
-                prompts[field],
-                reply_markup=get_workout_types()
-            )
-        else:
-            await message.answer(
-                prompts[field],
-                reply_markup=ReplyKeyboardRemove()
-            )
+    prompts = {
+        "type": "Выберите новый тип тренировки:",
+        "date": "Введите новую дату и время (ДД.ММ.ГГГГ ЧЧ:ММ):",
+        "duration": "Введите новую длительность (минуты):",
+        "distance": "Введите новую дистанцию (км):",
+        "calories": "Введите новое количество калорий:",
+        "notes": "Введите новые заметки:"
+    }
 
-        await state.set_state(EditWorkoutStates.waiting_for_new_value)
+    if field == "type":
+        await message.answer(
+            prompts[field],
+            reply_markup=get_workout_types()
+        )
+    else:
+        await message.answer(
+            prompts[field],
+            reply_markup=ReplyKeyboardRemove()
+        )
+
+    await state.set_state(EditWorkoutStates.waiting_for_new_value)
 
 
-async def handle_edit_exercises(message: Message, state: FSMContext, workout_id: int):
+async def handle_edit_exercises(message: Message, state: FSMContext, workout_id: int, session: AsyncSession):
     """Обработка редактирования упражнений"""
-    async for session in get_db_session():
-        exercises = await session.execute(
-            select(Exercise)
-            .where(Exercise.workout_id == workout_id)
-            .order_by(Exercise.exercise_id)
-        )
-        exercises = exercises.scalars().all()
+    exercises = await session.execute(
+        select(Exercise)
+        .where(Exercise.workout_id == workout_id)
+        .order_by(Exercise.exercise_id)
+    )
+    exercises = exercises.scalars().all()
 
-        if not exercises:
-            await message.answer("В этой тренировке нет упражнений.")
-            return
+    if not exercises:
+        await message.answer("В этой тренировке нет упражнений.")
+        return
 
-        builder = ReplyKeyboardBuilder()
-        for i, exercise in enumerate(exercises, 1):
-            builder.add(KeyboardButton(text=f"🏋️‍ Упражнение {i}: {exercise.name}"))
-        builder.row(KeyboardButton(text="❌ Отмена"))  # Убрали кнопку добавления
+    builder = ReplyKeyboardBuilder()
+    for i, exercise in enumerate(exercises, 1):
+        builder.add(KeyboardButton(text=f"🏋️‍ Упражнение {i}: {exercise.name}"))
+    builder.row(KeyboardButton(text="❌ Отмена"))  # Убрали кнопку добавления
 
-        await message.answer(
-            "Выберите упражнение для редактирования:",
-            reply_markup=builder.as_markup(resize_keyboard=True)
-        )
-        await state.update_data(
-            exercises=[e.exercise_id for e in exercises],
-            workout_id=workout_id
-        )
-        await state.set_state(EditExerciseStates.waiting_for_exercise_to_edit)
+    await message.answer(
+        "Выберите упражнение для редактирования:",
+        reply_markup=builder.as_markup(resize_keyboard=True)
+    )
+    await state.update_data(
+        exercises=[e.exercise_id for e in exercises],
+        workout_id=workout_id
+    )
+    await state.set_state(EditExerciseStates.waiting_for_exercise_to_edit)
 
 
 @router.message(EditExerciseStates.waiting_for_exercise_to_edit, F.text.regexp(r'^🏋️‍ Упражнение \d+:'))
@@ -658,17 +715,17 @@ async def select_exercise_field(message: Message, state: FSMContext):
 @router.message(EditExerciseStates.waiting_for_exercise_to_edit, F.text == "❌ Отмена")
 @router.message(EditExerciseStates.waiting_for_exercise_field, F.text == "❌ Отмена")
 @router.message(EditExerciseStates.waiting_for_new_exercise_value, F.text == "❌ Отмена")
-async def cancel_edit(message: Message, state: FSMContext):
+async def cancel_edit(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Обработка отмены редактирования"""
     await state.clear()
-    await show_workouts(message, state)
+    await show_workouts(message, state, current_user, session)
 
 
 @router.message(EditExerciseStates.waiting_for_exercise_field)
-async def process_exercise_field_choice(message: Message, state: FSMContext):
+async def process_exercise_field_choice(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Обработка выбора поля упражнения"""
     if message.text == "🗑️ Удалить упражнение":
-        await delete_exercise(message, state)
+        await delete_exercise(message, state, current_user, session)
         return
 
     field_mapping = {
@@ -699,29 +756,28 @@ async def process_exercise_field_choice(message: Message, state: FSMContext):
     await state.set_state(EditExerciseStates.waiting_for_new_exercise_value)
 
 
-async def delete_exercise(message: Message, state: FSMContext):
+async def delete_exercise(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Удаление упражнения"""
     data = await state.get_data()
     exercise_id = data['exercise_id']
     workout_id = data['workout_id']
 
     try:
-        async for session in get_db_session():
-            exercise = await session.get(Exercise, exercise_id)
-            await session.delete(exercise)
-            await session.commit()
-            await message.answer("✅ Упражнение удалено!")
-
-            remaining = await session.execute(
-                select(Exercise).where(Exercise.workout_id == workout_id))
-            remaining = remaining.scalars().all()
-
-            if not remaining:
-                await message.answer("В тренировке больше нет упражнений.")
-                await state.set_state(None)
-                await show_workouts(message, state)
-            else:
-                await handle_edit_exercises(message, state, workout_id)
+        exercise = await session.get(Exercise, exercise_id)
+        await session.delete(exercise)
+        await session.commit()
+        await message.answer("✅ Упражнение удалено!")
+
+        remaining = await session.execute(
+            select(Exercise).where(Exercise.workout_id == workout_id))
+        remaining = remaining.scalars().all()
+
+        if not remaining:
+            await message.answer("В тренировке больше нет упражнений.")
+            await state.set_state(None)
+            await show_workouts(message, state, current_user, session)
+        else:
+            await handle_edit_exercises(message, state, workout_id, session)
 
     except Exception as e:
         logging.error(f"Ошибка при удалении упражнения: {e}")
@@ -729,7 +785,7 @@ async def delete_exercise(message: Message, state: FSMContext):
 
 
 @router.message(EditExerciseStates.waiting_for_new_exercise_value)
-async def save_edited_exercise(message: Message, state: FSMContext):
+async def save_edited_exercise(message: Message, state: FSMContext, session: AsyncSession):
     """Сохранение изменений в упражнении"""
     data = await state.get_data()
     field = data['exercise_field']
@@ -737,26 +793,25 @@ async def save_edited_exercise(message: Message, state: FSMContext):
     workout_id = data['workout_id']
 
     try:
-        async for session in get_db_session():
-            exercise = await session.get(Exercise, exercise_id)
-
-            if field in ["sets", "reps", "weight"]:
-                try:
-                    value = int(message.text)
-                    if value <= 0:
-                        raise ValueError
-                    setattr(exercise, field, value)
-                except ValueError:
-                    await message.answer("Введите целое число больше 0.")
-                    return
-            else:
-                setattr(exercise, field, message.text)
-
-            await session.commit()
-            await message.answer("✅ Изменения сохранены!")
-
-            await state.set_state(EditExerciseStates.waiting_for_exercise_field)
-            await select_exercise_field(message, state)
+        exercise = await session.get(Exercise, exercise_id)
+
+        if field in ["sets", "reps", "weight"]:
+            try:
+                value = int(message.text)
+                if value <= 0:
+                    raise ValueError
+                setattr(exercise, field, value)
+            except ValueError:
+                await message.answer("Введите целое число больше 0.")
+                return
+        else:
+            setattr(exercise, field, message.text)
+
+        await session.commit()
+        await message.answer("✅ Изменения сохранены!")
+
+        await state.set_state(EditExerciseStates.waiting_for_exercise_field)
+        await select_exercise_field(message, state)
 
     except Exception as e:
         logging.error(f"Ошибка при редактировании упражнения: {e}")
@@ -781,48 +836,50 @@ async def add_new_exercise(message: Message, state: FSMContext):
 
 
 @router.message(EditWorkoutStates.waiting_for_new_value)
-async def save_edited_field(message: Message, state: FSMContext):
+async def save_edited_field(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Сохранение измененного поля"""
     data = await state.get_data()
     workout_id = data['workout_id']
     field = data['edit_field']
 
     try:
-        async for session in get_db_session():
-            workout = await session.get(Workout, workout_id)
-
-            if field == "type":
-                if message.text not in WORKOUT_TYPES:
-                    await message.answer("Пожалуйста, выберите тип из списка.")
-                    return
-                setattr(workout, field, WORKOUT_TYPES[message.text])
-
-            elif field == "date":
-                try:
-                    new_date = datetime.strptime(message.text, "%d.%m.%Y %H:%M")
-                    setattr(workout, field, new_date)
-                except ValueError:
-                    await message.answer("Неверный формат даты. Используйте ДД.ММ.ГГГГ ЧЧ:ММ")
-                    return
-
-            elif field in ["duration", "distance", "calories"]:
-                try:
-                    value = float(message.text)
-                    if value <= 0:
-                        raise ValueError
-                    setattr(workout, field, value)
-                except ValueError:
-                    await message.answer("Введите положительное число.")
-                    return
-
-            elif field == "notes":
-                setattr(workout, field, message.text if message.text.lower() != "нет" else None)
-
-            await session.commit()
-            await message.answer("✅ Изменения сохранены!")
+        workout = await session.get(Workout, workout_id)
+        before = workout_values(workout)
 
-            await state.set_state(None)
-            await show_workouts(message, state)
+        if field == "type":
+            if message.text not in WORKOUT_TYPES:
+                await message.answer("Пожалуйста, выберите тип из списка.")
+                return
+            setattr(workout, field, WORKOUT_TYPES[message.text])
+
+        elif field == "date":
+            try:
+                new_date = datetime.strptime(message.text, "%d.%m.%Y %H:%M")
+                setattr(workout, field, new_date)
+            except ValueError:
+                await message.answer("Неверный формат даты. Используйте ДД.ММ.ГГГГ ЧЧ:ММ")
+                return
+
+        elif field in ["duration", "distance", "calories"]:
+            try:
+                value = float(message.text)
+                if value <= 0:
+                    raise ValueError
+                setattr(workout, field, value)
+            except ValueError:
+                await message.answer("Введите положительное число.")
+                return
+
+        elif field == "notes":
+            setattr(workout, field, message.text if message.text.lower() != "нет" else None)
+
+        await move_workout(session, before, workout)
+        await session.commit()
+        invalidate_user_stats(workout.user_id)
+        await message.answer("✅ Изменения сохранены!")
+
+        await state.set_state(None)
+        await show_workouts(message, state, current_user, session)
 
     except Exception as e:
         logging.error(f"Ошибка при редактировании тренировки: {e}")
@@ -833,34 +890,23 @@ async def save_edited_field(message: Message, state: FSMContext):
 async def select_workout_to_delete(message: Message, state: FSMContext):
     """Выбор тренировки для удаления"""
     data = await state.get_data()
-    current_page = data['current_page']
-    user_id = data['user_id']
+    workout_ids = data.get('page_workouts', [])
 
-    async for session in get_db_session():
-        workouts = await session.execute(
-            select(Workout)
-            .where(Workout.user_id == user_id)
-            .order_by(desc(Workout.date))
-            .offset((current_page - 1) * 5)
-            .limit(5)
-        )
-        workouts = workouts.scalars().all()
+    builder = ReplyKeyboardBuilder()
+    for i in range(1, len(workout_ids) + 1):
+        builder.add(KeyboardButton(text=f"🗑️ {i}"))
+    builder.row(KeyboardButton(text="❌ Отмена"))
 
-        builder = ReplyKeyboardBuilder()
-        for i, workout in enumerate(workouts, 1):
-            builder.add(KeyboardButton(text=f"🗑️ {i}"))
-        builder.row(KeyboardButton(text="❌ Отмена"))
-
-        await message.answer(
-            "Выберите номер тренировки для удаления:",
-            reply_markup=builder.as_markup(resize_keyboard=True)
-        )
-        await state.set_state(DeleteWorkoutStates.waiting_for_workout_to_delete)
-        await state.update_data(workouts=[w.workout_id for w in workouts])
+    await message.answer(
+        "Выберите номер тренировки для удаления:",
+        reply_markup=builder.as_markup(resize_keyboard=True)
+    )
+    await state.set_state(DeleteWorkoutStates.waiting_for_workout_to_delete)
+    await state.update_data(workouts=workout_ids)
 
 
 @router.message(DeleteWorkoutStates.waiting_for_workout_to_delete, F.text.regexp(r'^🗑️\s*\d+$'))
-async def confirm_delete_workout(message: Message, state: FSMContext):
+async def confirm_delete_workout(message: Message, state: FSMContext, session: AsyncSession):
     """Подтверждение удаления тренировки"""
     try:
         workout_index = int(message.text.split('🗑️')[1].strip()) - 1
@@ -872,39 +918,38 @@ async def confirm_delete_workout(message: Message, state: FSMContext):
 
         workout_id = data['workouts'][workout_index]
 
-        async for session in get_db_session():
-            workout = await session.get(Workout, workout_id)
-            if not workout:
-                await message.answer("Тренировка не найдена.")
-                return
+        workout = await session.get(Workout, workout_id)
+        if not workout:
+            await message.answer("Тренировка не найдена.")
+            return
 
-            response = (
-                f"Вы действительно хотите удалить эту тренировку?\n\n"
-                f"Тип: {workout.type}\n"
-                f"Дата: {workout.date.strftime('%d.%m.%Y %H:%M')}\n"
-                f"Длительность: {workout.duration} мин.\n"
-            )
+        response = (
+            f"Вы действительно хотите удалить эту тренировку?\n\n"
+            f"Тип: {workout.type}\n"
+            f"Дата: {workout.date.strftime('%d.%m.%Y %H:%M')}\n"
+            f"Длительность: {workout.duration} мин.\n"
+        )
 
-            if workout.type == "strength":
-                exercises = await session.execute(
-                    select(Exercise).where(Exercise.workout_id == workout.workout_id))
-                exercises = exercises.scalars().all()
+        if workout.type == "strength":
+            exercises = await session.execute(
+                select(Exercise).where(Exercise.workout_id == workout.workout_id))
+            exercises = exercises.scalars().all()
 
-                if exercises:
-                    response += "\nУпражнения:\n"
-                    for i, ex in enumerate(exercises, 1):
-                        response += f"{i}. {ex.name} ({ex.sets}x{ex.reps} по {ex.weight}кг)\n"
+            if exercises:
+                response += "\nУпражнения:\n"
+                for i, ex in enumerate(exercises, 1):
+                    response += f"{i}. {ex.name} ({ex.sets}x{ex.reps} по {ex.weight}кг)\n"
 
-            builder = ReplyKeyboardBuilder()
-            builder.row(KeyboardButton(text="✅ Да, удалить"))
-            builder.row(KeyboardButton(text="❌ Нет, отменить"))
+        builder = ReplyKeyboardBuilder()
+        builder.row(KeyboardButton(text="✅ Да, удалить"))
+        builder.row(KeyboardButton(text="❌ Нет, отменить"))
 
-            await state.update_data(workout_id=workout_id)
-            await message.answer(
-                response,
-                reply_markup=builder.as_markup(resize_keyboard=True)
-            )
-            await state.set_state(DeleteWorkoutStates.waiting_for_delete_confirmation)
+        await state.update_data(workout_id=workout_id)
+        await message.answer(
+            response,
+            reply_markup=builder.as_markup(resize_keyboard=True)
+        )
+        await state.set_state(DeleteWorkoutStates.waiting_for_delete_confirmation)
 
     except Exception as e:
         logging.error(f"Ошибка выбора тренировки для удаления: {e}")
@@ -912,31 +957,36 @@ async def confirm_delete_workout(message: Message, state: FSMContext):
 
 
 @router.message(DeleteWorkoutStates.waiting_for_delete_confirmation, F.text == "✅ Да, удалить")
-async def delete_workout_confirmed(message: Message, state: FSMContext):
+async def delete_workout_confirmed(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Удаление тренировки после подтверждения"""
     data = await state.get_data()
     workout_id = data['workout_id']
 
     try:
-        async for session in get_db_session():
-            # Сначала удаляем все упражнения (если это силовая тренировка)
-            await session.execute(
-                delete(Exercise).where(Exercise.workout_id == workout_id))
+        workout = await session.get(Workout, workout_id)
+        if workout:
+            await forget_workout(session, workout_values(workout))
 
-            # Затем удаляем саму тренировку
-            await session.execute(
-                delete(Workout).where(Workout.workout_id == workout_id))
+        # Сначала удаляем все упражнения (если это силовая тренировка)
+        await session.execute(
+            delete(Exercise).where(Exercise.workout_id == workout_id))
 
-            await session.commit()
+        # Затем удаляем саму тренировку
+        await session.execute(
+            delete(Workout).where(Workout.workout_id == workout_id))
 
-            await message.answer(
-                "✅ Тренировка успешно удалена!",
-                reply_markup=get_main_menu()
-            )
-            await state.clear()
+        await session.commit()
+        if workout:
+            invalidate_user_stats(workout.user_id)
+
+        await message.answer(
+            "✅ Тренировка успешно удалена!",
+            reply_markup=get_main_menu()
+        )
+        await state.clear()
 
-            # Показываем обновленный список тренировок
-            await show_workouts(message, state)
+        # Показываем обновленный список тренировок
+        await show_workouts(message, state, current_user, session)
 
     except Exception as e:
         logging.error(f"Ошибка при удалении тренировки: {e}")
@@ -945,7 +995,7 @@ async def delete_workout_confirmed(message: Message, state: FSMContext):
 
 @router.message(DeleteWorkoutStates.waiting_for_delete_confirmation, F.text == "❌ Нет, отменить")
 @router.message(DeleteWorkoutStates.waiting_for_workout_to_delete, F.text == "❌ Отмена")
-async def cancel_delete_workout(message: Message, state: FSMContext):
+async def cancel_delete_workout(message: Message, state: FSMContext, current_user: CachedUser | None, session: AsyncSession):
     """Отмена удаления тренировки"""
     await state.clear()
-    await show_workouts(message, state)
\ No newline at end of file
+    await show_workouts(message, state, current_user, session)
\ No newline at end of file
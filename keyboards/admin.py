@@ -30,11 +30,11 @@ def admin_panel_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def users_list_kb(users: list, page: int, total_pages: int) -> InlineKeyboardMarkup:
-    """Клавиатура со списком пользователей с пагинацией"""
+def users_list_kb(users_page, page: int, total_pages: int) -> InlineKeyboardMarkup:
+    """Клавиатура со списком пользователей с пагинацией (users_page — services.pagination.Page)"""
     builder = InlineKeyboardBuilder()
 
-    for user in users:
+    for user in users_page.items:
         builder.row(
             InlineKeyboardButton(
                 text=f"👤 {user.name} (ID: {user.telegram_id})",
@@ -44,13 +44,19 @@ def users_list_kb(users: list, page: int, total_pages: int) -> InlineKeyboardMar
 
     # Кнопки пагинации
     pagination_row = []
-    if page > 1:
-        pagination_row.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"users_page_{page - 1}"))
+    if users_page.has_prev:
+        pagination_row.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=f"users_prev_{page - 1}_{users_page.first}"
+        ))
 
     pagination_row.append(InlineKeyboardButton(text=f"{page}/{total_pages}", callback_data="current_page"))
 
-    if page < total_pages:
-        pagination_row.append(InlineKeyboardButton(text="Вперед ➡️", callback_data=f"users_page_{page + 1}"))
+    if users_page.has_next:
+        pagination_row.append(InlineKeyboardButton(
+            text="Вперед ➡️",
+            callback_data=f"users_next_{page + 1}_{users_page.last}"
+        ))
 
     builder.row(*pagination_row)
 
@@ -156,11 +162,21 @@ def export_format_kb() -> InlineKeyboardMarkup:
     builder.row(
         InlineKeyboardButton(
             text="CSV",
-            callback_data="export_csv"
+            callback_data="admin_export_csv"
         ),
         InlineKeyboardButton(
             text="JSON",
-            callback_data="export_json"
+            callback_data="admin_export_json"
+        )
+    )
+    builder.row(
+        InlineKeyboardButton(
+            text="NDJSON.gz",
+            callback_data="admin_export_ndjson"
+        ),
+        InlineKeyboardButton(
+            text="Parquet",
+            callback_data="admin_export_parquet"
         )
     )
     builder.row(
@@ -41,6 +41,7 @@ def get_settings_menu(notifications_enabled: bool = True) -> ReplyKeyboardMarkup
         KeyboardButton(text="🗑️ Удалить аккаунт")
     )
     builder.row(
+        KeyboardButton(text="🌍 Часовой пояс"),
         KeyboardButton(text="🔙 Главное меню")
     )
 
@@ -50,6 +51,27 @@ def get_settings_menu(notifications_enabled: bool = True) -> ReplyKeyboardMarkup
     )
 
 
+def get_timezones_kb() -> ReplyKeyboardMarkup:
+    """Клавиатура с часто используемыми часовыми поясами"""
+    builder = ReplyKeyboardBuilder()
+
+    builder.row(
+        KeyboardButton(text="Europe/Kaliningrad"),
+        KeyboardButton(text="Europe/Moscow")
+    )
+    builder.row(
+        KeyboardButton(text="Europe/Samara"),
+        KeyboardButton(text="Asia/Yekaterinburg")
+    )
+    builder.row(
+        KeyboardButton(text="Asia/Novosibirsk"),
+        KeyboardButton(text="Asia/Vladivostok")
+    )
+    builder.row(KeyboardButton(text="❌ Отмена"))
+
+    return builder.as_markup(resize_keyboard=True)
+
+
 def get_workout_types_kb() -> ReplyKeyboardMarkup:
     """Клавиатура с типами тренировок"""
     builder = ReplyKeyboardBuilder()
@@ -78,6 +100,7 @@ def get_workout_pagination_kb(has_prev: bool, has_next: bool) -> ReplyKeyboardMa
         builder.add(KeyboardButton(text="⬅️ Назад"))
     if has_next:
         builder.add(KeyboardButton(text="➡️ Вперед"))
+    builder.add(KeyboardButton(text="📅 К дате"))
 
     builder.row()
     builder.row(
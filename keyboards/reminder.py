@@ -23,6 +23,11 @@ def get_weekdays_kb() -> ReplyKeyboardMarkup:
     )
     builder.row(
         KeyboardButton(text="Воскресенье"),
+        KeyboardButton(text="Будни"),
+        KeyboardButton(text="Выходные")
+    )
+    builder.row(
+        KeyboardButton(text="Каждый день"),
         KeyboardButton(text="❌ Отмена")
     )
     return builder.as_markup(resize_keyboard=True)
@@ -36,6 +36,16 @@ def get_stats_period_kb() -> InlineKeyboardMarkup:
             callback_data="export_json"
         )
     )
+    builder.row(
+        InlineKeyboardButton(
+            text="🗜 Экспорт в NDJSON.gz",
+            callback_data="export_ndjson"
+        ),
+        InlineKeyboardButton(
+            text="📦 Экспорт в Parquet",
+            callback_data="export_parquet"
+        )
+    )
     builder.row(
         InlineKeyboardButton(
             text="📈 График прогресса",
@@ -0,0 +1,98 @@
+"""
+Нагрузочный тест приёма апдейтов: long polling против вебхука.
+Бот работает со своей БД из .env (лучше тестовой), вместо Telegram —
+локальная имитация Bot API (services.fake_telegram). Каждый апдейт — /start
+от одного из --users пользователей, на него бот отвечает одним sendMessage;
+замеряется время от первого апдейта до последнего ответа.
+
+    python loadtest.py --mode polling --updates 5000 --users 500
+    python loadtest.py --mode webhook --updates 5000 --users 500 --concurrency 40
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from config import Config
+from services.fake_telegram import FakeTelegram, make_update, post_updates
+
+
+async def run(args) -> float:
+    fake = FakeTelegram(latency=args.latency)
+    fake_runner = web.AppRunner(fake.app())
+    await fake_runner.setup()
+    await web.TCPSite(fake_runner, "127.0.0.1", args.fake_port).start()
+
+    Config.TELEGRAM_API_URL = f"http://127.0.0.1:{args.fake_port}"
+    Config.BOT_TOKEN = "42:LOADTEST"
+    Config.WEBHOOK_BASE_URL = f"http://127.0.0.1:{args.webhook_port}"
+
+    # app подключает все обработчики и сервисы — импортируем после настройки Config
+    import app
+    from services.webhook import run_webhook
+    bot = app.create_bot()
+    dp = app.create_dispatcher()
+
+    updates = [
+        make_update(update_id, 1_000_000 + update_id % args.users, "/start")
+        for update_id in range(1, args.updates + 1)
+    ]
+
+    if args.mode == "polling":
+        task = asyncio.create_task(dp.start_polling(
+            bot,
+            handle_signals=False,
+            allowed_updates=dp.resolve_used_update_types()
+        ))
+        await fake.wait_calls("getUpdates", 1)
+        start = time.perf_counter()
+        fake.push_updates(updates)
+        await fake.wait_calls("sendMessage", args.updates)
+        elapsed = time.perf_counter() - start
+        await dp.stop_polling()
+        await task
+    else:
+        task = asyncio.create_task(run_webhook(dp, bot, "127.0.0.1", args.webhook_port))
+        await fake.wait_calls("setWebhook", 1)
+        start = time.perf_counter()
+        statuses = await post_updates(
+            Config.WEBHOOK_BASE_URL + Config.WEBHOOK_PATH,
+            updates,
+            args.concurrency,
+            Config.WEBHOOK_SECRET
+        )
+        await fake.wait_calls("sendMessage", args.updates)
+        elapsed = time.perf_counter() - start
+        logging.info(f"Ответы вебхука: {dict(statuses)}")
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    await fake_runner.cleanup()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность приёма апдейтов")
+    parser.add_argument("--mode", choices=["polling", "webhook"], default="polling")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=Config.WEBHOOK_MAX_CONNECTIONS,
+                        help="одновременных запросов к вебхуку (как max_connections у Telegram)")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа Bot API, секунд")
+    parser.add_argument("--fake-port", type=int, default=8081)
+    parser.add_argument("--webhook-port", type=int, default=8082)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    elapsed = asyncio.run(run(args))
+    print(f"{args.mode}: {args.updates} апдейтов за {elapsed:.2f} с — {args.updates / elapsed:.0f} апдейтов/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.ban_list import ban_list
+
+
+class BanMiddleware(BaseMiddleware):
+    """Отбрасывает апдейты забаненных пользователей до обработчиков и запросов к БД"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is not None and from_user.id in ban_list:
+            ban_list.dropped += 1
+            return None
+        return await handler(event, data)
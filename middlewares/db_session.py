@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.profiler import UpdateDbStats, current_update, update_db_totals
+from database.session import AsyncSessionLocal
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на апдейт, передаётся обработчикам как session.
+    Соединение берётся из пула только при первом запросе, поэтому апдейты
+    без обращения к БД пул не занимают. Сохраняется только то, что
+    обработчик зафиксировал сам (session.commit()); незафиксированная
+    транзакция в конце апдейта откатывается — в том числе после ошибки,
+    которую обработчик перехватил и только залогировал.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        stats = UpdateDbStats()
+        token = current_update.set(stats)
+        try:
+            async with AsyncSessionLocal() as session:
+                data["session"] = session
+                try:
+                    return await handler(event, data)
+                finally:
+                    if session.in_transaction():
+                        await session.rollback()
+        finally:
+            current_update.reset(token)
+            update_db_totals.record(stats)
@@ -0,0 +1,61 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.fsm_storage import DbStorage, FsmStateLost
+
+
+class FsmBatchMiddleware(BaseMiddleware):
+    """Объединяет чтения и записи FSM одного апдейта (регистрировать до FSM-мидлвари aiogram)"""
+
+    def __init__(self, storage: DbStorage):
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.storage.batch():
+            return await handler(event, data)
+
+
+class FsmFlushMiddleware(BaseMiddleware):
+    """
+    Записывает изменения FSM в конце апдейта, пока FSM-мидлварь aiogram держит
+    блокировку ключа (регистрировать после неё). Если запись не удалась,
+    пользователь узнаёт, что ход диалога потерян.
+    """
+
+    def __init__(self, storage: DbStorage):
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        try:
+            return await handler(event, data)
+        finally:
+            try:
+                await self.storage.flush()
+            except FsmStateLost as e:
+                logging.error(f"Состояние диалога не сохранено: {e}")
+                await self._notify(data)
+
+    async def _notify(self, data: Dict[str, Any]):
+        chat = data.get("event_chat")
+        if chat is None:
+            return
+        try:
+            await data["bot"].send_message(
+                chat.id,
+                "⚠️ Не удалось сохранить ход диалога. Если бот переспросит — начните действие заново."
+            )
+        except Exception as e:
+            logging.error(f"Не удалось сообщить о потере состояния диалога: {e}")
@@ -0,0 +1,27 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.user_cache import user_cache
+
+
+class IdentityMiddleware(BaseMiddleware):
+    """Находит пользователя апдейта (через кэш) и передаёт его обработчикам как current_user"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        current_user = None
+        if from_user is not None:
+            current_user = user_cache.get(from_user.id)
+            if current_user is None:
+                # Сессия апдейта (DbSessionMiddleware): тот же запрос и то же соединение, что у обработчика
+                current_user = await user_cache.load(data["session"], from_user.id)
+
+        data["current_user"] = current_user
+        return await handler(event, data)
@@ -0,0 +1,35 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from database.profiler import current_handler
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """
+    Запоминает имя выполняемого обработчика для профилировщика SQL.
+    Внешней мидлварью апдейтов задаёт метку update:<тип>, под которой идут
+    запросы мидлварей (пользователь, FSM, сессия); внутренней — имя обработчика.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        if callback:
+            name = f"{callback.__module__}.{callback.__name__}"
+        elif isinstance(event, Update):
+            name = f"update:{event.event_type}"
+        else:
+            name = type(event).__name__
+
+        token = current_handler.set(name)
+        try:
+            return await handler(event, data)
+        finally:
+            current_handler.reset(token)
@@ -1,23 +1,98 @@
+"""
+Прогноз длительности и калорий тренировок линейным трендом.
+Прямая по методу наименьших квадратов считается в замкнутом виде на
+массивах NumPy сразу для обоих рядов (и сразу для многих пользователей),
+без scikit-learn. Пропуски (None) в значениях не участвуют в подгонке;
+если точек меньше двух или все тренировки в один день, прогноз — среднее.
+"""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import timedelta
 
-def predict_future_workouts(dates, durations, calories, steps=7):
+
+class Forecast(NamedTuple):
+    dates: list[datetime]
+    durations: np.ndarray
+    calories: np.ndarray
+
+
+def _day_offsets(dates: list[datetime]) -> tuple[datetime, np.ndarray]:
+    """Полные дни от самой ранней даты (как timedelta.days)"""
+    base_date = min(dates)
+    # Преобразование datetime → datetime64 в NumPy заметно медленнее, чем разность в Python
+    return base_date, np.fromiter(((d - base_date).days for d in dates), dtype=float, count=len(dates))
+
+
+def _least_squares(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Наклон и сдвиг прямой по последней оси: x и y формы (..., n), NaN в y — пропуск.
+    Возвращает массивы формы (...).
+    """
+    known = ~np.isnan(y)
+    x = np.where(known, x, 0.0)
+    y = np.where(known, y, 0.0)
+
+    n = known.sum(axis=-1)
+    sx = x.sum(axis=-1)
+    sy = y.sum(axis=-1)
+    sxx = (x * x).sum(axis=-1)
+    sxy = (x * y).sum(axis=-1)
+
+    denominator = n * sxx - sx * sx
+    slope = np.divide(n * sxy - sx * sy, denominator, out=np.zeros(denominator.shape), where=denominator > 0)
+    intercept = np.divide(sy - slope * sx, n, out=np.zeros(denominator.shape), where=n > 0)
+    return slope, intercept
+
+
+def predict_future_workouts(dates, durations, calories, steps=7) -> Forecast:
     """
     Простая регрессия по времени: предсказывает длительность и калории на будущее
     """
-    # Преобразуем даты в числовой формат (кол-во дней от начала)
-    base_date = min(dates)
-    x = np.array([(d - base_date).days for d in dates]).reshape(-1, 1)
+    base_date, x = _day_offsets(dates)
+    values = np.array([durations, calories], dtype=float)  # None → NaN
+
+    slope, intercept = _least_squares(x, values)
+
+    future_days = x.max() + np.arange(1, steps + 1)
+    future_dates = [base_date + timedelta(days=int(day)) for day in future_days]
+    predicted = slope[:, None] * future_days + intercept[:, None]
+    return Forecast(future_dates, predicted[0], predicted[1])
+
+
+def predict_many(histories: dict, steps=7) -> dict[int, Forecast]:
+    """
+    Прогноз для многих пользователей одним расчётом (например, ночной пересчёт).
+    histories: user_id → (dates, durations, calories).
+    """
+    user_ids = [user_id for user_id, (dates, _, _) in histories.items() if dates]
+    if not user_ids:
+        return {}
 
-    duration_model = LinearRegression().fit(x, durations)
-    calories_model = LinearRegression().fit(x, calories)
+    length = max(len(histories[user_id][0]) for user_id in user_ids)
+    x = np.zeros((len(user_ids), length))
+    values = np.full((len(user_ids), 2, length), np.nan)
+    bases = []
+    for row, user_id in enumerate(user_ids):
+        dates, durations, calories = histories[user_id]
+        base_date, offsets = _day_offsets(dates)
+        bases.append(base_date)
+        x[row, :len(dates)] = offsets
+        values[row, :, :len(dates)] = np.array([durations, calories], dtype=float)
 
-    # Генерация будущих дней
-    future_days = np.array([x[-1][0] + i for i in range(1, steps + 1)]).reshape(-1, 1)
-    future_dates = [base_date + timedelta(days=int(day[0])) for day in future_days]
+    # Дополнение до общей длины — NaN в значениях, такие точки не учитываются
+    slope, intercept = _least_squares(x[:, None, :], values)
 
-    future_durations = duration_model.predict(future_days)
-    future_calories = calories_model.predict(future_days)
+    # Смещения неотрицательны, поэтому нули дополнения не влияют на максимум
+    future_days = x.max(axis=1)[:, None] + np.arange(1, steps + 1)
+    predicted = slope[:, :, None] * future_days[:, None, :] + intercept[:, :, None]
 
-    return future_dates, future_durations, future_calories
\ No newline at end of file
+    return {
+        user_id: Forecast(
+            [bases[row] + timedelta(days=int(day)) for day in future_days[row]],
+            predicted[row, 0],
+            predicted[row, 1]
+        )
+        for row, user_id in enumerate(user_ids)
+    }
@@ -0,0 +1,39 @@
+"""
+Множество забаненных пользователей (telegram_id) в памяти.
+Загружается при старте и обновляется обработчиком бана, поэтому
+BanMiddleware отбрасывает апдейты забаненных без обращения к БД.
+"""
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import User
+
+
+class BanList:
+    def __init__(self):
+        self._banned: set[int] = set()
+        self.dropped = 0  # Отброшено апдейтов от забаненных
+
+    def __len__(self) -> int:
+        return len(self._banned)
+
+    def __contains__(self, telegram_id: int) -> bool:
+        return telegram_id in self._banned
+
+    async def load(self, session: AsyncSession):
+        result = await session.execute(select(User.telegram_id).where(User.is_banned == True))
+        self._banned = set(result.scalars().all())
+        logging.info(f"Загружено забаненных пользователей: {len(self._banned)}")
+
+    def set_banned(self, telegram_id: int, banned: bool):
+        """Вызывать после commit изменения users.is_banned"""
+        if banned:
+            self._banned.add(telegram_id)
+        else:
+            self._banned.discard(telegram_id)
+
+
+ban_list = BanList()
@@ -0,0 +1,62 @@
+"""
+Простой in-memory кэш с ограничением по времени жизни и размеру.
+Ключи — кортежи, первый элемент которых задаёт группу (обычно user_id),
+чтобы при записи можно было сбросить все значения пользователя разом.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._groups: dict[Hashable, set[tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: tuple, default=None):
+        item = self._items.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                self._discard(key)
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: tuple, value):
+        if key in self._items:
+            self._items.move_to_end(key)
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._groups.setdefault(key[0], set()).add(key)
+        while len(self._items) > self.maxsize:
+            self._discard(next(iter(self._items)))
+
+    def invalidate(self, key: tuple):
+        if key in self._items:
+            self._discard(key)
+
+    def invalidate_group(self, group: Hashable):
+        """Сбрасывает все ключи группы"""
+        for key in self._groups.pop(group, ()):
+            self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+        self._groups.clear()
+
+    def _discard(self, key: tuple):
+        del self._items[key]
+        keys = self._groups.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[key[0]]
@@ -0,0 +1,106 @@
+"""
+Кэш построенных графиков.
+Ключ — (владелец, версия данных, вид графика). Версия данных пользователя
+увеличивается после каждой записанной тренировки (через подписку на
+дневные суммы), поэтому, пока данные не менялись, повторный показ графика
+отправляет уже загруженное в Telegram фото по file_id: без запроса
+тренировок, прогноза, рендеринга и повторной загрузки PNG.
+Отрендеренные байты дополнительно хранятся в небольшом LRU — на случай,
+если Telegram не примет сохранённый file_id.
+"""
+
+import logging
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+
+from config import Config
+from services.cache import TTLCache
+from services.rollups import WorkoutValues, rollup_listeners
+
+# Владелец общих графиков админки (user_id начинаются с 1)
+ALL_USERS = 0
+
+
+class ChartCache:
+    def __init__(self, ttl: float, maxsize: int):
+        self._versions: dict[int, int] = {}
+        # ключ → (file_id, подпись)
+        self._file_ids = TTLCache(ttl)
+        # ключ → (PNG, подпись)
+        self._rendered = TTLCache(ttl, maxsize)
+
+    def key(self, owner: int, kind: str) -> tuple:
+        """Ключ графика для текущей версии данных; брать до чтения данных из БД"""
+        return owner, self._versions.get(owner, 0), kind
+
+    def apply(self, values: WorkoutValues, sign: int):
+        """Данные пользователя и общая картина изменились — старые графики больше не нужны"""
+        self._bump(values.user_id)
+        self._bump(ALL_USERS)
+
+    def forget_user(self, user_id: int):
+        """Удаление аккаунта: графики пользователя и общие графики устарели"""
+        self._versions.pop(user_id, None)
+        self._file_ids.invalidate_group(user_id)
+        self._rendered.invalidate_group(user_id)
+        self._bump(ALL_USERS)
+
+    def _bump(self, owner: int):
+        self._versions[owner] = self._versions.get(owner, 0) + 1
+        self._file_ids.invalidate_group(owner)
+        self._rendered.invalidate_group(owner)
+
+    def file_id(self, key: tuple) -> tuple[str, str] | None:
+        return self._file_ids.get(key)
+
+    def remember_file_id(self, key: tuple, file_id: str, caption: str):
+        self._file_ids.set(key, (file_id, caption))
+
+    def forget_file_id(self, key: tuple):
+        self._file_ids.invalidate(key)
+
+    def rendered(self, key: tuple) -> tuple[bytes, str] | None:
+        return self._rendered.get(key)
+
+    def remember_rendered(self, key: tuple, png: bytes, caption: str):
+        self._rendered.set(key, (png, caption))
+
+
+chart_cache = ChartCache(ttl=Config.CHART_CACHE_TTL, maxsize=Config.CHART_CACHE_SIZE)
+rollup_listeners.append(chart_cache.apply)
+
+
+async def send_chart(
+    send_photo: Callable[..., Awaitable[Message]],
+    key: tuple,
+    build: Callable[[], Awaitable[tuple[bytes, str] | None]],
+    filename: str
+) -> bool:
+    """
+    Отправляет график: по file_id, из сохранённых байтов или построив заново (build).
+    build возвращает (PNG, подпись) или None, если строить не из чего; тогда вернётся False.
+    """
+    cached = chart_cache.file_id(key)
+    if cached is not None:
+        file_id, caption = cached
+        try:
+            await send_photo(photo=file_id, caption=caption)
+            return True
+        except TelegramBadRequest as e:
+            logging.warning(f"Telegram не принял сохранённый file_id графика: {e}")
+            chart_cache.forget_file_id(key)
+
+    rendered = chart_cache.rendered(key)
+    if rendered is None:
+        rendered = await build()
+        if rendered is None:
+            return False
+        chart_cache.remember_rendered(key, *rendered)
+
+    png, caption = rendered
+    message = await send_photo(photo=BufferedInputFile(png, filename=filename), caption=caption)
+    if message.photo:
+        chart_cache.remember_file_id(key, message.photo[-1].file_id, caption)
+    return True
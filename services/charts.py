@@ -0,0 +1,194 @@
+"""
+Построение графиков в отдельных процессах.
+Рендеринг matplotlib занимает сотни миллисекунд процессорного времени и,
+выполненный в цикле событий, задерживает обработку апдейтов всех
+пользователей. Графики строятся в пуле процессов через объектный API
+(Figure + FigureCanvasAgg, без глобального состояния pyplot) и
+возвращаются как PNG-байты.
+Очередь ограничена: когда заняты все воркеры и места в очереди, новый
+график сразу отклоняется (ChartRendererBusy), а не копится в памяти.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import date, datetime
+
+
+class ChartRendererBusy(Exception):
+    """Все воркеры заняты и очередь графиков заполнена"""
+
+
+def _init_worker():
+    # Загружаем matplotlib один раз при старте процесса, а не на первом графике
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.figure  # noqa: F401
+    import matplotlib.backends.backend_agg  # noqa: F401
+
+
+def _to_png(figure, dpi: int | None = None) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(figure)
+    buf = io.BytesIO()
+    figure.savefig(buf, format="png", dpi=dpi)
+    return buf.getvalue()
+
+
+def render_progress_chart(
+    dates: list[datetime],
+    calories: list[float],
+    durations: list[float],
+    future_dates: list[datetime],
+    predicted_calories: list[float],
+    predicted_durations: list[float]
+) -> bytes:
+    """График калорий и длительности тренировок с прогнозом"""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 6))
+    calories_ax, durations_ax = figure.subplots(2, 1)
+
+    calories_ax.plot(dates, calories, 'r-', label='Факт')
+    calories_ax.plot(future_dates, predicted_calories, 'g--', label='Прогноз')
+    calories_ax.set_ylabel('Калории')
+    calories_ax.set_title('📈 Прогресс тренировок')
+    calories_ax.legend()
+    calories_ax.grid(True)
+
+    durations_ax.plot(dates, durations, 'b-', label='Факт')
+    durations_ax.plot(future_dates, predicted_durations, 'g--', label='Прогноз')
+    durations_ax.set_ylabel('Длительность (мин)')
+    durations_ax.set_xlabel('Дата')
+    durations_ax.legend()
+    durations_ax.grid(True)
+
+    figure.tight_layout()
+    return _to_png(figure)
+
+
+def render_daily_counts_chart(days: list[date], counts: list[int]) -> bytes:
+    """График количества тренировок по дням (админка)"""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 5))
+    ax = figure.subplots()
+    ax.plot(days, counts, marker='o', linestyle='-')
+    ax.set_title('Количество тренировок по дням')
+    ax.set_xlabel('Дата')
+    ax.set_ylabel('Количество тренировок')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(True)
+    figure.tight_layout()
+    return _to_png(figure, dpi=80)
+
+
+@dataclass
+class RenderMetrics:
+    rendered: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    failed: int = 0
+
+    def snapshot(self) -> dict:
+        return {
+            'rendered': self.rendered,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'failed': self.failed
+        }
+
+
+class ChartRenderer:
+    """Пул процессов для графиков с ограниченной очередью и таймаутом"""
+
+    def __init__(self):
+        self.metrics = RenderMetrics()
+        self._executor: ProcessPoolExecutor | None = None
+        self._workers = 0
+        self._limit = 0
+        self._timeout = 0.0
+        self._pending = 0
+
+    def start(self, workers: int, queue_size: int, timeout: float):
+        self._workers = workers
+        self._limit = workers + queue_size
+        self._timeout = timeout
+        self._executor = self._create_executor()
+        logging.info(f"Графики: {workers} процессов, очередь до {queue_size}, таймаут {timeout} с")
+
+    async def stop(self):
+        executor, self._executor = self._executor, None
+        if executor:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    @property
+    def pending(self) -> int:
+        """Графики в работе и в очереди"""
+        return self._pending
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: дочерний процесс не наследует цикл событий, соединения с БД и потоки бота
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+
+    def _release(self, _future):
+        self._pending -= 1
+
+    async def render(self, function, *args) -> bytes:
+        """
+        Строит график функцией function(*args) в пуле процессов.
+        ChartRendererBusy — очередь заполнена, asyncio.TimeoutError — не уложились в таймаут.
+        """
+        if self._executor is None:
+            raise RuntimeError("Пул графиков не запущен")
+        if self._pending >= self._limit:
+            self.metrics.rejected += 1
+            raise ChartRendererBusy()
+
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            future = executor.submit(function, *args)
+        except BrokenProcessPool:
+            executor = self._restart(executor)
+            future = executor.submit(function, *args)
+
+        # Место в очереди освобождается, когда процесс действительно закончил работу,
+        # а не когда обработчик перестал ждать
+        self._pending += 1
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self._timeout)
+        except asyncio.TimeoutError:
+            # Из очереди задача снимется, уже запущенную прервать нельзя — она доработает впустую
+            future.cancel()
+            self.metrics.timed_out += 1
+            raise
+        except BrokenProcessPool:
+            self.metrics.failed += 1
+            self._restart(executor)
+            raise
+
+        self.metrics.rendered += 1
+        return result
+
+    def _restart(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Процесс пула упал (например, по памяти) — сломанный пул больше не принимает задачи"""
+        if self._executor is broken:
+            logging.error("Пул графиков сломан, перезапускаем")
+            self._executor = self._create_executor()
+            broken.shutdown(wait=False, cancel_futures=True)
+        return self._executor
+
+
+chart_renderer = ChartRenderer()
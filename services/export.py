@@ -0,0 +1,355 @@
+"""
+Потоковый экспорт тренировок.
+Строки читаются из БД серверным курсором (session.stream + yield_per) и
+сразу кодируются в файл SpooledTemporaryFile: пока файл небольшой, он
+в памяти, дальше — на диске. Когда часть приближается к лимиту размера
+документа Telegram, она закрывается, а экспорт продолжается в новую часть.
+Каждая часть — самостоятельный файл (со своим заголовком CSV, скобками
+JSON-массива, gzip-потоком или метаданными Parquet).
+Части отправляются только после того, как курсор дочитан: пока идёт
+загрузка в Telegram, серверный курсор MySQL не должен простаивать
+(net_write_timeout).
+"""
+
+import csv
+import io
+import json
+import textwrap
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, NamedTuple
+
+from aiogram import Bot
+from aiogram.types import InputFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from database.models import Exercise, User, Workout
+
+EXPORT_COLUMNS = ["ID", "User", "Date", "Type", "Duration", "Distance", "Calories", "Notes"]
+
+
+class WorkoutRecord(NamedTuple):
+    workout_id: int
+    name: str | None
+    date: datetime
+    type: str
+    duration: float | None
+    distance: float | None
+    calories: float | None
+    notes: str | None
+    exercises: list[dict]
+
+
+def _exercise(name, sets, reps, weight) -> dict:
+    return {"name": name, "sets": sets, "reps": reps, "weight": weight}
+
+
+def _record_bytes(record: WorkoutRecord) -> int:
+    """Несжатый размер записи в Arrow: числа по 8 байт, строки в UTF-8"""
+    size = 40
+    for text in (record.name, record.type, record.notes):
+        if text:
+            size += len(text.encode('utf-8'))
+    for exercise in record.exercises:
+        size += 16 + len(exercise["name"].encode('utf-8'))
+    return size
+
+
+class CsvFormat:
+    extension = "csv"
+    caption = "CSV"
+    nested = False  # Упражнения в этот формат не выгружаются
+    reserve = 256 * 1024  # Запас до лимита части: не меньше самой длинной строки
+    buffered = 0  # Байт принято форматом, но ещё не записано в файл части
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, delimiter=';')
+
+    def _encode(self, values: list) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue().encode('utf-8')
+
+    def open(self, file):
+        # BOM в начале каждой части, чтобы Excel открывал её в UTF-8
+        file.write("\ufeff".encode('utf-8') + self._encode(EXPORT_COLUMNS))
+
+    def write(self, file, record: WorkoutRecord):
+        file.write(self._encode([
+            record.workout_id,
+            record.name,
+            record.date.strftime('%Y-%m-%d %H:%M'),
+            record.type,
+            record.duration,
+            record.distance,
+            record.calories,
+            record.notes or ""
+        ]))
+
+    def close(self, file):
+        pass
+
+
+class JsonFormat:
+    extension = "json"
+    caption = "JSON"
+    nested = False
+    reserve = 256 * 1024
+    buffered = 0
+
+    def __init__(self):
+        self._first = True
+
+    def open(self, file):
+        self._first = True
+        file.write(b"[\n")
+
+    def write(self, file, record: WorkoutRecord):
+        item = json.dumps({
+            "id": record.workout_id,
+            "user": record.name,
+            "date": record.date.strftime('%Y-%m-%d %H:%M'),
+            "type": record.type,
+            "duration": record.duration,
+            "distance": record.distance,
+            "calories": record.calories,
+            "notes": record.notes
+        }, indent=2, ensure_ascii=False)
+        file.write((b"" if self._first else b",\n") + textwrap.indent(item, "  ").encode('utf-8'))
+        self._first = False
+
+    def close(self, file):
+        file.write(b"\n]\n")
+
+
+class NdjsonGzipFormat:
+    """Одна тренировка с вложенными упражнениями на строку, сжатие gzip"""
+    extension = "ndjson.gz"
+    caption = "NDJSON (gzip)"
+    nested = True
+    # zlib держит несжатые данные в буфере, размер части растёт скачками
+    reserve = 1024 * 1024
+    buffered = 0
+
+    def __init__(self):
+        self._compressor = None
+
+    def open(self, file):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def write(self, file, record: WorkoutRecord):
+        line = json.dumps({
+            "id": record.workout_id,
+            "user": record.name,
+            "date": record.date.isoformat(),
+            "type": record.type,
+            "duration": record.duration,
+            "distance": record.distance,
+            "calories": record.calories,
+            "notes": record.notes,
+            "exercises": record.exercises
+        }, ensure_ascii=False, separators=(",", ":"))
+        file.write(self._compressor.compress(line.encode('utf-8') + b"\n"))
+
+    def close(self, file):
+        file.write(self._compressor.flush())
+        self._compressor = None
+
+
+class ParquetFormat:
+    """Колоночный файл Parquet, упражнения — вложенный список структур"""
+    extension = "parquet"
+    caption = "Parquet"
+    nested = True
+    # Метаданные row group'ов в конце файла; накопленная пачка учитывается в buffered
+    reserve = 8 * 1024 * 1024
+
+    def __init__(self, batch_rows: int = Config.EXPORT_BATCH_ROWS, batch_bytes: int = 4 * 1024 * 1024):
+        # pyarrow — необязательная и тяжёлая зависимость, нужна только этому формату
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._pq = pq
+        self._batch_rows = batch_rows
+        self._batch_bytes = batch_bytes  # Длинные заметки: пачка пишется раньше batch_rows строк
+        self._schema = pa.schema([
+            ("id", pa.int64()),
+            ("user", pa.string()),
+            ("date", pa.timestamp("s")),
+            ("type", pa.string()),
+            ("duration", pa.float64()),
+            ("distance", pa.float64()),
+            ("calories", pa.float64()),
+            ("notes", pa.string()),
+            ("exercises", pa.list_(pa.struct([
+                ("name", pa.string()),
+                ("sets", pa.int32()),
+                ("reps", pa.int32()),
+                ("weight", pa.int32())
+            ])))
+        ])
+        self._writer = None
+        self._rows: list[WorkoutRecord] = []
+        self.buffered = 0  # Несжатый размер накопленных строк — оценка сверху для файла
+
+    def open(self, file):
+        self._writer = self._pq.ParquetWriter(file, self._schema, compression="zstd")
+        self._rows = []
+        self.buffered = 0
+
+    def write(self, file, record: WorkoutRecord):
+        self._rows.append(record)
+        self.buffered += _record_bytes(record)
+        if len(self._rows) >= self._batch_rows or self.buffered >= self._batch_bytes:
+            self._flush()
+
+    def close(self, file):
+        self._flush()
+        self._writer.close()
+        self._writer = None
+
+    def _flush(self):
+        if not self._rows:
+            return
+        columns = list(zip(*self._rows))
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema
+        ))
+        self._rows = []
+        self.buffered = 0
+
+
+EXPORT_FORMATS = {
+    "csv": CsvFormat,
+    "json": JsonFormat,
+    "ndjson": NdjsonGzipFormat,
+    "parquet": ParquetFormat
+}
+
+
+class SpooledInputFile(InputFile):
+    """Отправка содержимого временного файла частями, без копирования в bytes"""
+
+    def __init__(self, file: SpooledTemporaryFile, filename: str, chunk_size: int = 64 * 1024):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot: Bot):
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+@dataclass
+class ExportPart:
+    file: SpooledTemporaryFile
+    number: int
+    rows: int
+    last: bool
+
+    def input_file(self, basename: str, extension: str) -> SpooledInputFile:
+        if self.number == 1 and self.last:
+            filename = f"{basename}.{extension}"
+        else:
+            filename = f"{basename}_part{self.number}.{extension}"
+        return SpooledInputFile(self.file, filename=filename)
+
+
+async def iter_records(session: AsyncSession, *conditions, nested: bool = False) -> AsyncIterator[WorkoutRecord]:
+    """
+    Тренировки с именами пользователей в порядке даты.
+    nested=True — вместе с упражнениями: LEFT JOIN в том же потоке, строки одной
+    тренировки идут подряд и собираются в одну запись (второй запрос на том же
+    соединении, пока открыт серверный курсор, невозможен).
+    """
+    columns = [
+        Workout.workout_id,
+        User.name,
+        Workout.date,
+        Workout.type,
+        Workout.duration,
+        Workout.distance,
+        Workout.calories,
+        Workout.notes
+    ]
+    statement = select(*columns).join(User, Workout.user_id == User.user_id).where(*conditions)
+    if nested:
+        statement = (
+            statement
+            .add_columns(Exercise.name, Exercise.sets, Exercise.reps, Exercise.weight)
+            .outerjoin(Exercise, Exercise.workout_id == Workout.workout_id)
+            .order_by(Workout.date, Workout.workout_id, Exercise.exercise_id)
+        )
+    else:
+        statement = statement.order_by(Workout.date, Workout.workout_id)
+
+    result = await session.stream(statement.execution_options(yield_per=Config.EXPORT_BATCH_ROWS))
+    try:
+        current = None
+        async for row in result:
+            if not nested:
+                yield WorkoutRecord(*row, exercises=[])
+                continue
+
+            if current is None or current.workout_id != row[0]:
+                if current is not None:
+                    yield current
+                current = WorkoutRecord(*row[:8], exercises=[])
+            if row[8] is not None:
+                current.exercises.append(_exercise(*row[8:]))
+        if current is not None:
+            yield current
+    finally:
+        await result.close()
+
+
+async def stream_export(
+    session: AsyncSession,
+    export_format,
+    *conditions,
+    part_size: int = Config.EXPORT_PART_BYTES
+) -> list[ExportPart]:
+    """
+    Выгружает тренировки (все или по условиям) во временные файлы-части.
+    Файлы частей закрывает вызывающий (part.file.close()).
+    """
+    parts: list[ExportPart] = []
+    part = None
+    rows = number = 0
+    try:
+        async for record in iter_records(session, *conditions, nested=export_format.nested):
+            if part is None:
+                part = SpooledTemporaryFile(max_size=Config.EXPORT_SPOOL_BYTES)
+                number += 1
+                rows = 0
+                export_format.open(part)
+
+            export_format.write(part, record)
+            rows += 1
+
+            # Часть закрывается с учётом строк, которые формат ещё держит в памяти
+            if part.tell() + export_format.buffered + export_format.reserve >= part_size:
+                export_format.close(part)
+                parts.append(ExportPart(part, number, rows, last=False))
+                part = None
+    except BaseException:
+        for finished in parts:
+            finished.file.close()
+        if part is not None:
+            part.close()
+        raise
+
+    if part is not None:
+        export_format.close(part)
+        parts.append(ExportPart(part, number, rows, last=True))
+    elif parts:
+        parts[-1].last = True
+    return parts
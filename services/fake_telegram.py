@@ -0,0 +1,129 @@
+"""
+Локальная имитация Bot API для нагрузочных тестов (TELEGRAM_API_URL).
+Отвечает на методы бота правдоподобными объектами и считает вызовы,
+отдаёт синтетические апдейты через getUpdates (режим polling) и умеет
+отправлять их POST-запросами на вебхук (режим webhook).
+"""
+
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+FAKE_BOT = {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+# Методы, возвращающие отправленное сообщение
+_MESSAGE_METHODS = {"sendmessage", "editmessagetext", "sendphoto", "senddocument", "copymessage"}
+
+
+def make_update(update_id: int, user_id: int, text: str) -> dict:
+    """Текстовое сообщение от пользователя в личном чате"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else []
+        }
+    }
+
+
+class FakeTelegram:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # Задержка ответа на каждый вызов, секунд
+        self.calls: Counter = Counter()
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._message_ids = itertools.count(1)
+        self._sent: dict[str, asyncio.Event] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        return app
+
+    def push_updates(self, updates: list[dict]):
+        """Апдейты для getUpdates"""
+        for update in updates:
+            self._updates.put_nowait(update)
+
+    async def wait_calls(self, method: str, count: int):
+        """Ждёт, пока бот не вызовет method count раз"""
+        method = method.lower()
+        while self.calls[method] < count:
+            event = self._sent.setdefault(method, asyncio.Event())
+            await event.wait()
+            event.clear()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = dict(await request.post())
+        # Вызов считается при получении: долгий getUpdates виден сразу
+        self.calls[method] += 1
+        if method in self._sent:
+            self._sent[method].set()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getupdates":
+            result = await self._get_updates(int(params.get("limit", 100)), float(params.get("timeout", 0)))
+        elif method == "getme":
+            result = FAKE_BOT
+        elif method in _MESSAGE_METHODS:
+            result = self._message(method, params)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, limit: int, timeout: float) -> list[dict]:
+        if self._updates.empty():
+            try:
+                first = await asyncio.wait_for(self._updates.get(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        else:
+            first = self._updates.get_nowait()
+        updates = [first]
+        while len(updates) < limit and not self._updates.empty():
+            updates.append(self._updates.get_nowait())
+        return updates
+
+    def _message(self, method: str, params: dict) -> dict:
+        chat_id = int(params.get("chat_id", 0))
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": FAKE_BOT
+        }
+        if method == "sendphoto":
+            file_id = f"photo{message['message_id']}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1000, "height": 600}]
+        elif method == "senddocument":
+            file_id = f"document{message['message_id']}"
+            message["document"] = {"file_id": file_id, "file_unique_id": file_id}
+        else:
+            message["text"] = params.get("text", "")
+        return message
+
+
+async def post_updates(url: str, updates: list[dict], concurrency: int, secret: str | None = None) -> Counter:
+    """Отправляет апдейты на вебхук, как Telegram: не больше concurrency запросов одновременно"""
+    statuses: Counter = Counter()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    queue = iter(updates)
+
+    async def worker(session: aiohttp.ClientSession):
+        for update in queue:
+            async with session.post(url, json=update, headers=headers) as response:
+                statuses[response.status] += 1
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    return statuses
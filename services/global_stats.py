@@ -0,0 +1,152 @@
+"""
+Общая статистика для админ-панели.
+Суммы по всем тренировкам ведутся в памяти и обновляются после commit
+записей тренировок, топы берутся из рейтинга (services.ranking), так что
+экран «Общие цифры» не агрегирует таблицы. Раз в заданный интервал
+значения сверяются с БД и при расхождении заменяются.
+"""
+
+import asyncio
+import logging
+import math
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import User, Workout
+from database.session import get_db_session
+from services.ranking import UserTotals, leaderboard
+from services.rollups import WorkoutValues, rollup_listeners
+
+
+class GlobalStats:
+    def __init__(self):
+        self.workouts_count = 0
+        self.total_duration = 0.0
+        self.total_calories = 0.0
+        self._names: dict[int, str] = {}  # Имена пользователей из топов
+        self._touched: set[int] | None = None  # Пользователи, изменившиеся во время сверки
+        self._task: asyncio.Task | None = None
+
+    def load(self):
+        """Считает суммы по итогам пользователей из рейтинга (вызывать после leaderboard.load)"""
+        self.workouts_count = 0
+        self.total_duration = self.total_calories = 0.0
+        for user_id in leaderboard.user_ids():
+            self._add_totals(leaderboard.totals(user_id), 1)
+
+    def _add_totals(self, totals: UserTotals, sign: int):
+        self.workouts_count += sign * totals.workouts
+        self.total_duration = round(self.total_duration + sign * totals.duration, 6)
+        self.total_calories = round(self.total_calories + sign * totals.calories, 6)
+
+    def apply(self, values: WorkoutValues, sign: int):
+        if self._touched is not None:
+            self._touched.add(values.user_id)
+        self.workouts_count += sign
+        self.total_duration = round(self.total_duration + sign * values.duration, 6)
+        self.total_calories = round(self.total_calories + sign * values.calories, 6)
+
+    def snapshot(self) -> dict:
+        return {
+            'users_count': leaderboard.users_count,
+            'workouts_count': self.workouts_count,
+            'total_duration': self.total_duration,
+            'total_calories': self.total_calories
+        }
+
+    def forget_name(self, user_id: int):
+        """Сбрасывает закэшированное имя (при смене имени)"""
+        self._names.pop(user_id, None)
+
+    def forget_user(self, user_id: int):
+        """Удаление аккаунта: вычитает итоги пользователя (вызывать до leaderboard.remove_user)"""
+        self._add_totals(leaderboard.totals(user_id), -1)
+        self._names.pop(user_id, None)
+
+    async def top(self, session: AsyncSession, metric: str, limit: int = 5) -> list[tuple[str, float]]:
+        """Топ пользователей по метрике: [(имя, значение)]"""
+        top = leaderboard.top(metric, limit)
+        missing = [user_id for user_id, _ in top if user_id not in self._names]
+        if missing:
+            result = await session.execute(select(User.user_id, User.name).where(User.user_id.in_(missing)))
+            self._names.update(result.tuples().all())
+        return [(self._names.get(user_id), value) for user_id, value in top]
+
+    async def reconcile(self, session: AsyncSession):
+        """
+        Сверяет итоги пользователей с таблицей тренировок и исправляет расхождения.
+        Пользователи, записавшие тренировку во время сверки, пропускаются:
+        их итоги в памяти новее прочитанных из БД.
+        """
+        self._touched = set()
+        users_before = leaderboard.users_count
+        try:
+            users_count = (await session.execute(select(func.count(User.user_id)))).scalar()
+            result = await session.execute(
+                select(
+                    Workout.user_id,
+                    func.count(Workout.workout_id),
+                    func.coalesce(func.sum(Workout.duration), 0),
+                    func.coalesce(func.sum(Workout.calories), 0)
+                ).group_by(Workout.user_id)
+            )
+            per_user = {
+                user_id: UserTotals(workouts, round(duration, 6), round(calories, 6))
+                for user_id, workouts, duration, calories in result
+            }
+
+            drifted = 0
+            for user_id in (per_user.keys() | leaderboard.user_ids()) - self._touched:
+                actual = per_user.get(user_id, UserTotals())
+                current = leaderboard.totals(user_id)
+                if current != actual:
+                    drifted += 1
+                    self._add_totals(current, -1)
+                    self._add_totals(actual, 1)
+                    leaderboard.set_totals(user_id, actual)
+
+            # Суммы пересобираются из итогов пользователей: так исправляется и расхождение,
+            # оставшееся от пользователей, которых больше нет ни в БД, ни в рейтинге
+            count_before, duration_before, calories_before = self.workouts_count, self.total_duration, self.total_calories
+            self.load()
+            if not drifted and (
+                self.workouts_count != count_before
+                or not math.isclose(self.total_duration, duration_before, abs_tol=1e-3)
+                or not math.isclose(self.total_calories, calories_before, abs_tol=1e-3)
+            ):
+                logging.warning("Общие суммы тренировок расходились с итогами пользователей, исправлено")
+
+            if leaderboard.users_count == users_before and users_count != users_before:
+                logging.warning(f"Число пользователей расходилось с БД: {users_before} → {users_count}")
+                leaderboard.users_count = users_count
+            if drifted:
+                logging.warning(f"Итоги тренировок расходились с БД у {drifted} пользователей, исправлено")
+        finally:
+            self._touched = None
+        self._names.clear()
+
+    def start(self, interval: float):
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async for session in get_db_session():
+                    await self.reconcile(session)
+            except Exception as e:
+                logging.error(f"Ошибка сверки общей статистики: {e}", exc_info=True)
+
+
+global_stats = GlobalStats()
+rollup_listeners.append(global_stats.apply)
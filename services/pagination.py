@@ -0,0 +1,87 @@
+"""
+Keyset-пагинация (seek) по паре (дата, id) в порядке «новые сверху».
+Вместо OFFSET страница продолжается от курсора — значения ключа крайней
+записи предыдущей страницы, поэтому любая страница стоит как первая.
+Курсор — короткая строка, которую можно хранить в FSM или callback_data.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """(дата, id) → «микросекунды.id» в шестнадцатеричном виде"""
+    return f"{(moment - _EPOCH) // _MICROSECOND:x}.{row_id:x}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    microseconds, row_id = cursor.split(".")
+    return _EPOCH + int(microseconds, 16) * _MICROSECOND, int(row_id, 16)
+
+
+@dataclass
+class Page:
+    items: list
+    has_prev: bool  # Есть более новые записи
+    has_next: bool  # Есть более старые записи
+    first: str | None  # Курсор первой записи страницы
+    last: str | None  # Курсор последней записи страницы
+
+
+async def fetch_page(
+    session: AsyncSession,
+    statement: Select,
+    date_column,
+    id_column,
+    key: Callable[[Any], tuple[datetime, int]],
+    limit: int,
+    after: str | None = None,
+    before: str | None = None
+) -> Page:
+    """
+    Страница записей statement, упорядоченных по (date_column, id_column) убыванию.
+    after — записи старше курсора (следующая страница),
+    before — записи новее курсора (предыдущая страница), без курсоров — первая страница.
+    """
+    if before is not None:
+        moment, row_id = decode_cursor(before)
+        result = await session.execute(
+            statement
+            .where(or_(date_column > moment, and_(date_column == moment, id_column > row_id)))
+            .order_by(date_column.asc(), id_column.asc())
+            .limit(limit + 1)
+        )
+        items = result.scalars().all()
+        if len(items) < limit:
+            # Дошли до начала: показываем полную первую страницу
+            return await fetch_page(session, statement, date_column, id_column, key, limit)
+        return _page(list(reversed(items[:limit])), key, has_prev=len(items) > limit, has_next=True)
+
+    if after is not None:
+        moment, row_id = decode_cursor(after)
+        statement = statement.where(or_(date_column < moment, and_(date_column == moment, id_column < row_id)))
+
+    result = await session.execute(
+        statement
+        .order_by(date_column.desc(), id_column.desc())
+        .limit(limit + 1)
+    )
+    items = result.scalars().all()
+    return _page(items[:limit], key, has_prev=after is not None, has_next=len(items) > limit)
+
+
+def _page(items: list, key: Callable[[Any], tuple[datetime, int]], has_prev: bool, has_next: bool) -> Page:
+    return Page(
+        items=items,
+        has_prev=has_prev,
+        has_next=has_next,
+        first=encode_cursor(*key(items[0])) if items else None,
+        last=encode_cursor(*key(items[-1])) if items else None
+    )
@@ -0,0 +1,125 @@
+"""
+Рейтинг пользователей по суммарной длительности, калориям и числу тренировок.
+Итоги каждого пользователя хранятся в памяти, для каждой метрики —
+отсортированный список (значение, user_id). Место пользователя — число
+значений больше его собственного, находится бинарным поиском, поэтому
+просмотр профиля не агрегирует таблицу тренировок.
+Итоги загружаются из дневных сумм при старте и обновляются после commit
+транзакций, изменивших дневные суммы.
+"""
+
+import logging
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import User, WorkoutDailyRollup
+from services.rollups import WorkoutValues, rollup_listeners
+
+METRICS = ("duration", "calories", "workouts")
+
+
+@dataclass
+class UserTotals:
+    workouts: int = 0
+    duration: float = 0.0
+    calories: float = 0.0
+
+    def value(self, metric: str) -> float:
+        return getattr(self, metric)
+
+
+class Leaderboard:
+    def __init__(self):
+        self._totals: dict[int, UserTotals] = {}
+        self._sorted: dict[str, list[tuple[float, int]]] = {metric: [] for metric in METRICS}
+        self.users_count = 0  # Все зарегистрированные, в том числе без тренировок
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def clear(self):
+        self._totals.clear()
+        for entries in self._sorted.values():
+            entries.clear()
+        self.users_count = 0
+
+    def user_ids(self) -> set[int]:
+        """Пользователи, у которых есть тренировки"""
+        return set(self._totals)
+
+    def totals(self, user_id: int) -> UserTotals:
+        return self._totals.get(user_id) or UserTotals()
+
+    def rank(self, user_id: int, metric: str) -> int:
+        """Место пользователя: 1 + число пользователей со строго большим значением"""
+        entries = self._sorted[metric]
+        value = self.totals(user_id).value(metric)
+        return len(entries) - bisect_right(entries, (value, float("inf"))) + 1
+
+    def top(self, metric: str, limit: int = 5) -> list[tuple[int, float]]:
+        """Лучшие пользователи по метрике: [(user_id, значение)]"""
+        return [(user_id, value) for value, user_id in reversed(self._sorted[metric][-limit:])]
+
+    def set_totals(self, user_id: int, totals: UserTotals):
+        """Заменяет итоги пользователя (при загрузке и сверке с БД)"""
+        self._unlink(user_id)
+        if totals.workouts > 0:
+            self._totals[user_id] = totals
+            for metric in METRICS:
+                insort(self._sorted[metric], (totals.value(metric), user_id))
+
+    def apply(self, values: WorkoutValues, sign: int):
+        """Добавляет (sign=1) или убирает (sign=-1) тренировку из итогов пользователя"""
+        current = self.totals(values.user_id)
+        self.set_totals(values.user_id, UserTotals(
+            workouts=current.workouts + sign,
+            # Округление не даёт накопиться ошибке float при сложениях и вычитаниях
+            duration=round(current.duration + sign * values.duration, 6),
+            calories=round(current.calories + sign * values.calories, 6)
+        ))
+
+    def add_user(self):
+        """Учитывает нового зарегистрированного пользователя"""
+        self.users_count += 1
+
+    def remove_user(self, user_id: int):
+        self._unlink(user_id)
+        self.users_count = max(self.users_count - 1, 0)
+
+    def _unlink(self, user_id: int):
+        totals = self._totals.pop(user_id, None)
+        if totals is None:
+            return
+        for metric in METRICS:
+            entries = self._sorted[metric]
+            del entries[bisect_left(entries, (totals.value(metric), user_id))]
+
+    async def load(self, session: AsyncSession):
+        """Загружает итоги всех пользователей из дневных сумм"""
+        self.clear()
+        result = await session.execute(
+            select(
+                WorkoutDailyRollup.user_id,
+                func.sum(WorkoutDailyRollup.workouts_count),
+                func.sum(WorkoutDailyRollup.total_duration),
+                func.sum(WorkoutDailyRollup.total_calories)
+            ).group_by(WorkoutDailyRollup.user_id)
+        )
+        totals = {
+            user_id: UserTotals(int(workouts), round(duration, 6), round(calories, 6))
+            for user_id, workouts, duration, calories in result
+            if workouts > 0
+        }
+        self._totals = totals
+        for metric in METRICS:
+            self._sorted[metric] = sorted((value.value(metric), user_id) for user_id, value in totals.items())
+
+        self.users_count = (await session.execute(select(func.count(User.user_id)))).scalar()
+        logging.info(f"Рейтинг загружен: {len(self)} пользователей с тренировками из {self.users_count}")
+
+
+leaderboard = Leaderboard()
+rollup_listeners.append(leaderboard.apply)
@@ -0,0 +1,216 @@
+"""
+Рассылка напоминаний.
+Пул воркеров отправляет сообщения параллельно, соблюдая лимиты Telegram:
+общий (~30 сообщений в секунду) и на один чат. TelegramRetryAfter —
+общий флуд-контроль бота: все воркеры ждут retry_after, а сообщение
+откладывается и отправляется повторно, а не теряется.
+Очередь живёт в памяти, поэтому диспетчер считает неотправленные
+сообщения по минутам: планировщик не сохраняет минуту как обработанную,
+пока её сообщения в очереди или ждут повтора (см. oldest_unsent).
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+MAX_ATTEMPTS = 5
+
+
+class TokenBucket:
+    """Ограничитель скорости: rate токенов в секунду, не более capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Не выдавать токены ближайшие seconds секунд"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class ReminderJob:
+    chat_id: int
+    text: str
+    due: datetime  # Время, на которое назначено напоминание (aware)
+    attempts: int = 0
+
+
+@dataclass
+class DispatchMetrics:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    total_lag: float = 0.0
+    _sent_at: deque = field(default_factory=lambda: deque(maxlen=10000))
+
+    def record_sent(self, lag: float):
+        self.sent += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+        self._sent_at.append(time.monotonic())
+
+    def throughput(self, window: float = 60.0) -> float:
+        """Сообщений в секунду за последние window секунд"""
+        border = time.monotonic() - window
+        recent = sum(1 for sent_at in self._sent_at if sent_at >= border)
+        return recent / window
+
+    def snapshot(self) -> dict:
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'throughput': self.throughput(),
+            'avg_lag': self.total_lag / self.sent if self.sent else 0.0,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag
+        }
+
+
+class ReminderDispatcher:
+    """Очередь напоминаний с ограниченным пулом воркеров"""
+
+    def __init__(self):
+        self.metrics = DispatchMetrics()
+        self._queue: asyncio.Queue[ReminderJob] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._bot: Bot | None = None
+        self._global_bucket: TokenBucket | None = None
+        self._chat_interval = 1.0
+        self._chat_slots: dict[int, float] = {}
+        self._unsent: Counter[datetime] = Counter()  # Минута → сообщений в очереди и ждущих повтора
+        self._retries: dict[int, asyncio.TimerHandle] = {}  # id(job) → отложенный возврат в очередь
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def start(self, bot: Bot, concurrency: int, global_rate: float, chat_rate: float):
+        self._bot = bot
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_interval = 1 / chat_rate
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(concurrency)]
+        logging.info(f"Рассылка напоминаний: {concurrency} воркеров, {global_rate} сообщений/с")
+
+    async def stop(self):
+        # Отложенные повторы остаются в _unsent: планировщик не сохранит их
+        # минуты как обработанные и разошлёт их после перезапуска
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, chat_id: int, text: str, due: datetime):
+        self._unsent[due] += 1
+        self._idle.clear()
+        self._queue.put_nowait(ReminderJob(chat_id=chat_id, text=text, due=due))
+
+    def oldest_unsent(self) -> datetime | None:
+        """Самая ранняя минута, сообщения которой ещё не отправлены (или не отброшены после ошибок)"""
+        return min(self._unsent) if self._unsent else None
+
+    async def drain(self, timeout: float):
+        """Ждёт отправки очереди и отложенных повторов, но не дольше timeout секунд"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Не отправлено напоминаний к остановке: {sum(self._unsent.values())}")
+
+    def _finish(self, job: ReminderJob):
+        self._unsent[job.due] -= 1
+        if not self._unsent[job.due]:
+            del self._unsent[job.due]
+            if not self._unsent:
+                self._idle.set()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                retrying = await self._send(job)
+            except Exception as e:
+                self.metrics.failed += 1
+                logging.error(f"Ошибка отправки напоминания: {str(e)}", exc_info=True)
+                retrying = False
+            finally:
+                self._queue.task_done()
+            # Прерванная остановкой отправка остаётся неотправленной
+            if not retrying:
+                self._finish(job)
+
+    async def _wait_chat_slot(self, chat_id: int):
+        """Не чаще одного сообщения в чат за _chat_interval секунд"""
+        now = time.monotonic()
+        if len(self._chat_slots) > 10000:
+            self._chat_slots = {chat: slot for chat, slot in self._chat_slots.items() if slot > now}
+
+        slot = max(now, self._chat_slots.get(chat_id, 0.0))
+        self._chat_slots[chat_id] = slot + self._chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _send(self, job: ReminderJob) -> bool:
+        """True — отправка отложена до повтора (сообщение вернётся в очередь)"""
+        await self._wait_chat_slot(job.chat_id)
+        await self._global_bucket.acquire()
+
+        try:
+            await self._bot.send_message(chat_id=job.chat_id, text=job.text)
+        except TelegramRetryAfter as e:
+            job.attempts += 1
+            if job.attempts >= MAX_ATTEMPTS:
+                self.metrics.failed += 1
+                logging.error(f"Напоминание для {job.chat_id} не отправлено после {job.attempts} попыток")
+                return False
+
+            # Лимит общий для бота: останавливаем всех воркеров и возвращаем
+            # сообщение в очередь, когда Telegram разрешит повтор
+            self.metrics.retried += 1
+            self._global_bucket.pause(e.retry_after)
+            self._retries[id(job)] = asyncio.get_running_loop().call_later(e.retry_after, self._requeue, job)
+            return True
+
+        lag = (datetime.now(timezone.utc) - job.due).total_seconds()
+        self.metrics.record_sent(lag)
+        logging.info(f"Напоминание отправлено пользователю {job.chat_id}")
+        return False
+
+    def _requeue(self, job: ReminderJob):
+        del self._retries[id(job)]
+        self._queue.put_nowait(job)
+
+
+reminder_dispatcher = ReminderDispatcher()
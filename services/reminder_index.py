@@ -0,0 +1,165 @@
+"""
+Индекс расписания напоминаний.
+Хранит идентификаторы напоминаний, сгруппированные по минуте недели в UTC,
+чтобы каждая проверка расписания не сканировала таблицу reminders.
+Смещения часовых поясов пользователей отслеживаются: при переходе на
+летнее/зимнее время UTC-расписание пересчитывается.
+"""
+
+import logging
+from bisect import bisect_left, insort
+from datetime import datetime, time, timedelta
+
+import pytz
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Reminder, User
+from services.weekdays import weekdays_in, rotate_days
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def minute_of_week(weekday: int, at: time) -> int:
+    """Переводит день недели и время в номер минуты недели (0 — понедельник 00:00)"""
+    return weekday * MINUTES_PER_DAY + at.hour * 60 + at.minute
+
+
+def utc_offset(timezone: str, moment: datetime | None = None) -> timedelta:
+    moment = moment or datetime.now(pytz.utc)
+    return moment.astimezone(pytz.timezone(timezone)).utcoffset()
+
+
+def utc_schedule(days_mask: int, at: time, timezone: str, moment: datetime | None = None) -> tuple[int, time]:
+    """Переводит локальные дни и время напоминания в UTC по текущему смещению пояса"""
+    offset = int(utc_offset(timezone, moment).total_seconds() // 60)
+    day_shift, minutes = divmod(at.hour * 60 + at.minute - offset, MINUTES_PER_DAY)
+    return rotate_days(days_mask, day_shift), time(minutes // 60, minutes % 60)
+
+
+class ReminderIndex:
+    """Минута недели (UTC) → множество reminder_id"""
+
+    def __init__(self):
+        self._buckets: dict[int, set[int]] = {}
+        self._minutes: list[int] = []  # Отсортированные непустые минуты
+        self._reminders: dict[int, tuple[list[int], int]] = {}  # reminder_id → (минуты, user_id)
+        self._users: dict[int, set[int]] = {}
+        self._zones: dict[str, timedelta] = {}  # Пояс → смещение, по которому посчитан индекс
+
+    def __len__(self) -> int:
+        return len(self._reminders)
+
+    def clear(self):
+        self._buckets.clear()
+        self._minutes.clear()
+        self._reminders.clear()
+        self._users.clear()
+        self._zones.clear()
+
+    def add(self, reminder_id: int, user_id: int, utc_days_mask: int, utc_time: time, timezone: str):
+        """Добавляет напоминание в индекс (или переносит, если оно уже есть)"""
+        self.remove(reminder_id)
+        if timezone not in self._zones:
+            self._zones[timezone] = utc_offset(timezone)
+
+        minutes = [minute_of_week(weekday, utc_time) for weekday in weekdays_in(utc_days_mask)]
+        if not minutes:
+            logging.warning(f"Напоминание {reminder_id}: не выбран ни один день недели")
+            return
+
+        for minute in minutes:
+            bucket = self._buckets.get(minute)
+            if bucket is None:
+                bucket = self._buckets[minute] = set()
+                insort(self._minutes, minute)
+            bucket.add(reminder_id)
+
+        self._reminders[reminder_id] = (minutes, user_id)
+        self._users.setdefault(user_id, set()).add(reminder_id)
+
+    def remove(self, reminder_id: int):
+        """Убирает напоминание из индекса"""
+        entry = self._reminders.pop(reminder_id, None)
+        if entry is None:
+            return
+
+        minutes, user_id = entry
+        for minute in minutes:
+            bucket = self._buckets[minute]
+            bucket.discard(reminder_id)
+            if not bucket:
+                del self._buckets[minute]
+                del self._minutes[bisect_left(self._minutes, minute)]
+
+        user_reminders = self._users[user_id]
+        user_reminders.discard(reminder_id)
+        if not user_reminders:
+            del self._users[user_id]
+
+    def remove_user(self, user_id: int):
+        """Убирает все напоминания пользователя"""
+        for reminder_id in list(self._users.get(user_id, ())):
+            self.remove(reminder_id)
+
+    def due(self, minute: int) -> list[int]:
+        """Напоминания, которые должны сработать в указанную минуту недели"""
+        return list(self._buckets.get(minute, ()))
+
+    def next_minute(self, minute: int) -> int | None:
+        """Ближайшая минута недели (включая текущую), на которую есть напоминания"""
+        if not self._minutes:
+            return None
+        position = bisect_left(self._minutes, minute)
+        if position == len(self._minutes):
+            return self._minutes[0]
+        return self._minutes[position]
+
+    def changed_zones(self, moment: datetime) -> list[str]:
+        """Пояса, у которых смещение от UTC изменилось с момента расчёта индекса"""
+        return [
+            timezone for timezone, offset in self._zones.items()
+            if utc_offset(timezone, moment) != offset
+        ]
+
+    async def recompute(self, session: AsyncSession, *conditions, moment: datetime | None = None):
+        """
+        Пересчитывает UTC-расписание напоминаний (все или по условиям на Reminder/User),
+        сохраняет изменения в БД и обновляет индекс
+        """
+        result = await session.execute(
+            select(
+                Reminder.reminder_id,
+                Reminder.user_id,
+                Reminder.days_mask,
+                Reminder.reminder_time,
+                Reminder.utc_days_mask,
+                Reminder.utc_time,
+                User.timezone
+            )
+            .join(User)
+            .where(*conditions)
+        )
+
+        changed = []
+        for reminder_id, user_id, days_mask, at, stored_mask, stored_time, timezone in result:
+            utc_days_mask, utc_time = utc_schedule(days_mask, at, timezone, moment)
+            if (utc_days_mask, utc_time) != (stored_mask, stored_time):
+                changed.append({"reminder_id": reminder_id, "utc_days_mask": utc_days_mask, "utc_time": utc_time})
+            self._zones[timezone] = utc_offset(timezone, moment)
+            self.add(reminder_id, user_id, utc_days_mask, utc_time, timezone)
+
+        if changed:
+            await session.execute(update(Reminder), changed)
+            await session.commit()
+            logging.info(f"Пересчитано UTC-время напоминаний: {len(changed)}")
+
+    async def load(self, session: AsyncSession):
+        """Полностью перестраивает индекс по содержимому БД"""
+        self.clear()
+        await self.recompute(session)
+        logging.info(f"Индекс напоминаний загружен: {len(self)} напоминаний, {len(self._buckets)} минут")
+
+
+reminder_index = ReminderIndex()
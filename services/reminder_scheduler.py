@@ -0,0 +1,121 @@
+"""
+Планировщик напоминаний.
+Просыпается ровно на границе каждой минуты и вызывает обработчик один раз
+на минуту. В БД хранится последняя минута, напоминания которой уже
+отправлены (watermark), а не только поставлены в очередь рассылки, поэтому
+после перезапуска, падения или зависания event loop пропущенные и
+недоотправленные минуты обрабатываются заново. Напоминание приходит хотя
+бы один раз: после падения посреди минуты уже отправленные напоминания
+этой минуты могут прийти повторно.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from database.models import SchedulerState
+from database.session import get_db_session
+
+WATERMARK_NAME = "reminders_last_minute"
+
+
+def floor_minute(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+class ReminderScheduler:
+    """
+    Вызывает dispatch(minute) для каждой минуты по порядку.
+    unfinished() — самая ранняя минута, напоминания которой ещё не отправлены
+    (None — всё отправлено); watermark в БД не обгоняет её.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[datetime], Awaitable[None]],
+        max_catchup_minutes: int = 60,
+        unfinished: Callable[[], datetime | None] | None = None
+    ):
+        self._dispatch = dispatch
+        self._unfinished = unfinished
+        self._max_catchup = timedelta(minutes=max_catchup_minutes)
+        self._watermark: datetime | None = None  # Последняя минута, переданная в dispatch
+        self._saved: datetime | None = None  # Последняя минута, сохранённая в БД
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._watermark = self._saved = await self._load_watermark()
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Планировщик напоминаний запущен, последняя минута: {self._watermark}")
+
+    async def stop(self):
+        """Останавливает цикл; прогресс сохраняет commit_progress() после досылки очереди"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._dispatch_pending()
+            except Exception as e:
+                logging.error(f"Ошибка планировщика напоминаний: {e}", exc_info=True)
+
+            # Спим до начала следующей минуты
+            await asyncio.sleep(60 - time.time() % 60)
+
+    async def _dispatch_pending(self):
+        """Обрабатывает все минуты после watermark вплоть до текущей"""
+        now = floor_minute(datetime.now(timezone.utc))
+
+        if self._watermark is None:
+            minute = now
+        else:
+            minute = self._watermark + timedelta(minutes=1)
+
+        oldest = now - self._max_catchup + timedelta(minutes=1)
+        if minute < oldest:
+            logging.warning(f"Пропущены напоминания с {minute} по {oldest - timedelta(minutes=1)} (UTC)")
+            minute = oldest
+
+        while minute <= now:
+            if minute < now:
+                logging.info(f"Досылаем напоминания за пропущенную минуту {minute} (UTC)")
+            await self._dispatch(minute)
+            self._watermark = minute
+            minute += timedelta(minutes=1)
+
+        await self.commit_progress()
+
+    async def commit_progress(self):
+        """Сохраняет в БД последнюю минуту, все напоминания которой отправлены"""
+        done = self._watermark
+        oldest = self._unfinished() if self._unfinished else None
+        if done is not None and oldest is not None and oldest <= done:
+            done = oldest - timedelta(minutes=1)
+        if done is not None and (self._saved is None or done > self._saved):
+            await self._save_watermark(done)
+
+    async def _load_watermark(self) -> datetime | None:
+        async for session in get_db_session():
+            state = await session.get(SchedulerState, WATERMARK_NAME)
+            if state is None:
+                return None
+            return state.value.replace(tzinfo=timezone.utc)
+
+    async def _save_watermark(self, minute: datetime):
+        async for session in get_db_session():
+            state = await session.get(SchedulerState, WATERMARK_NAME)
+            value = minute.replace(tzinfo=None)
+            if state is None:
+                session.add(SchedulerState(name=WATERMARK_NAME, value=value))
+            else:
+                state.value = value
+            await session.commit()
+        self._saved = minute
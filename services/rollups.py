@@ -0,0 +1,154 @@
+"""
+Дневные суммы тренировок (таблица workout_daily_rollups).
+Строка на пользователя, день и тип тренировки обновляется в той же
+транзакции, что и сама тренировка, поэтому статистика за любой период
+читается из нескольких десятков строк, а не из всей истории тренировок.
+Результаты по периодам кэшируются в памяти и сбрасываются при записи.
+После commit изменения передаются подписчикам (рейтинг и т.п.).
+"""
+
+from datetime import date, timedelta
+from typing import Callable, NamedTuple
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import Config
+from database.models import Workout, WorkoutDailyRollup
+from services.cache import TTLCache
+
+# Длина периода статистики в днях, включая сегодняшний (None — за всё время)
+PERIOD_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+    "all": None
+}
+
+
+class WorkoutValues(NamedTuple):
+    """Часть тренировки, влияющая на дневные суммы"""
+    user_id: int
+    day: date
+    type: str
+    duration: float
+    calories: float
+    distance: float
+
+
+class PeriodTotals(NamedTuple):
+    workouts_count: int
+    total_duration: float
+    total_calories: float
+    total_distance: float
+
+
+# (user_id, период, сегодняшняя дата) → PeriodTotals
+stats_cache = TTLCache(ttl=Config.STATS_CACHE_TTL)
+
+# Вызываются после commit для каждой учтённой тренировки: listener(values, sign)
+rollup_listeners: list[Callable[[WorkoutValues, int], None]] = []
+
+
+def workout_values(workout: Workout) -> WorkoutValues:
+    return WorkoutValues(
+        workout.user_id,
+        workout.date.date(),
+        workout.type,
+        workout.duration or 0,
+        workout.calories or 0,
+        workout.distance or 0
+    )
+
+
+async def _apply(session: AsyncSession, values: WorkoutValues, sign: int):
+    statement = mysql_insert(WorkoutDailyRollup).values(
+        user_id=values.user_id,
+        day=values.day,
+        type=values.type,
+        workouts_count=sign,
+        total_duration=sign * values.duration,
+        total_calories=sign * values.calories,
+        total_distance=sign * values.distance
+    )
+    await session.execute(statement.on_duplicate_key_update(
+        workouts_count=WorkoutDailyRollup.workouts_count + statement.inserted.workouts_count,
+        total_duration=WorkoutDailyRollup.total_duration + statement.inserted.total_duration,
+        total_calories=WorkoutDailyRollup.total_calories + statement.inserted.total_calories,
+        total_distance=WorkoutDailyRollup.total_distance + statement.inserted.total_distance
+    ))
+
+    session.info.setdefault("rollup_changes", []).append((values, sign))
+    if sign < 0:
+        await session.execute(
+            delete(WorkoutDailyRollup).where(
+                WorkoutDailyRollup.user_id == values.user_id,
+                WorkoutDailyRollup.day == values.day,
+                WorkoutDailyRollup.type == values.type,
+                WorkoutDailyRollup.workouts_count <= 0
+            )
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session):
+    for values, sign in session.info.pop("rollup_changes", ()):
+        for listener in rollup_listeners:
+            listener(values, sign)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session: Session):
+    session.info.pop("rollup_changes", None)
+
+
+async def record_workout(session: AsyncSession, workout: Workout):
+    """Учитывает новую тренировку (вызывать до commit)"""
+    await _apply(session, workout_values(workout), 1)
+
+
+async def forget_workout(session: AsyncSession, values: WorkoutValues):
+    """Убирает удалённую тренировку из сумм (вызывать до commit)"""
+    await _apply(session, values, -1)
+
+
+async def move_workout(session: AsyncSession, before: WorkoutValues, workout: Workout):
+    """Переносит изменённую тренировку: снимает старые значения и добавляет новые"""
+    after = workout_values(workout)
+    if after != before:
+        await _apply(session, before, -1)
+        await _apply(session, after, 1)
+
+
+def invalidate_user_stats(user_id: int):
+    """Сбрасывает кэш статистики пользователя (вызывать после commit)"""
+    stats_cache.invalidate_group(user_id)
+
+
+async def period_totals(session: AsyncSession, user_id: int, period: str) -> PeriodTotals:
+    """Суммы тренировок пользователя за период: день, неделя, месяц или всё время"""
+    today = date.today()
+    key = (user_id, period, today)
+    totals = stats_cache.get(key)
+    if totals is not None:
+        return totals
+
+    conditions = [WorkoutDailyRollup.user_id == user_id, WorkoutDailyRollup.day <= today]
+    days = PERIOD_DAYS[period]
+    if days is not None:
+        conditions.append(WorkoutDailyRollup.day > today - timedelta(days=days))
+
+    result = await session.execute(
+        select(
+            func.coalesce(func.sum(WorkoutDailyRollup.workouts_count), 0),
+            func.coalesce(func.sum(WorkoutDailyRollup.total_duration), 0),
+            func.coalesce(func.sum(WorkoutDailyRollup.total_calories), 0),
+            func.coalesce(func.sum(WorkoutDailyRollup.total_distance), 0)
+        ).where(*conditions)
+    )
+    totals = PeriodTotals(*result.one())
+    stats_cache.set(key, totals)
+    return totals
+
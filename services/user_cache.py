@@ -0,0 +1,84 @@
+"""
+Кэш пользователей по telegram_id.
+Почти каждый апдейт начинается с поиска пользователя в БД; middleware
+IdentityMiddleware берёт его отсюда и передаёт обработчикам как
+current_user. Обработчики, меняющие пользователя (бан, права, имя,
+настройки, удаление аккаунта), сбрасывают запись после commit.
+Незарегистрированные пользователи не кэшируются: /start их сразу видит.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from database.models import User
+from services.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    user_id: int
+    telegram_id: int
+    name: str | None
+    registration_date: datetime | None
+    is_admin: bool
+    is_banned: bool
+    notifications_enabled: bool
+    timezone: str
+
+
+class UserCache:
+    def __init__(self, ttl: float, maxsize: int):
+        self._cache = TTLCache(ttl, maxsize)
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get(self, telegram_id: int) -> CachedUser | None:
+        return self._cache.get((telegram_id,))
+
+    async def load(self, session: AsyncSession, telegram_id: int) -> CachedUser | None:
+        """Читает пользователя из БД и кладёт в кэш"""
+        result = await session.execute(
+            select(
+                User.user_id,
+                User.telegram_id,
+                User.name,
+                User.registration_date,
+                User.is_admin,
+                User.is_banned,
+                User.notifications_enabled,
+                User.timezone
+            ).where(User.telegram_id == telegram_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        user = CachedUser(
+            user_id=row.user_id,
+            telegram_id=row.telegram_id,
+            name=row.name,
+            registration_date=row.registration_date,
+            is_admin=bool(row.is_admin),
+            is_banned=bool(row.is_banned),
+            notifications_enabled=bool(row.notifications_enabled),
+            timezone=row.timezone
+        )
+        self._cache.set((telegram_id,), user)
+        return user
+
+    def invalidate(self, telegram_id: int):
+        """Сбрасывает пользователя (вызывать после commit изменений в users)"""
+        self._cache.invalidate((telegram_id,))
+
+
+user_cache = UserCache(ttl=Config.USER_CACHE_TTL, maxsize=Config.USER_CACHE_SIZE)
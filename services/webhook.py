@@ -0,0 +1,63 @@
+"""
+Получение апдейтов через вебхук вместо long polling.
+Telegram сам присылает апдейты POST-запросами на aiohttp-сервер. Экземпляр
+бота за адресом вебхука — один, как и при polling: напоминания, баны и
+кэши живут в памяти процесса, второй экземпляр не запустится
+(database.instance_lock).
+Запрос подтверждается сразу, апдейт обрабатывается в фоне — медленный
+обработчик не задерживает ответ Telegram и не вызывает повторную отправку.
+Telegram присылает только те типы апдейтов, на которые есть обработчики.
+"""
+
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import Config
+
+
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot) -> web.Application:
+    """aiohttp-приложение с обработчиком вебхука; запуск и остановка бота привязаны к приложению"""
+    # Тело больше лимита aiohttp не читает и отвечает 413
+    app = web.Application(client_max_size=Config.WEBHOOK_MAX_BODY_BYTES)
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=Config.WEBHOOK_SECRET
+    ).register(app, path=Config.WEBHOOK_PATH)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def set_webhook(bot: Bot, dispatcher: Dispatcher):
+    """Регистрирует адрес вебхука и типы апдейтов, на которые есть обработчики"""
+    url = Config.WEBHOOK_BASE_URL.rstrip("/") + Config.WEBHOOK_PATH
+    allowed_updates = dispatcher.resolve_used_update_types()
+    await bot.set_webhook(
+        url,
+        secret_token=Config.WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+    )
+    logging.info(f"Вебхук: {url}, апдейты: {', '.join(allowed_updates)}")
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, host: str, port: int):
+    """Обслуживает вебхук, пока задачу не отменят"""
+    if not Config.WEBHOOK_BASE_URL:
+        raise ValueError("Для BOT_MODE=webhook нужен WEBHOOK_BASE_URL")
+
+    runner = web.AppRunner(create_webhook_app(dispatcher, bot))
+    await runner.setup()  # Здесь выполняется on_startup бота
+    try:
+        await web.TCPSite(runner, host, port).start()
+        logging.info(f"Сервер вебхука слушает {host}:{port}")
+        # Адрес регистрируется, когда сервер уже принимает запросы
+        await set_webhook(bot, dispatcher)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()  # on_shutdown бота
+        await bot.session.close()
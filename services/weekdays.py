@@ -0,0 +1,75 @@
+"""
+Дни недели напоминаний в виде битовой маски.
+Бит 0 — понедельник, бит 6 — воскресенье. Одно напоминание может
+срабатывать сразу в несколько дней.
+"""
+
+WEEKDAY_NAMES = [
+    "Понедельник",
+    "Вторник",
+    "Среда",
+    "Четверг",
+    "Пятница",
+    "Суббота",
+    "Воскресенье"
+]
+WEEKDAY_SHORT = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+WORKDAYS = 0b0011111
+WEEKEND = 0b1100000
+ALL_DAYS = 0b1111111
+
+PRESETS = {
+    "будни": WORKDAYS,
+    "выходные": WEEKEND,
+    "каждый день": ALL_DAYS
+}
+
+DAY_ALIASES = {}
+for _index, _name in enumerate(WEEKDAY_NAMES):
+    DAY_ALIASES[_name.lower()] = _index
+    DAY_ALIASES[WEEKDAY_SHORT[_index].lower()] = _index
+for _index, _name in enumerate(["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]):
+    DAY_ALIASES[_name] = _index
+
+
+def day_bit(weekday: int) -> int:
+    """Бит дня недели (0 — понедельник, как datetime.weekday())"""
+    return 1 << weekday
+
+
+def parse_days(text: str) -> int:
+    """Разбирает «Будни», «Среда» или «пн, ср, пт» в маску; 0 — если не удалось"""
+    text = (text or "").strip().lower()
+    if text in PRESETS:
+        return PRESETS[text]
+
+    mask = 0
+    for part in text.replace(";", ",").split(","):
+        weekday = DAY_ALIASES.get(part.strip())
+        if weekday is None:
+            return 0
+        mask |= day_bit(weekday)
+    return mask
+
+
+def weekdays_in(mask: int) -> list[int]:
+    return [weekday for weekday in range(7) if mask & day_bit(weekday)]
+
+
+def format_days(mask: int) -> str:
+    """Человекочитаемое описание маски дней"""
+    for name, preset in PRESETS.items():
+        if mask == preset:
+            return name.capitalize()
+
+    weekdays = weekdays_in(mask)
+    if len(weekdays) == 1:
+        return WEEKDAY_NAMES[weekdays[0]]
+    return ", ".join(WEEKDAY_SHORT[weekday] for weekday in weekdays)
+
+
+def rotate_days(mask: int, shift: int) -> int:
+    """Сдвигает дни маски на shift дней вперёд (по кругу недели)"""
+    shift %= 7
+    return ((mask << shift) | (mask >> (7 - shift))) & ALL_DAYS
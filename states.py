@@ -15,6 +15,7 @@ class WorkoutStates(StatesGroup):
 
 class UserStates(StatesGroup):
     waiting_for_new_name = State()
+    waiting_for_timezone = State()
 
 class AddExerciseStates(StatesGroup):
     waiting_for_add_more = State()
@@ -0,0 +1,82 @@
+"""
+Размер и время экспорта всех тренировок во всех форматах (админский
+экспорт, с чтением из БД). По умолчанию 1M тренировок, каждая третья —
+силовая с упражнением; число задаётся BENCH_EXPORT_WORKOUTS.
+"""
+
+import os
+import random
+import time as clock
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from database.models import Exercise, User, Workout
+from services.export import EXPORT_FORMATS, stream_export
+
+pytestmark = pytest.mark.bench
+
+WORKOUTS = int(os.getenv("BENCH_EXPORT_WORKOUTS", 1_000_000))
+USERS = 1000
+CHUNK = 50_000
+
+
+@pytest.fixture
+def filled(run, session_factory):
+    rng = random.Random(16)
+    types = ["running", "cycling", "swimming", "strength"]
+
+    async def fill():
+        async with session_factory() as session:
+            await session.execute(insert(User), [
+                {"user_id": user_id, "telegram_id": user_id, "name": f"Пользователь {user_id}"}
+                for user_id in range(1, USERS + 1)
+            ])
+            start = datetime(2020, 1, 1)
+            for first in range(1, WORKOUTS + 1, CHUNK):
+                ids = range(first, min(first + CHUNK, WORKOUTS + 1))
+                await session.execute(insert(Workout), [{
+                    "workout_id": workout_id,
+                    "user_id": rng.randint(1, USERS),
+                    "date": start + timedelta(minutes=workout_id * 3),
+                    "type": "strength" if workout_id % 3 == 0 else rng.choice(types[:3]),
+                    "duration": round(rng.uniform(20, 90), 1),
+                    "distance": round(rng.uniform(1, 20), 2),
+                    "calories": round(rng.uniform(150, 700), 1),
+                    "notes": "Заметка" if workout_id % 5 == 0 else None
+                } for workout_id in ids])
+                await session.execute(insert(Exercise), [
+                    {"workout_id": workout_id, "name": "Жим лёжа", "sets": 3, "reps": 10, "weight": 60}
+                    for workout_id in ids if workout_id % 3 == 0
+                ])
+            await session.commit()
+    run(fill())
+
+
+def test_export_size_and_time(run, session_factory, filled):
+    for format_type, format_class in EXPORT_FORMATS.items():
+        try:
+            export_format = format_class()
+        except ImportError:
+            print(f"\n{format_type:>8}: не установлен pyarrow")
+            continue
+
+        async def export():
+            async with session_factory() as session:
+                return await stream_export(session, export_format)
+        start = clock.perf_counter()
+        parts = run(export())
+        elapsed = clock.perf_counter() - start
+
+        sizes = []
+        for part in parts:
+            part.file.seek(0, os.SEEK_END)
+            sizes.append(part.file.tell())
+            part.file.close()
+        assert sum(part.rows for part in parts) == WORKOUTS
+
+        print(
+            f"\n{format_type:>8}: {WORKOUTS} тренировок, {sum(sizes) / 2 ** 20:.1f} МБ "
+            f"в {len(parts)} ч., {elapsed:.1f} с"
+        )
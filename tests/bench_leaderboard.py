@@ -0,0 +1,77 @@
+"""
+Рейтинг на 100k пользователей и 10M тренировок (в среднем по 100 на
+пользователя): загрузка из дневных сумм, просмотр профиля (три места)
+и учёт новой тренировки. Таблица тренировок при этом не читается —
+рейтинг строится по workout_daily_rollups.
+"""
+
+import random
+import time as clock
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from database.models import User, WorkoutDailyRollup
+from services.ranking import METRICS, Leaderboard
+from services.rollups import WorkoutValues
+
+pytestmark = pytest.mark.bench
+
+USERS = 100_000
+WORKOUTS = 10_000_000
+
+
+def test_leaderboard_100k_users(run, session_factory):
+    rng = random.Random(11)
+
+    async def fill():
+        async with session_factory() as session:
+            await session.execute(insert(User), [
+                {"user_id": user_id, "telegram_id": user_id, "name": f"user{user_id}"}
+                for user_id in range(1, USERS + 1)
+            ])
+            rollups = []
+            for user_id in range(1, USERS + 1):
+                workouts = rng.randint(1, 2 * WORKOUTS // USERS - 1)
+                rollups.append({
+                    "user_id": user_id,
+                    "day": date(2024, 1, 1),
+                    "type": "running",
+                    "workouts_count": workouts,
+                    "total_duration": workouts * rng.uniform(20, 90),
+                    "total_calories": workouts * rng.uniform(150, 700)
+                })
+            await session.execute(insert(WorkoutDailyRollup), rollups)
+            await session.commit()
+    run(fill())
+
+    leaderboard = Leaderboard()
+
+    async def load():
+        async with session_factory() as session:
+            await leaderboard.load(session)
+    start = clock.perf_counter()
+    run(load())
+    load_time = clock.perf_counter() - start
+    assert len(leaderboard) == USERS
+
+    views = 10_000
+    user_ids = [rng.randint(1, USERS) for _ in range(views)]
+    start = clock.perf_counter()
+    for user_id in user_ids:
+        for metric in METRICS:
+            leaderboard.rank(user_id, metric)
+    view_time = (clock.perf_counter() - start) / views
+
+    writes = 10_000
+    start = clock.perf_counter()
+    for user_id in user_ids[:writes]:
+        leaderboard.apply(WorkoutValues(user_id, date(2024, 1, 2), "running", 45.0, 400.0, 5.0), 1)
+    write_time = (clock.perf_counter() - start) / writes
+
+    print(
+        f"\nзагрузка {load_time:.2f} с, профиль (3 места) {view_time * 1e6:.1f} мкс, "
+        f"новая тренировка {write_time * 1e6:.1f} мкс"
+    )
+    assert view_time < 0.001
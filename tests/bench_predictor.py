@@ -0,0 +1,81 @@
+"""
+Прогноз прогресса: замкнутая формула на NumPy (ml.predictor) против
+прежнего кода с двумя LinearRegression из scikit-learn на каждый запрос.
+Результаты сверяются, время — на один прогноз и на пакет пользователей.
+"""
+
+import random
+import time as clock
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from ml.predictor import predict_future_workouts, predict_many
+
+pytestmark = pytest.mark.bench
+
+
+def sklearn_forecast(dates, durations, calories, steps=7):
+    """Прогноз так, как он считался до ml.predictor на NumPy"""
+    from sklearn.linear_model import LinearRegression
+
+    base_date = min(dates)
+    x = np.array([(d - base_date).days for d in dates]).reshape(-1, 1)
+    duration_model = LinearRegression().fit(x, durations)
+    calories_model = LinearRegression().fit(x, calories)
+    future_days = np.array([x[-1][0] + i for i in range(1, steps + 1)]).reshape(-1, 1)
+    future_dates = [base_date + timedelta(days=int(day[0])) for day in future_days]
+    return future_dates, duration_model.predict(future_days), calories_model.predict(future_days)
+
+
+def history(rng: random.Random, count: int):
+    day = datetime(2024, 1, 1)
+    dates = []
+    for _ in range(count):
+        day += timedelta(days=rng.randint(0, 3), hours=rng.randint(0, 5))
+        dates.append(day)
+    durations = [rng.uniform(20, 90) for _ in range(count)]
+    calories = [rng.uniform(150, 700) for _ in range(count)]
+    return dates, durations, calories
+
+
+def per_call(function, *args, repeat: int) -> float:
+    start = clock.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (clock.perf_counter() - start) / repeat
+
+
+@pytest.mark.parametrize("count", [30, 300, 3000])
+def test_single_forecast(count):
+    pytest.importorskip("sklearn")
+    args = history(random.Random(count), count)
+
+    dates, durations, calories = predict_future_workouts(*args)
+    old_dates, old_durations, old_calories = sklearn_forecast(*args)
+    assert dates == old_dates
+    assert np.allclose(durations, old_durations) and np.allclose(calories, old_calories)
+
+    numpy_time = per_call(predict_future_workouts, *args, repeat=200)
+    sklearn_time = per_call(sklearn_forecast, *args, repeat=200)
+    print(f"\n{count:>5} тренировок: sklearn {sklearn_time * 1e3:.2f} мс, NumPy {numpy_time * 1e3:.2f} мс")
+
+
+def test_batch_forecast():
+    pytest.importorskip("sklearn")
+    rng = random.Random(19)
+    histories = {user_id: history(rng, rng.randint(1, 200)) for user_id in range(1000)}
+
+    start = clock.perf_counter()
+    forecasts = predict_many(histories)
+    batch_time = clock.perf_counter() - start
+
+    start = clock.perf_counter()
+    for user_id, args in histories.items():
+        dates, durations, calories = sklearn_forecast(*args)
+        assert np.allclose(forecasts[user_id].durations, durations)
+        assert np.allclose(forecasts[user_id].calories, calories)
+    sklearn_time = clock.perf_counter() - start
+
+    print(f"\n1000 пользователей: sklearn по одному {sklearn_time:.2f} с, predict_many {batch_time:.3f} с")
@@ -0,0 +1,51 @@
+"""
+Тесты работают с SQLite-файлом (aiosqlite), схема создаётся миграциями бота.
+MySQL для тестов не нужен: адрес БД из окружения только попадает в
+движок database.session, соединение с ним не открывается.
+"""
+
+import asyncio
+import os
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "3306")
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.migrations import run_migrations
+
+
+@pytest.fixture
+def run():
+    """Выполняет корутину в цикле событий теста (один цикл на тест, как у движка)"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def engine(run, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    run(run_migrations(engine))
+    yield engine
+    run(engine.dispose())
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL-запросы, выполненные через engine: список пар (запрос, параметры)"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,50 @@
+"""
+Части экспорта не превышают лимит размера, даже когда формат копит
+строки в памяти (Parquet пишет их пачками row group'ов).
+"""
+
+import os
+import random
+import string
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from database.models import User, Workout
+from services.export import ParquetFormat, stream_export
+
+PART_SIZE = 4 * 1024 * 1024
+
+
+def test_parquet_parts_fit_the_limit(run, session_factory):
+    pytest.importorskip("pyarrow")
+    rng = random.Random(16)
+
+    async def fill():
+        async with session_factory() as session:
+            await session.execute(insert(User), [{"user_id": 1, "telegram_id": 1, "name": "user"}])
+            # Длинные несжимаемые заметки: 300 тренировок — около 15 МБ, меньше одной пачки по строкам
+            await session.execute(insert(Workout), [{
+                "user_id": 1,
+                "date": datetime(2024, 1, 1) + timedelta(hours=i),
+                "type": "running",
+                "notes": "".join(rng.choices(string.ascii_letters, k=50_000))
+            } for i in range(300)])
+            await session.commit()
+    run(fill())
+
+    export_format = ParquetFormat(batch_rows=1000, batch_bytes=1024 * 1024)
+    export_format.reserve = 256 * 1024
+
+    async def export():
+        async with session_factory() as session:
+            return await stream_export(session, export_format, part_size=PART_SIZE)
+    parts = run(export())
+
+    assert len(parts) > 1
+    assert sum(part.rows for part in parts) == 300
+    for part in parts:
+        part.file.seek(0, os.SEEK_END)
+        assert part.file.tell() <= PART_SIZE
+        part.file.close()
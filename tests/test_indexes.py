@@ -0,0 +1,107 @@
+"""
+Частые запросы читают таблицы по индексам. Запросы выполняются настоящим
+кодом бота, затем для каждого выполненного запроса снимается
+EXPLAIN QUERY PLAN: полный просмотр таблицы (SCAN без индекса) или
+сортировка во временном B-дереве означает, что запрос перестал
+попадать в индекс из database.models. Просмотр по индексу в порядке
+ORDER BY (SCAN ... USING INDEX) допустим: его останавливает LIMIT.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from database.fsm_storage import DbStorage
+from database.models import Exercise, User, Workout
+from handlers.admin_handlers import get_user
+from handlers.workout_handlers import load_workouts_page
+from services.export import iter_records
+from services.pagination import fetch_page
+from services.rollups import period_totals
+
+
+def query_plan(run, engine, statement: str, parameters) -> list[str]:
+    async def explain():
+        async with engine.connect() as conn:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in result]
+    return run(explain())
+
+
+def assert_indexed(run, engine, statements):
+    assert statements
+    # Сами EXPLAIN тоже попадают в statements — проверяем только запросы бота
+    for statement, parameters in list(statements):
+        plan = query_plan(run, engine, statement, parameters)
+        bad = [step for step in plan if (step.startswith("SCAN") and "USING" not in step) or "TEMP B-TREE" in step]
+        assert not bad, f"{statement}\n{plan}"
+
+
+@pytest.fixture
+def user_id(run, session_factory):
+    async def fill():
+        async with session_factory() as session:
+            users = [User(telegram_id=100 + i, name=f"user{i}") for i in range(3)]
+            session.add_all(users)
+            await session.flush()
+            start = datetime(2024, 1, 1)
+            for user in users:
+                for day in range(12):
+                    workout = Workout(user_id=user.user_id, date=start + timedelta(days=day), type="strength")
+                    workout.exercises = [Exercise(name="Жим", sets=3, reps=10, weight=50)]
+                    session.add(workout)
+            await session.commit()
+            return users[0].user_id
+    return run(fill())
+
+
+def test_workout_pages(run, engine, session_factory, statements, user_id):
+    async def flip():
+        async with session_factory() as session:
+            first = await load_workouts_page(session, user_id)
+            second = await load_workouts_page(session, user_id, after=first.last)
+            await load_workouts_page(session, user_id, before=second.first)
+    run(flip())
+    assert_indexed(run, engine, statements)
+
+
+def test_users_list(run, engine, session_factory, statements, user_id):
+    async def flip():
+        async with session_factory() as session:
+            key = lambda user: (user.registration_date, user.user_id)
+            first = await fetch_page(session, select(User), User.registration_date, User.user_id, key, limit=2)
+            await fetch_page(session, select(User), User.registration_date, User.user_id, key, limit=2, after=first.last)
+    run(flip())
+    assert_indexed(run, engine, statements)
+
+
+def test_user_lookup(run, engine, session_factory, statements, user_id):
+    async def lookup():
+        async with session_factory() as session:
+            await get_user(session, 100)
+    run(lookup())
+    assert_indexed(run, engine, statements)
+
+
+def test_period_totals(run, engine, session_factory, statements, user_id):
+    async def totals():
+        async with session_factory() as session:
+            for period in ("week", "all"):
+                await period_totals(session, user_id, period)
+    run(totals())
+    assert_indexed(run, engine, statements)
+
+
+def test_user_export(run, engine, session_factory, statements, user_id):
+    async def export():
+        async with session_factory() as session:
+            async for _ in iter_records(session, Workout.user_id == user_id, nested=True):
+                pass
+    run(export())
+    assert_indexed(run, engine, statements)
+
+
+def test_fsm_purge(run, engine, session_factory, statements):
+    run(DbStorage(session_factory, ttl=60).purge_expired())
+    assert_indexed(run, engine, statements)
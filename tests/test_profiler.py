@@ -0,0 +1,30 @@
+"""
+Профилировщик запросов: упавший запрос не оставляет состояния на
+соединении из пула, следующий запрос замеряется как обычно.
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database.profiler import QueryProfiler
+
+
+def test_failed_statement_leaves_no_state(run, engine):
+    profiler = QueryProfiler(sample_rate=1.0)
+    profiler.install(engine)
+
+    async def scenario():
+        async with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                await connection.execute(text("SELECT * FROM no_such_table"))
+            await connection.rollback()
+            await connection.execute(text("SELECT 1"))
+            return dict(connection.sync_connection.info)
+
+    info = run(scenario())
+
+    assert "query_start" not in info
+    [(statement, stats)] = profiler.statements.items()
+    assert statement == "SELECT 1"
+    assert stats.count == 1
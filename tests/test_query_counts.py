@@ -0,0 +1,81 @@
+"""
+Число SQL-запросов на горячих путях не зависит от числа строк:
+запросы считаются через before_cursor_execute (фикстура statements).
+"""
+
+from datetime import datetime, time, timedelta
+
+import pytest
+
+import app
+from database.models import Exercise, Reminder, User, Workout
+from handlers.workout_handlers import format_workouts_response, load_workouts_page
+from services.reminder_dispatcher import ReminderDispatcher
+from services.reminder_index import ReminderIndex
+
+MONDAY_9AM = datetime(2024, 1, 1, 9, 0)
+
+
+@pytest.mark.parametrize("due_count", [1, 40])
+def test_send_reminders_one_query_per_tick(run, session_factory, statements, monkeypatch, due_count):
+    index, dispatcher = ReminderIndex(), ReminderDispatcher()
+
+    async def db_session():
+        async with session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(app, "reminder_index", index)
+    monkeypatch.setattr(app, "reminder_dispatcher", dispatcher)
+    monkeypatch.setattr(app, "get_db_session", db_session)
+
+    async def fill():
+        async with session_factory() as session:
+            for i in range(due_count):
+                user = User(telegram_id=1000 + i, name=f"user{i}", timezone="UTC")
+                user.reminders = [Reminder(reminder_text="Тренировка", reminder_time=time(9, 0), days_mask=1)]
+                session.add(user)
+            await session.commit()
+            await index.load(session)
+    run(fill())
+
+    statements.clear()
+    run(app.send_reminders(None, MONDAY_9AM))
+
+    assert len(statements) == 1
+    assert dispatcher.queue_size == due_count
+
+
+def test_workout_page_two_queries(run, session_factory, statements):
+    async def fill():
+        async with session_factory() as session:
+            user = User(telegram_id=1, name="user")
+            session.add(user)
+            await session.flush()
+            for day in range(20):
+                workout = Workout(user_id=user.user_id, date=datetime(2024, 1, 1) + timedelta(days=day), type="strength")
+                workout.exercises = [Exercise(name=f"Упражнение {i}", sets=3, reps=10, weight=50) for i in range(3)]
+                session.add(workout)
+            await session.commit()
+            return user.user_id
+    user_id = run(fill())
+
+    async def flip() -> list[int]:
+        counts = []
+        async with session_factory() as session:
+            cursors = {}
+            while True:
+                statements.clear()
+                page = await load_workouts_page(session, user_id, **cursors)
+                # Упражнения уже загружены: отрисовка страницы не ходит в БД
+                format_workouts_response(page.items, 1, 20)
+                counts.append(len(statements))
+                if not page.has_next:
+                    break
+                cursors = {"after": page.last}
+
+            statements.clear()
+            await load_workouts_page(session, user_id, before=page.first)
+            counts.append(len(statements))
+        return counts
+
+    assert run(flip()) == [2] * 5
@@ -0,0 +1,74 @@
+"""
+Диспетчер напоминаний при флуд-контроле Telegram: TelegramRetryAfter
+останавливает всех воркеров на retry_after, а остановка диспетчера
+отменяет отложенные повторы.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.reminder_dispatcher import ReminderDispatcher
+
+RETRY_AFTER = 1
+
+
+class FloodBot:
+    """Первая отправка получает RetryAfter, остальные проходят"""
+
+    def __init__(self):
+        self.sent: list[tuple[int, float]] = []
+        self._flooded = False
+
+    async def send_message(self, chat_id: int, text: str):
+        if not self._flooded:
+            self._flooded = True
+            raise TelegramRetryAfter(
+                method=SendMessage(chat_id=chat_id, text=text),
+                message="Flood control exceeded",
+                retry_after=RETRY_AFTER
+            )
+        self.sent.append((chat_id, time.monotonic()))
+
+
+def test_retry_after_pauses_all_workers(run):
+    async def scenario():
+        bot = FloodBot()
+        dispatcher = ReminderDispatcher()
+        dispatcher.start(bot, concurrency=1, global_rate=100, chat_rate=100)
+        due = datetime.now(timezone.utc)
+        started = time.monotonic()
+        dispatcher.submit(1, "первое", due)
+        dispatcher.submit(2, "второе", due)
+        await dispatcher.drain(timeout=5)
+        await dispatcher.stop()
+        return bot, dispatcher, started
+
+    bot, dispatcher, started = run(scenario())
+
+    assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 2]
+    # Второе сообщение в другой чат тоже ждало конца флуд-контроля
+    assert all(sent_at - started >= RETRY_AFTER for _, sent_at in bot.sent)
+    assert dispatcher.metrics.retried == 1
+    assert dispatcher.oldest_unsent() is None
+
+
+def test_stop_cancels_pending_retries(run):
+    async def scenario():
+        dispatcher = ReminderDispatcher()
+        dispatcher.start(FloodBot(), concurrency=1, global_rate=100, chat_rate=100)
+        due = datetime.now(timezone.utc)
+        dispatcher.submit(1, "первое", due)
+        await asyncio.sleep(0.1)
+        await dispatcher.stop()
+        await asyncio.sleep(RETRY_AFTER + 0.1)
+        return dispatcher, due
+
+    dispatcher, due = run(scenario())
+
+    # Повтор не вернулся в очередь, а минута осталась неотправленной
+    assert dispatcher.queue_size == 0
+    assert dispatcher.oldest_unsent() == due
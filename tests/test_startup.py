@@ -0,0 +1,46 @@
+"""
+Бюджет запуска бота: импорт app (все обработчики и сервисы) не тянет
+научный стек и укладывается в IMPORT_BUDGET_SECONDS по python -X importtime.
+NumPy нужен только прогнозу, matplotlib — процессам графиков, pyarrow —
+экспорту в Parquet; все они загружаются при первом использовании.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = {"numpy", "matplotlib", "sklearn", "scipy", "pandas", "pyarrow"}
+# С запасом на медленную машину: здесь импорт занимает 5–6 с, почти всё — aiogram и SQLAlchemy
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", 8))
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Модуль → суммарное время импорта, мкс (по выводу -X importtime)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_app_import_budget():
+    times = import_times("app")
+
+    loaded = {name.split(".")[0] for name in times}
+    assert not loaded & HEAVY_MODULES
+
+    seconds = times["app"] / 1e6
+    print(f"\nimport app: {seconds:.2f} с")
+    assert seconds < IMPORT_BUDGET_SECONDS